@@ -14,3 +14,23 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ModulectorBackend.settings')
 
 application = get_asgi_application()
+
+# Loads the in-memory indexes before serving the first request. With multiple server processes (see gunicorn.conf.py)
+# this runs once in the master, before forking, so the workers share them copy-on-write
+from django.db import connections  # noqa: E402
+from modulector.services import mirna_alias_service, mirna_finder_service, gene_alias_service, \
+    interactions_snapshot_service, methylation_service, url_service  # noqa: E402
+
+mirna_alias_service.warm_up()
+mirna_finder_service.warm_up()
+gene_alias_service.warm_up()
+url_service.warm_up()
+methylation_service.warm_up()
+interactions_snapshot_service.warm_up()
+
+# The DB connections opened by the warm-up must not be inherited (and shared) by the forked workers. Closing them
+# only returns them to the pool, so its idle connections are closed too
+from modulector.db_pool.pool import close_idle_connections  # noqa: E402
+
+connections.close_all()
+close_idle_connections()
@@ -0,0 +1,31 @@
+"""
+Gunicorn config used by tools/run.sh when SERVER_WORKERS > 1. The ASGI app is loaded (and the in-memory indexes are
+built, see asgi.py) once in the master process before forking the Uvicorn workers, so they share the memory pages of
+the indexes copy-on-write instead of building a copy each.
+
+For more information on this file, see
+https://docs.gunicorn.org/en/stable/settings.html
+"""
+import gc
+from ModulectorBackend.settings import SERVER_WORKERS, SERVER_WORKER_TIMEOUT
+
+bind = '0.0.0.0:8000'
+workers = SERVER_WORKERS
+worker_class = 'uvicorn_worker.UvicornWorker'
+preload_app = True
+timeout = SERVER_WORKER_TIMEOUT
+graceful_timeout = SERVER_WORKER_TIMEOUT
+accesslog = '-'
+
+# The cycle GC of the workers writes to the header of every object it traverses, which would copy all the shared pages.
+# It's disabled while the app is loaded (so no holes are left in them) and the loaded objects are moved to a permanent
+# generation that is never collected
+gc.disable()
+
+
+def when_ready(_server):
+    gc.freeze()
+
+
+def post_fork(_server, _worker):
+    gc.enable()
@@ -40,6 +40,15 @@ NCBI_API_KEY = '61a2e5671d5d57b8dde8a61cad17eec99709'
 # to enable and disable api call to pubmeds in the mirna interactions and mirna target interactions endpoints
 USE_PUBMED_API = True
 PUBMED_API_TIMEOUT = 1
+# Maximum number of requests per second to the NCBI API (10 is the limit allowed when an API key is used)
+PUBMED_API_RATE_LIMIT: int = int(os.getenv('PUBMED_API_RATE_LIMIT', 10))
+# Maximum number of concurrent requests to the NCBI API for a page of results
+PUBMED_API_MAX_WORKERS: int = int(os.getenv('PUBMED_API_MAX_WORKERS', 10))
+# Maximum time (in seconds) spent querying the NCBI API for a page of results. Terms that can not be queried
+# in time are returned without the PubMeds from the API
+PUBMED_API_PAGE_TIMEOUT: int = int(os.getenv('PUBMED_API_PAGE_TIMEOUT', 10))
+# Time (in seconds) the NCBI API results are kept in cache
+PUBMED_CACHE_TIMEOUT: int = int(os.getenv('PUBMED_CACHE_TIMEOUT', 86400))
 # Application definition
 
 INSTALLED_APPS = [
@@ -130,26 +139,84 @@ WSGI_APPLICATION = 'ModulectorBackend.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
+# Number of DB connections kept open by every process in its pool (see modulector/db_pool). 0 disables the pool, so
+# connections are opened for every request (or kept by thread for CONN_MAX_AGE seconds)
+DB_POOL_SIZE: int = int(os.getenv('DB_POOL_SIZE', 10))
+# Number of extra connections opened when all the pooled ones are in use. They're closed when released
+DB_POOL_MAX_OVERFLOW: int = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+# Seconds to wait for a free connection when the pool and the overflow are in use
+DB_POOL_TIMEOUT: int = int(os.getenv('DB_POOL_TIMEOUT', 30))
+# Seconds after which a pooled connection is closed (when it's released) and replaced by a new one
+DB_POOL_MAX_AGE: int = int(os.getenv('DB_POOL_MAX_AGE', 3600))
+# Seconds a connection is kept by a thread when the pool is disabled. Django's persistent connections are bound to
+# a thread, and the ASGI server uses a new one for every request, so with the pool they must be closed (returned)
+CONN_MAX_AGE: int = int(os.getenv('CONN_MAX_AGE', 0))
+# Set to 'true' if the DB is accessed through PgBouncer (or another pooler) in transaction mode, which doesn't
+# support server-side cursors outside transactions
+DB_TRANSACTION_POOLER: bool = os.getenv('DB_TRANSACTION_POOLER', 'false') == 'true'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'modulector.db_pool' if DB_POOL_SIZE > 0 else 'django.db.backends.postgresql',
         'USER': os.getenv('POSTGRES_USERNAME', 'modulector'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'modulector'),
         'HOST': os.getenv('POSTGRES_HOST', '127.0.0.1'),
         'PORT': os.getenv('POSTGRES_PORT', 5432),
         'NAME': os.getenv('POSTGRES_DB', 'modulector'),
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE > 0 else CONN_MAX_AGE,
+        # According to documentation (https://docs.djangoproject.com/en/4.2/ref/databases/#connection-management)
+        # this is more robust than the default. Pooled connections idle for a while are checked too
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': DB_TRANSACTION_POOLER,
+        'POOL': {
+            'SIZE': DB_POOL_SIZE,
+            'MAX_OVERFLOW': DB_POOL_MAX_OVERFLOW,
+            'TIMEOUT': DB_POOL_TIMEOUT,
+            'MAX_AGE': DB_POOL_MAX_AGE,
+        },
     },
 }
+# The default cache is stored in files so it's shared by all the server processes and survives restarts. Any Django
+# cache backend can be used setting CACHE_BACKEND and CACHE_LOCATION. FileBasedCache lists all its files on every
+# write to check MAX_ENTRIES, so writes get slower as the cache grows (see DEPLOYING.md)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+        }
     }
 }
 
-# According to documentation (https://docs.djangoproject.com/en/4.2/ref/databases/#connection-management)
-# this is more robust than the default
-CONN_HEALTH_CHECKS = True
+# Cache used for data generated from reference datasets (aliases, URL templates, finders results, etc.)
+REFERENCE_CACHE_ALIAS: str = 'default'
+# Time (in seconds) the reference data is kept in cache. It's also invalidated when the dataset is reloaded
+REFERENCE_CACHE_TIMEOUT: int = int(os.getenv('REFERENCE_CACHE_TIMEOUT', 7 * 86400))
+# Interval (in seconds) to check if a reference dataset was reloaded by another process
+DATASET_VERSION_CHECK_INTERVAL: int = int(os.getenv('DATASET_VERSION_CHECK_INTERVAL', 10))
+# Interval (in seconds) between the logs of the cache, PubMed and DB pool stats of every server process. 0 disables
+# them
+METRICS_LOG_INTERVAL: int = int(os.getenv('METRICS_LOG_INTERVAL', 3600))
+
+# Maximum number of cells (miRNAs x genes) of the matrices returned by /mirna-gene-score-matrix/ (4 bytes per cell)
+SCORE_MATRIX_MAX_CELLS: int = int(os.getenv('SCORE_MATRIX_MAX_CELLS', 50_000_000))
+
+# Directory where the columnar snapshots of the miRNA-gene interactions are exported
+INTERACTIONS_SNAPSHOT_DIR: str = os.getenv('INTERACTIONS_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+# Number of partitions (by miRNA hash) of the snapshots
+INTERACTIONS_SNAPSHOT_PARTITIONS: int = int(os.getenv('INTERACTIONS_SNAPSHOT_PARTITIONS', 64))
+# If true, the batch interactions and score matrix services read from the current snapshot instead of the DB
+INTERACTIONS_SNAPSHOT_READS: bool = os.getenv('INTERACTIONS_SNAPSHOT_READS', 'false') == 'true'
+
+# Maximum time (in milliseconds) the swap of a table imported with a shadow table waits for the lock of the live
+# table. Queries that arrive while it's waiting are blocked too, so it's retried later instead of waiting more
+TABLE_SWAP_LOCK_TIMEOUT: int = int(os.getenv('TABLE_SWAP_LOCK_TIMEOUT', 2000))
+# Number of times the swap is retried when the lock can't be acquired
+TABLE_SWAP_RETRIES: int = int(os.getenv('TABLE_SWAP_RETRIES', 30))
+
+# If true, /methylation-sites-finder/ also completes the 450k, 27k and EPIC v1 Loci IDs (uses more memory)
+METHYLATION_FINDER_INCLUDE_LEGACY_LOCI: bool = os.getenv('METHYLATION_FINDER_INCLUDE_LEGACY_LOCI', 'false') == 'true'
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -202,5 +269,17 @@ EMAIL_PORT = '25'
 EMAIL_HOST_PASSWORD = ''
 EMAIL_USE_TLS = False
 
-# Number of processes in the ProcessPoolExecutor
-PROCESS_POOL_WORKERS: int = int(os.getenv('PROCESS_POOL_WORKERS', 4))
+# Number of workers of the thread pool where the bulk services query big lists in parallel shards. 1 processes them
+# in the request thread
+EXECUTOR_WORKERS: int = int(os.getenv('EXECUTOR_WORKERS', 4))
+# Maximum number of shards queued or running in the thread pool. When it's reached, new shards are processed in the
+# request thread instead of waiting for a worker
+EXECUTOR_QUEUE_SIZE: int = int(os.getenv('EXECUTOR_QUEUE_SIZE', EXECUTOR_WORKERS * 2))
+# Maximum number of shards of a single request processed at the same time
+EXECUTOR_REQUEST_CONCURRENCY: int = int(os.getenv('EXECUTOR_REQUEST_CONCURRENCY', 2))
+
+# Number of server processes started by tools/run.sh. With more than one, Gunicorn forks them (with Uvicorn workers)
+# after loading the app and the in-memory indexes, which are shared copy-on-write. 1 uses a single Daphne process
+SERVER_WORKERS: int = int(os.getenv('SERVER_WORKERS', 1))
+# Seconds a server process can be unresponsive before it's killed and replaced (only with SERVER_WORKERS > 1)
+SERVER_WORKER_TIMEOUT: int = int(os.getenv('SERVER_WORKER_TIMEOUT', 120))
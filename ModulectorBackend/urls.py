@@ -9,15 +9,20 @@ urlpatterns = [
     path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
     path('admin/', admin.site.urls),
-    path('mirna/', views.MirnaList.as_view({'get': 'list'}), name='mirna'),
+    path('mirna/', views.MirnaList.as_view(), name='mirna'),
     path('mirna-target-interactions/', views.MirnaTargetInteractions.as_view(),
          name='mirna_target_interactions'),
+    path('mirna-target-interactions-batch/', views.MirnaTargetInteractionsBatch.as_view(),
+         name='mirna_target_interactions_batch'),
+    path('mirna-gene-score-matrix/', views.MirnaGeneScoreMatrix.as_view(),
+         name='mirna_gene_score_matrix'),
     path('mirna-target-validation/', views.MirnaTargetValidation.as_view(),
          name='mirna_target_validation'),
     path('mirna-aliases/', views.MirnaAliasesList.as_view(), name='mirna_aliases'),
     path('mirna-codes/', views.MirnaCodes.as_view(), name='mirna_codes'),
     path('mirna-codes-finder/', views.MirnaCodesFinder.as_view(),
          name='mirna_codes_finder'),
+    path('gene-symbols/', views.GeneSymbols.as_view(), name='gene_symbols'),
     path('diseases/', views.MirnaDiseaseList.as_view(), name='diseases'),
     path('drugs/', views.MirnaDrugsList.as_view(), name='drugs'),
     path('subscribe-pubmeds/', views.SubscribeUserToPubmed.as_view()),
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ModulectorConfig(AppConfig):
     name = 'modulector'
+
+    def ready(self):
+        # Registers the signal handlers
+        from modulector import signals  # noqa: F401
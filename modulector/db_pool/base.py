@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from django.db.backends.postgresql import base
+from modulector.db_pool.pool import close_idle_connections, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend whose connections are taken from a process-wide pool instead of being opened for every
+    request, and returned to it when Django closes them (e.g. at the end of the request, with CONN_MAX_AGE = 0).
+    Unlike Django's persistent connections, which are bound to a thread, they're reused by all the threads of the
+    process, including the ones created by the ASGI server for every request.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Pool of the current connection. Its settings may point to another database when it's closed (e.g. the
+        # test database name is changed after opening it)
+        self._pool = None
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict)
+        conn = pool.acquire(
+            owner=self,
+            connect=lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+        self._pool = pool
+        return conn
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # A connection closed inside a transaction block is discarded, as Django keeps it until the block
+                # ends
+                pool, self._pool = self._pool or get_pool(self.alias, self.settings_dict), None
+                pool.release(self.connection, discard=self.in_atomic_block)
+
+    @contextmanager
+    def _nodb_cursor(self):
+        # Used to create and drop databases (e.g. the test database), which PostgreSQL refuses while there are other
+        # connections to them, so the idle ones kept by the pools are closed first
+        close_idle_connections()
+        with super()._nodb_cursor() as cursor:
+            yield cursor
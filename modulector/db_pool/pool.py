@@ -0,0 +1,307 @@
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Final, List, Tuple
+import psycopg2
+from psycopg2 import extensions
+from ModulectorBackend.settings import DEBUG, METRICS_LOG_INTERVAL
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+# Seconds a connection can be idle in the pool before being checked with a query when it's taken (if the
+# CONN_HEALTH_CHECKS setting is enabled). Connections used shortly before are given out without a round trip
+HEALTH_CHECK_IDLE_TIME: Final[float] = 10.0
+
+# Connections inherited from the parent process on fork. They're shared with the parent, so they must never be used
+# nor closed (closing them would also close the ones of the parent)
+_inherited_connections: List[Any] = []
+
+
+class PoolMetrics:
+    """Counters of the connections given out by a pool since the process started."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.created = 0
+        self.closed = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+        self.failed_health_checks = 0
+        self.leaked = 0
+
+    def record(self, **counters: float):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Gets the counters and the mean time (in seconds) waited for a free connection."""
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'closed': self.closed,
+                'waits': self.waits,
+                'mean_wait_time': self.wait_time / self.waits if self.waits else 0.0,
+                'timeouts': self.timeouts,
+                'failed_health_checks': self.failed_health_checks,
+                'leaked': self.leaked,
+            }
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of PostgreSQL connections shared by all the threads. Up to 'size' connections are kept open
+    when they're released, and up to 'max_overflow' more are opened when all of them are in use (and closed when
+    they're released). When 'size + max_overflow' connections are in use, threads wait at most 'timeout' seconds for
+    a free one. Connections older than 'max_age' seconds are closed when they're released.
+    """
+
+    def __init__(self, size: int, max_overflow: int, timeout: float, max_age: float, health_checks: bool):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_checks = health_checks
+        self.metrics = PoolMetrics()
+        self._init_state()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _init_state(self):
+        # Idle connections with the time they were released. The most recently used is given out first
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        # Creation time and owner finalizer of the connections in use, by connection ID
+        self._in_use: Dict[int, Tuple[Any, float, weakref.finalize]] = {}
+        self._created_at: Dict[int, float] = {}
+        # Connections in use whose owners were garbage collected without releasing them
+        self._leaked: Deque[Any] = deque()
+        self._open = 0
+        self._condition = threading.Condition()
+
+    def _after_fork(self):
+        """Discards in the child process the connections inherited from the parent without closing them."""
+        _inherited_connections.extend(conn for conn, _ in self._idle)
+        _inherited_connections.extend(conn for conn, _, _ in self._in_use.values())
+        for _, _, finalizer in self._in_use.values():
+            finalizer.detach()
+        self._init_state()
+
+    def _close(self, conn):
+        self._created_at.pop(id(conn), None)
+        self.metrics.record(closed=1)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        """Checks an idle connection before giving it out."""
+        if conn.closed:
+            return False
+        if not self.health_checks or time.monotonic() - idle_since < HEALTH_CHECK_IDLE_TIME:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _collect_leaked(self):
+        """Closes the connections whose owners were garbage collected."""
+        while self._leaked:
+            conn = self._leaked.popleft()
+            logger.warning('A DB connection was not returned to the pool, closing it')
+            self.metrics.record(leaked=1)
+            with self._condition:
+                self._in_use.pop(id(conn), None)
+                self._open -= 1
+                self._condition.notify()
+            self._close(conn)
+
+    def acquire(self, owner: object, connect: Callable[[], Any]):
+        """
+        Takes a connection from the pool, opening a new one if there is no idle connection and the limit was not
+        reached.
+        :param owner: Object which uses the connection. If it's garbage collected without releasing the connection
+        (e.g. a thread ended with it open), the connection is closed and its slot is freed.
+        :param connect: Function which opens a new connection.
+        :return: Connection.
+        :raise psycopg2.OperationalError: If no connection was available in 'timeout' seconds.
+        """
+        self._collect_leaked()
+        start = time.monotonic()
+        waited = False
+        while True:
+            conn = None
+            with self._condition:
+                while not self._idle and self._open >= self.size + self.max_overflow:
+                    waited = True
+                    remaining = start + self.timeout - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        if not self._idle and self._open >= self.size + self.max_overflow:
+                            self.metrics.record(timeouts=1)
+                            logger.warning(f'No DB connection available after {self.timeout} seconds. '
+                                           f'Pool stats: {self.get_stats()}')
+                            raise psycopg2.OperationalError(
+                                f'Connection pool exhausted ({self._open} connections in use)'
+                            )
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                else:
+                    self._open += 1
+
+            if conn is None:
+                try:
+                    conn = connect()
+                except BaseException:
+                    with self._condition:
+                        self._open -= 1
+                        self._condition.notify()
+                    raise
+                self._created_at[id(conn)] = time.monotonic()
+                self.metrics.record(created=1)
+            elif not self._is_healthy(conn, idle_since):
+                self.metrics.record(failed_health_checks=1)
+                with self._condition:
+                    self._open -= 1
+                self._close(conn)
+                continue
+
+            finalizer = weakref.finalize(owner, self._leaked.append, conn)
+            finalizer.atexit = False
+            with self._condition:
+                self._in_use[id(conn)] = (conn, self._created_at.get(id(conn), 0.0), finalizer)
+            self.metrics.record(checkouts=1, waits=int(waited), wait_time=time.monotonic() - start if waited else 0.0)
+            _log_pools_stats()
+            return conn
+
+    @staticmethod
+    def _reset(conn) -> bool:
+        """Leaves a released connection ready to be reused rolling back any open transaction."""
+        if conn.closed:
+            return False
+        status = conn.info.transaction_status
+        if status == extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+            try:
+                conn.rollback()
+                return True
+            except psycopg2.Error:
+                return False
+        # A query is still running or the connection is broken
+        return False
+
+    def release(self, conn, discard: bool = False):
+        """
+        Returns a connection to the pool. It's closed if it's broken, too old, it was opened as overflow or it must
+        be discarded.
+        """
+        with self._condition:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            # Not given out by this pool (e.g. inherited from the parent process)
+            return
+
+        _, created_at, finalizer = entry
+        finalizer.detach()
+        reusable = not discard and time.monotonic() - created_at < self.max_age and self._reset(conn)
+        with self._condition:
+            if reusable and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                self._condition.notify()
+                return
+            self._open -= 1
+            self._condition.notify()
+        self._close(conn)
+
+    def close_idle(self):
+        """Closes all the idle connections (e.g. before forking the server processes)."""
+        with self._condition:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Gets the current state of the pool and its metrics."""
+        with self._condition:
+            state = {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+            }
+        return {**state, **self.metrics.as_dict()}
+
+
+# Pools of every DB alias and set of connection parameters. A wrapper whose settings point to another database (e.g.
+# the test database) gets another pool, so connections to one database are never given out for another
+_pools: Dict[Tuple[str, ...], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+# Last time the stats of the pools were logged
+_log_time = time.monotonic()
+_log_lock = threading.Lock()
+
+
+def _get_key(alias: str, settings_dict: Dict[str, Any]) -> Tuple[str, ...]:
+    return (alias,) + tuple(str(settings_dict.get(param) or '') for param in ('NAME', 'HOST', 'PORT', 'USER'))
+
+
+def get_pool(alias: str, settings_dict: Dict[str, Any]) -> ConnectionPool:
+    """
+    Gets the pool of a DB alias and the database its settings point to, creating it with the 'POOL' options of the
+    settings on first use.
+    """
+    key = _get_key(alias, settings_dict)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = settings_dict.get('POOL', {})
+                pool = ConnectionPool(size=options.get('SIZE', 10), max_overflow=options.get('MAX_OVERFLOW', 10),
+                                      timeout=options.get('TIMEOUT', 30), max_age=options.get('MAX_AGE', 3600),
+                                      health_checks=settings_dict.get('CONN_HEALTH_CHECKS', False))
+                _pools[key] = pool
+    return pool
+
+
+def get_pools_stats() -> Dict[str, Dict[str, float]]:
+    """Gets the state and metrics of the pools of the current process by DB alias and database name."""
+    return {f'{key[0]}/{key[1]}': pool.get_stats() for key, pool in list(_pools.items())}
+
+
+def _log_pools_stats():
+    """Logs the stats of all the pools every METRICS_LOG_INTERVAL seconds. It's called on every checkout."""
+    global _log_time
+    now = time.monotonic()
+    with _log_lock:
+        must_log = 0 < METRICS_LOG_INTERVAL <= now - _log_time
+        if must_log:
+            _log_time = now
+    if must_log:
+        logger.info(f'DB pool stats: {get_pools_stats()}')
+
+
+def close_idle_connections():
+    """
+    Closes the idle connections of all the pools of the current process (e.g. before forking the server processes,
+    or before creating or dropping a database, which PostgreSQL refuses while there are connections to it).
+    """
+    for pool in list(_pools.values()):
+        pool.close_idle()
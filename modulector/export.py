@@ -0,0 +1,53 @@
+from typing import Any, Optional, Sequence, Tuple
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ParseError
+from modulector.utils.streaming import STREAMING_CHUNK_SIZE, iter_csv, iter_ndjson, streaming_response
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class StreamingExportMixin:
+    """
+    Adds an export mode to a ListAPIView. If the 'export' query param is 'ndjson' or 'csv', all the filtered rows are
+    streamed in that format instead of returning a page. Rows are read with a server-side cursor as tuples of
+    'export_fields' and formatted with 'format_export_row()' (no serializer is used), so memory usage doesn't depend
+    on the number of rows.
+    """
+    export_query_param = 'export'
+    export_fields: Tuple[str, ...] = ()
+    export_columns: Tuple[str, ...] = ()
+    export_filename = 'export'
+
+    def format_export_row(self, row: Tuple[Any, ...]) -> Sequence[Any]:
+        """Converts a row of 'export_fields' values to the exported values of 'export_columns'."""
+        return row
+
+    def get_export_format(self) -> Optional[str]:
+        export_format = self.request.GET.get(self.export_query_param)
+        if export_format is not None and export_format not in EXPORT_CONTENT_TYPES:
+            raise ParseError(
+                detail=f"Invalid '{self.export_query_param}'. Allowed values are: {', '.join(EXPORT_CONTENT_TYPES)}"
+            )
+        return export_format
+
+    def export(self, export_format: str) -> StreamingHttpResponse:
+        """Streams all the filtered rows in the requested format."""
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*self.export_fields)
+        rows = (self.format_export_row(row) for row in queryset.iterator(chunk_size=STREAMING_CHUNK_SIZE))
+        if export_format == 'csv':
+            chunks = iter_csv(self.export_columns, rows)
+        else:
+            chunks = iter_ndjson(self.export_columns, rows)
+
+        response = streaming_response(chunks, content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{self.export_filename}.{export_format}"'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        export_format = self.get_export_format()
+        if export_format is not None:
+            return self.export(export_format)
+        return super().list(request, *args, **kwargs)
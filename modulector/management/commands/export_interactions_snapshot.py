@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from ModulectorBackend.settings import INTERACTIONS_SNAPSHOT_DIR, INTERACTIONS_SNAPSHOT_PARTITIONS
+from modulector.services import interactions_snapshot_service
+
+
+class Command(BaseCommand):
+    help = 'Exports the miRNA-gene interactions to a columnar snapshot partitioned by miRNA hash'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default=INTERACTIONS_SNAPSHOT_DIR,
+                            help='Directory where snapshots are stored (INTERACTIONS_SNAPSHOT_DIR by default)')
+        parser.add_argument('--partitions', type=int, default=INTERACTIONS_SNAPSHOT_PARTITIONS,
+                            help='Number of partitions (INTERACTIONS_SNAPSHOT_PARTITIONS by default)')
+
+    def handle(self, *args, **options):
+        if options['partitions'] < 1:
+            raise CommandError('--partitions must be greater than 0')
+        path = interactions_snapshot_service.export_snapshot(options['directory'], options['partitions'])
+        self.stdout.write(self.style.SUCCESS(f'Snapshot exported to {path}'))
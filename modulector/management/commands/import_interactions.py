@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from modulector.models import MirnaXGene, MirTarBaseInteraction
+from modulector.processors import mirdip_processor, mirtarbase_processor
+from modulector.utils import table_swap
+
+# Processor and model of every interactions database
+DATABASES = {
+    'mirdip': (mirdip_processor, MirnaXGene),
+    'mirtarbase': (mirtarbase_processor, MirTarBaseInteraction),
+}
+
+
+class Command(BaseCommand):
+    help = ('Reloads the interactions of a database into a shadow table and swaps it with the live one, so the '
+            'queries are not blocked during the import')
+
+    def add_arguments(self, parser):
+        parser.add_argument('database', choices=list(DATABASES), help='Database to import')
+        parser.add_argument('--file', help='File to import (the one in modulector/files by default)')
+        parser.add_argument('--rollback', action='store_true',
+                            help='Restores the data previous to the last import instead of importing')
+        parser.add_argument('--drop-old', action='store_true',
+                            help='Removes the data previous to the import (it can not be restored later)')
+
+    def handle(self, *args, **options):
+        processor, model = DATABASES[options['database']]
+        try:
+            if options['rollback']:
+                processor.rollback()
+                self.stdout.write(self.style.SUCCESS(f'{model._meta.db_table} restored'))
+            else:
+                rows = processor.process(options['file'])
+                self.stdout.write(self.style.SUCCESS(f'{rows} rows imported into {model._meta.db_table}'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['drop_old']:
+            table_swap.drop_old_table(model)
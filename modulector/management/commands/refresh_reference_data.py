@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from modulector.mappers import gene_mapper, mature_mirna_mapper, ref_seq_mapper
+from modulector.processors import drugs_processor, gene_alias_processor
+
+# Loader of every reference table
+LOADERS = {
+    'drugs': drugs_processor.process,
+    'gene_aliases': gene_alias_processor.process,
+    'mirbase_aliases': mature_mirna_mapper.process,
+    'gene_symbols': gene_mapper.process,
+    'old_refseqs': ref_seq_mapper.process,
+}
+
+
+class Command(BaseCommand):
+    help = 'Reloads reference tables from the files in modulector/files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='+', choices=list(LOADERS), help='Tables to reload')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Applies only the differences with the current data instead of truncating the tables')
+
+    def handle(self, *args, **options):
+        for table in options['tables']:
+            result = LOADERS[table](incremental=options['incremental'])
+            self.stdout.write(self.style.SUCCESS(f'{table}: {result}'))
@@ -1,33 +1,28 @@
 import os
 import pathlib
-from typing import List
 
 import pandas as pd
-from django.db import transaction, connection
+from django.db import transaction
+
+from modulector.models import GeneSymbolMapping
+from modulector.services import cache_service
+from modulector.utils import bulk_load
 
 parent_dir = pathlib.Path(__file__).parent.absolute().parent
 path = os.path.join(parent_dir, "files/ref_seq_to_symbols.txt")
 
 
-def process():
+def process(incremental: bool = False) -> bulk_load.SyncResult:
     translations = load_translations()
+    data = pd.DataFrame({'refseq': list(translations.keys()), 'symbol': list(translations.values())})
     with transaction.atomic():
-        insert_query_prefix = f'INSERT INTO modulector_genesymbolmapping (refseq, symbol) VALUES '
-        insert_template = "('{}','{}')"
-        queries: List[str] = []
-        for refseq in translations.keys():
-            queries.append(insert_template.format(refseq, translations.get(refseq)))
-        insert_query = insert_query_prefix + ','.join(queries)
-        with connection.cursor() as cursor:
-            cursor.execute("truncate table modulector_genesymbolmapping")
-            cursor.execute(insert_query)
+        result = bulk_load.refresh_table(GeneSymbolMapping, data, incremental, key_fields=['refseq'])
+        if result.changed:
+            cache_service.bump_dataset_version(cache_service.REFSEQ_MAPPINGS_DATASET)
+    return result
 
 
 def load_translations():
-    df = pd.read_csv(filepath_or_buffer=path, delimiter="\t")
-    symbol_dic = {}
-    for index, item in df.iterrows():
-        ref_seq = item["RNA"].split(".")[0]
-        symbol = item["Symbol"]
-        symbol_dic[ref_seq] = symbol
-    return symbol_dic
+    df = pd.read_csv(filepath_or_buffer=path, delimiter="\t", usecols=["RNA", "Symbol"])
+    ref_seqs = df["RNA"].str.split(".").str[0]
+    return dict(zip(ref_seqs, df["Symbol"]))
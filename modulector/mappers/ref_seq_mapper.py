@@ -1,18 +1,33 @@
 import os
 import pathlib
+import re
 
-from django.db import transaction, connection
+import pandas as pd
+from django.db import transaction
+
+from modulector.models import OldRefSeqMapping
+from modulector.services import cache_service
+from modulector.utils import bulk_load
 
 sqL_input = "files/ref_seq_translation.sql"
 
+# Every ('<old value>','<new value>') tuple of the INSERT statement
+VALUES_REGEX = re.compile(r"\('([^']*)',\s*'([^']*)'\)")
+
 
-def process():
+def load_mappings() -> pd.DataFrame:
+    """Reads the old -> new RefSeq mappings from the VALUES of the SQL file."""
     parent_dir = pathlib.Path(__file__).parent.absolute().parent
     path = os.path.join(parent_dir, sqL_input)
     with open(path, "r") as file:
         sql = file.read()
+    return pd.DataFrame(VALUES_REGEX.findall(sql), columns=['old_value', 'new_value'])
+
 
-        with transaction.atomic():
-            with connection.cursor() as cursor:
-                cursor.execute("truncate table modulector_oldrefseqmapping")
-                cursor.execute(sql)
+def process(incremental: bool = False) -> bulk_load.SyncResult:
+    data = load_mappings()
+    with transaction.atomic():
+        result = bulk_load.refresh_table(OldRefSeqMapping, data, incremental, key_fields=['old_value'])
+        if result.changed:
+            cache_service.bump_dataset_version(cache_service.REFSEQ_MAPPINGS_DATASET)
+    return result
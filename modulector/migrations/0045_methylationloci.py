@@ -0,0 +1,44 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:06
+
+from django.db import migrations, models, connection
+import django.db.models.deletion
+
+
+def fill_methylation_loci(apps, _schema_editor):
+    """Fills modulector_methylationloci with all the Loci IDs (not empty) of every EPIC v2 site"""
+    MethylationEPIC = apps.get_model(app_label='modulector', model_name='MethylationEPIC')
+    MethylationLoci = apps.get_model(app_label='modulector', model_name='MethylationLoci')
+    epic_table = MethylationEPIC._meta.db_table
+    loci_table = MethylationLoci._meta.db_table
+
+    print("\nGenerating Loci IDs lookup table...")
+    sites_ids = ' UNION '.join(
+        f"SELECT {column}, id FROM {epic_table} WHERE {column} <> ''"
+        for column in ('ilmnid', 'name', 'methyl450_loci', 'methyl27_loci', 'epicv1_loci')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE TABLE {loci_table}")
+        cursor.execute(f"INSERT INTO {loci_table} (loci, methylation_epic_v2_ilmnid_id) {sites_ids}")
+        print(f"Done. {cursor.rowcount} Loci IDs loaded into {loci_table}.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modulector', '0044_rename_modulector__mirna_8c339f_idx_modulector__mirna_27e058_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MethylationLoci',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('loci', models.CharField(max_length=25)),
+                ('methylation_epic_v2_ilmnid', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='modulector.methylationepic')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['loci', 'methylation_epic_v2_ilmnid'], name='modulector__loci_76ef3e_idx')],
+            },
+        ),
+        migrations.RunPython(fill_methylation_loci, migrations.RunPython.noop),
+    ]
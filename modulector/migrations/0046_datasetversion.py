@@ -0,0 +1,22 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modulector', '0045_methylationloci'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(max_length=50, unique=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('update_date', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:16
+
+from django.db import migrations, models, connection
+
+
+def fill_methylation_site_details(apps, _schema_editor):
+    """Fills modulector_methylationsitedetails with the JSON document of every EPIC v2 site name"""
+    MethylationEPIC = apps.get_model(app_label='modulector', model_name='MethylationEPIC')
+    MethylationUCSC_CPGIsland = apps.get_model(app_label='modulector', model_name='MethylationUCSC_CPGIsland')
+    MethylationUCSCRefGene = apps.get_model(app_label='modulector', model_name='MethylationUCSCRefGene')
+    MethylationSiteDetails = apps.get_model(app_label='modulector', model_name='MethylationSiteDetails')
+    epic_table = MethylationEPIC._meta.db_table
+    islands_table = MethylationUCSC_CPGIsland._meta.db_table
+    genes_table = MethylationUCSCRefGene._meta.db_table
+    details_table = MethylationSiteDetails._meta.db_table
+
+    print("\nGenerating methylation sites details table...")
+    details_query = f"""
+        SELECT DISTINCT ON (e.name) e.name, json_strip_nulls(json_build_object(
+            'name', e.name,
+            'chromosome_position', CASE e.strand_fr
+                WHEN 'F' THEN e.chr || ':' || e.mapinfo || ' [+]'
+                WHEN 'R' THEN e.chr || ':' || e.mapinfo || ' [-]'
+            END,
+            'aliases', (
+                SELECT coalesce(json_agg(a.alias ORDER BY a.position), '[]'::json)
+                FROM (VALUES (1, e.methyl27_loci), (2, e.methyl450_loci), (3, e.epicv1_loci), (4, e.ilmnid))
+                    AS a(position, alias)
+                WHERE a.alias <> '' AND a.alias <> e.name
+            ),
+            'ucsc_cpg_islands', (
+                SELECT coalesce(json_agg(json_build_object(
+                    'cpg_island', i.ucsc_cpg_island_name,
+                    'relation', i.relation_to_ucsc_cpg_island
+                ) ORDER BY i.id), '[]'::json)
+                FROM {islands_table} i
+                WHERE i.methylation_epic_v2_ilmnid_id = e.id
+            ),
+            'genes', (
+                SELECT coalesce(json_object_agg(g.gene, g.groups ORDER BY g.first_id), '{{}}'::json)
+                FROM (
+                    SELECT gg.gene, json_agg(gg.gene_group ORDER BY gg.first_id) AS groups,
+                        min(gg.first_id) AS first_id
+                    FROM (
+                        SELECT ucsc_refgene_name AS gene, ucsc_refgene_group AS gene_group, min(id) AS first_id
+                        FROM {genes_table}
+                        WHERE methylation_epic_v2_ilmnid_id = e.id
+                        GROUP BY ucsc_refgene_name, ucsc_refgene_group
+                    ) gg
+                    GROUP BY gg.gene
+                ) g
+            )
+        ))::text
+        FROM {epic_table} e
+        ORDER BY e.name, e.id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE TABLE {details_table}")
+        cursor.execute(f"INSERT INTO {details_table} (name, document) {details_query}")
+        print(f"Done. {cursor.rowcount} sites details loaded into {details_table}.")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modulector', '0046_datasetversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MethylationSiteDetails',
+            fields=[
+                ('name', models.CharField(max_length=15, primary_key=True, serialize=False)),
+                ('document', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(fill_methylation_site_details, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.11 on 2026-10-18 16:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Indexes are created concurrently (outside a transaction) to not lock the interactions table
+    atomic = False
+
+    dependencies = [
+        ('modulector', '0047_methylationsitedetails'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='mirnaxgene',
+            index=models.Index(fields=['mirna', '-score', 'id'], name='mirnaxgen_mirna_score_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mirnaxgene',
+            index=models.Index(fields=['gene', '-score', 'id'], name='mirnaxgen_gene_score_idx'),
+        ),
+    ]
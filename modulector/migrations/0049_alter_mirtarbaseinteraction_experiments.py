@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-18 18:41
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modulector', '0048_mirnaxgene_score_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mirtarbaseinteraction',
+            name='experiments',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=200), help_text='List of techniques used to experimentally validate the miRNA-target interaction', size=None),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modulector', '0049_alter_mirtarbaseinteraction_experiments'),
+    ]
+
+    # Versions are taken from a sequence as its values are never reused, even if the reload which got them is
+    # rolled back. It starts after the current versions
+    operations = [
+        migrations.RunSQL(
+            [
+                "CREATE SEQUENCE modulector_datasetversion_version_seq",
+                "SELECT setval('modulector_datasetversion_version_seq', COALESCE(MAX(version), 1)) "
+                "FROM modulector_datasetversion",
+            ],
+            "DROP SEQUENCE modulector_datasetversion_version_seq"
+        )
+    ]
@@ -51,6 +51,29 @@ class MethylationGencode(models.Model):
     methylation_epic_v2_ilmnid = models.ForeignKey(
         MethylationEPIC, on_delete=models.CASCADE)
 
+class MethylationLoci(models.Model):
+    """
+    Normalized lookup table that maps any type of Loci ID (IlmnID, name, 450k, 27k and EPIC v1 Loci) to its
+    EPIC v2 site. It's generated from MethylationEPIC when the data is loaded.
+    """
+    loci = models.CharField(max_length=25)
+    methylation_epic_v2_ilmnid = models.ForeignKey(
+        MethylationEPIC, on_delete=models.CASCADE)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['loci', 'methylation_epic_v2_ilmnid']),
+        ]
+
+
+class MethylationSiteDetails(models.Model):
+    """
+    Denormalized details of every EPIC v2 site name (name, chromosome position, aliases, CpG islands and genes) stored
+    as a ready-to-serve JSON document. It's generated from MethylationEPIC when the data is loaded.
+    """
+    name = models.CharField(max_length=15, primary_key=True)
+    document = models.TextField()
+
 # Fin Modelos para Methylation
 
 # Modelos para MiRNA
@@ -170,6 +193,12 @@ class MirnaXGene(models.Model):
 
     class Meta:
         db_table = 'modulector_mirnaxgen'
+        indexes = [
+            # Interactions of a miRNA/gene already sorted by descending score, so top-K and score threshold queries
+            # are answered with an index range scan instead of sorting all the interactions
+            models.Index(fields=['mirna', '-score', 'id'], name='mirnaxgen_mirna_score_idx'),
+            models.Index(fields=['gene', '-score', 'id'], name='mirnaxgen_gene_score_idx'),
+        ]
 
 
 class Pubmed(models.Model):
@@ -248,3 +277,13 @@ class MirTarBaseInteraction(models.Model):
         indexes = [
             models.Index(fields=['mirna', 'gene']),
         ]
+
+
+class DatasetVersion(models.Model):
+    """
+    Version of every reference dataset. It's changed every time the dataset is reloaded so cached data
+    generated from it is discarded. New versions are taken from a sequence (see cache_service.bump_dataset_version()).
+    """
+    dataset = models.CharField(max_length=50, unique=True)
+    version = models.PositiveIntegerField(default=1)
+    update_date = models.DateTimeField(auto_now=True)
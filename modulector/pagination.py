@@ -1,4 +1,15 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from functools import reduce
+from typing import Any, List, Optional, Tuple
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -6,3 +17,121 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 1000
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the ordering fields of the queryset plus 'id'. The next page is retrieved filtering
+    the rows after the last one of the current page (instead of using OFFSET), and no COUNT is executed, so every page
+    takes the same time regardless of its position. 'count' is always null and only forward navigation is available.
+    """
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = StandardResultsSetPagination.page_size_query_param
+    max_page_size = StandardResultsSetPagination.max_page_size
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.next_position: Optional[List[Any]] = None
+        self.request = None
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    @staticmethod
+    def get_keys(queryset: QuerySet) -> List[Tuple[str, bool]]:
+        """
+        Gets the (field, descending) pairs which define the position of a row. 'id' is always added as the last key to
+        break ties.
+        """
+        keys = [
+            (field.lstrip('-'), field.startswith('-'))
+            for field in queryset.query.order_by if isinstance(field, str)
+        ]
+        if not any(field in ('id', 'pk') for field, _ in keys):
+            keys.append(('id', False))
+        return keys
+
+    @staticmethod
+    def get_after_position_filter(keys: List[Tuple[str, bool]], position: List[Any]) -> Q:
+        """Generates the condition to get the rows after a position in lexicographic order of the keys."""
+        conditions = []
+        for i, (field, descending) in enumerate(keys):
+            previous_equal = {key_field: position[j] for j, (key_field, _) in enumerate(keys[:i])}
+            lookup = f'{field}__lt' if descending else f'{field}__gt'
+            conditions.append(Q(**previous_equal, **{lookup: position[i]}))
+        return reduce(lambda a, b: a | b, conditions)
+
+    def decode_cursor(self, request) -> Optional[List[Any]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf8'))
+        except (binascii.Error, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    @staticmethod
+    def encode_cursor(position: List[Any]) -> str:
+        data = json.dumps(position, default=str).encode('utf8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        keys = self.get_keys(queryset)
+        queryset = queryset.order_by(*[f'-{field}' if descending else field for field, descending in keys])
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            if len(position) != len(keys):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                queryset = queryset.filter(self.get_after_position_filter(keys, position))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Retrieves one extra row to know if there is a next page
+        results = list(queryset[:page_size + 1])
+        if len(results) > page_size:
+            results = results[:page_size]
+            last = results[-1]
+            self.next_position = [getattr(last, field) for field, _ in keys]
+        else:
+            self.next_position = None
+        return results
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True, 'example': None},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri', 'example': None},
+                'results': schema,
+            },
+        }
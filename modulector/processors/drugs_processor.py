@@ -4,16 +4,18 @@ import pathlib
 import sys
 
 import pandas as pd
-from django.db import transaction, connection
+from django.db import transaction
 
 from modulector.models import MirnaDrug
+from modulector.services import cache_service
+from modulector.utils import bulk_load
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler(sys.stdout))
 logger.setLevel(logging.INFO)
 
 
-def process():
+def process(incremental: bool = False) -> bulk_load.SyncResult:
     parent_dir = pathlib.Path(__file__).parent.absolute().parent
     file_path = os.path.join(parent_dir, "files/drugs.xls")
     logger.info("loading drugs info")
@@ -21,25 +23,16 @@ def process():
     data = pd.read_excel(file_path)
     data = data[data["Species"].str.contains("Homo sapiens")]
     data = data.drop(['DB', 'CID', 'Species', 'Year'], axis=1)
-    entities = []
+    data.columns = ['mature_mirna', 'mirbase_accession_id', 'small_molecule', 'fda_approved', 'detection_method',
+                    'condition', 'pubmed_id', 'reference', 'support', 'expression_pattern']
+    # We must prepend the hsa because the file we process does not have it
+    data['mature_mirna'] = 'hsa-' + data['mature_mirna']
+    data['fda_approved'] = data['fda_approved'] == 'approved'
+    data['mirbase_accession_id'] = data['mirbase_accession_id'].fillna('')
     with transaction.atomic():
         logger.info("inserting data")
-        for index, row in data.iterrows():
-            mature_mirna, mirbase_accession_id, small_molecule, fda, detection_method, condition, pmid, \
-            reference, suppport, expression_pattern = row
-            # We must prepend the hsa because the file we process does not have it
-            mature_mirna = 'hsa-' + mature_mirna
-            fda = (fda == 'approved')
-            if pd.isna(mirbase_accession_id):
-                mirbase_accession_id = ''
-
-            mirna_drug = MirnaDrug(mature_mirna=mature_mirna, mirbase_accession_id=mirbase_accession_id,
-                                   small_molecule=small_molecule,
-                                   fda_approved=fda, detection_method=detection_method, condition=condition,
-                                   pubmed_id=pmid,
-                                   reference=reference, support=suppport, expression_pattern=expression_pattern)
-            entities.append(mirna_drug)
-        with connection.cursor() as cursor:
-            cursor.execute("truncate table modulector_mirnadrugs")
-        MirnaDrug.objects.bulk_create(entities)
-        logger.info("data inserted")
+        result = bulk_load.refresh_table(MirnaDrug, data, incremental)
+        if result.changed:
+            cache_service.bump_dataset_version(cache_service.DRUGS_DATASET)
+        logger.info(f"data inserted: {result}")
+    return result
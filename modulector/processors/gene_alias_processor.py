@@ -4,16 +4,18 @@ import pathlib
 import sys
 
 import pandas as pd
-from django.db import transaction, connection
+from django.db import transaction
 
 from modulector.models import GeneAliases
+from modulector.services import cache_service
+from modulector.utils import bulk_load
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler(sys.stdout))
 logger.setLevel(logging.INFO)
 
 
-def process():
+def process(incremental: bool = False) -> bulk_load.SyncResult:
     parent_dir = pathlib.Path(__file__).parent.absolute().parent
     file_path = os.path.join(parent_dir, "files/gene_aliases.csv")
     delimiter = ","
@@ -21,24 +23,21 @@ def process():
     # loading files
     data = pd.read_csv(filepath_or_buffer=file_path, names=['current', 'old', 'other'],
                        delimiter=delimiter, encoding="ISO-8859-1", header=None, skiprows=1)
-    data = data[(data["old"].notnull() | data["other"].notnull())]
-    entities_to_insert = []
+    data = data[(data["old"].notnull() | data["other"].notnull())].copy()
+    # fix for specific case due to file interpretation, index 24222
+    data.loc[data["current"].isna() & (data["old"] == 'NAC') & data["other"].isna(), "current"] = 'NA'
+    data["current"] = data["current"].str.strip()
+    aliases = pd.concat([
+        data[["current", column]].set_axis(["gene_symbol", "alias"], axis=1) for column in ("old", "other")
+    ]).dropna(subset=["alias"])
+    # Keeps the file order (old aliases of every gene before the other ones) as the first alias match is used
+    aliases = aliases.sort_index(kind="stable")
+    aliases = aliases.assign(alias=aliases["alias"].str.split(",")).explode("alias")
+    aliases["alias"] = aliases["alias"].str.strip()
     with transaction.atomic():
         logger.info("inserting data")
-        for index, row in data.iterrows():
-            gene_symbol, old, new = row
-            # fix for specific case due to file interpretation, index 24222
-            if pd.isna(gene_symbol) and old == 'NAC' and pd.isna(new):
-                gene_symbol = 'NA'
-            gene_symbol = gene_symbol.strip()
-            aliases = []
-            if old and not pd.isna(old):
-                aliases.extend(old.split(","))
-            if new and not pd.isna(new):
-                aliases.extend(new.split(","))
-            for alias in aliases:
-                entities_to_insert.append(GeneAliases(gene_symbol=gene_symbol, alias=alias.strip()))
-        with connection.cursor() as cursor:
-            cursor.execute("truncate table modulector_gene_aliases")
-        GeneAliases.objects.bulk_create(entities_to_insert)
-        logger.info("data inserted")
+        result = bulk_load.refresh_table(GeneAliases, aliases, incremental)
+        if result.changed:
+            cache_service.bump_dataset_version(cache_service.GENE_ALIASES_DATASET)
+        logger.info(f"data inserted: {result}")
+    return result
@@ -0,0 +1,115 @@
+import logging
+import os
+import pathlib
+import sys
+from typing import Dict, Final, Optional
+
+import pandas as pd
+from django.db import connection
+
+from modulector.models import Mirna, MirnaSource, MirnaXGene
+from modulector.services import cache_service
+from modulector.utils import bulk_load, table_swap
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+# Columns of the mirDIP file
+COLUMNS: Final = ['GENE_SYMBOL', 'MICRORNA', 'SOURCE_NUMBER', 'INTEGRATED_RANK', 'SOURCES', 'SCORE_CLASS']
+
+# Number of rows of the file read and loaded at a time (the file has about 45 millions)
+CHUNK_SIZE: Final[int] = 1000000
+
+
+def _get_mirna_ids(mirna_ids: Dict[str, int], mirna_codes: pd.Series) -> int:
+    """
+    Adds to the dict of miRNA IDs the codes which are not in it, creating (without sequence) the miRNAs which don't
+    exist in the DB.
+    :return: Number of created miRNAs.
+    """
+    missing = set(mirna_codes.unique()) - mirna_ids.keys()
+    if not missing:
+        return 0
+    existing = dict(Mirna.objects.filter(mirna_code__in=missing).values_list('mirna_code', 'id'))
+    to_create = sorted(missing - existing.keys())
+    Mirna.objects.bulk_create([Mirna(mirna_code=code, mirna_sequence=None) for code in to_create],
+                              ignore_conflicts=True)
+    mirna_ids.update(Mirna.objects.filter(mirna_code__in=missing).values_list('mirna_code', 'id'))
+    return len(to_create)
+
+
+def _copy_other_sources(table: str, source_id: int) -> int:
+    """
+    Copies the interactions of the other sources (with their IDs) from the live MirnaXGene table into another table,
+    so they're kept when it's swapped.
+    :return: Number of copied interactions.
+    """
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in MirnaXGene._meta.concrete_fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {quote_name(table)} ({columns})
+            SELECT {columns} FROM {quote_name(MirnaXGene._meta.db_table)}
+            WHERE {quote_name(MirnaXGene._meta.get_field('mirna_source').column)} <> %s
+        """, [source_id])
+        return cursor.rowcount
+
+
+def _load(file_path: str, table: str) -> int:
+    """
+    Loads into a table with the structure of MirnaXGene the current interactions of the other sources and the
+    mirDIP interactions of a file.
+    :return: Number of loaded mirDIP interactions.
+    """
+    source = MirnaSource.objects.filter(name='mirdip').first()
+    if source is None:
+        raise Exception("MirnaSource not found with name=mirdip in 'modulector_mirnasource' table")
+
+    kept = _copy_other_sources(table, source.pk)
+    if kept:
+        logger.info(f'{kept} interactions of other sources kept')
+
+    mirna_ids = dict(Mirna.objects.values_list('mirna_code', 'id'))
+    rows = 0
+    created = 0
+    for chunk in pd.read_csv(file_path, header=None, names=COLUMNS, chunksize=CHUNK_SIZE):
+        created += _get_mirna_ids(mirna_ids, chunk['MICRORNA'])
+        data = pd.DataFrame({
+            'mirna': chunk['MICRORNA'].map(mirna_ids),
+            'gene': chunk['GENE_SYMBOL'],
+            'score': chunk['INTEGRATED_RANK'],
+            'mirna_source': source.pk,
+            'sources': chunk['SOURCES'],
+            'score_class': chunk['SCORE_CLASS'],
+        })
+        rows += bulk_load.copy_dataframe(MirnaXGene, data, table=table)
+        logger.info(f'{rows} rows loaded')
+
+    if created:
+        logger.info(f'{created} miRNAs were found in mirDIP but not in mature miRBase miRNAs')
+        cache_service.bump_dataset_version(cache_service.MIRBASE_DATASET)
+    return rows
+
+
+def process(file_path: Optional[str] = None) -> int:
+    """
+    Replaces the mirDIP interactions with the ones of the mirDIP Unidirectional search file without blocking the
+    queries on them (see table_swap.import_with_swap()). The whole table is swapped, so the interactions of the other
+    sources are copied into the new one. The ones added to the live table during the import are lost.
+    :param file_path: Path of the file. By default, files/mirDIP_Unidirectional_search.txt.
+    :return: Number of loaded interactions.
+    """
+    if file_path is None:
+        parent_dir = pathlib.Path(__file__).parent.absolute().parent
+        file_path = os.path.join(parent_dir, "files/mirDIP_Unidirectional_search.txt")
+    logger.info("loading mirDIP interactions")
+    rows = table_swap.import_with_swap(MirnaXGene, lambda table: _load(file_path, table))
+    cache_service.bump_dataset_version(cache_service.INTERACTIONS_DATASET)
+    return rows
+
+
+def rollback():
+    """Restores the interactions previous to the last import."""
+    table_swap.rollback_swap(MirnaXGene)
+    cache_service.bump_dataset_version(cache_service.INTERACTIONS_DATASET)
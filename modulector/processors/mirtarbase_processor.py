@@ -0,0 +1,63 @@
+import logging
+import os
+import pathlib
+import sys
+from typing import List, Optional
+
+import pandas as pd
+
+from modulector.models import MirTarBaseInteraction
+from modulector.utils import bulk_load, table_swap
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.INFO)
+
+
+def _clean_integer(values: pd.Series) -> pd.Series:
+    """Removes the decimal part of numbers read as floats (e.g. 17179747.0 to 17179747). Invalid values are ''."""
+    numbers = pd.to_numeric(values, errors='coerce').dropna()
+    return numbers.astype('int64').astype(str).reindex(values.index, fill_value='')
+
+
+def _to_array_literal(values: List[str]) -> str:
+    """Formats a list of strings as a PostgreSQL array literal for COPY."""
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for value in values)
+    return '{' + ','.join(f'"{value}"' for value in escaped) + '}'
+
+
+def _load(file_path: str, table: str) -> int:
+    """Loads the interactions of the hsa_MTI.csv file into a table with the structure of MirTarBaseInteraction."""
+    data = pd.read_csv(file_path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    experiments = data['Experiments'].str.split('//').map(
+        lambda values: [value.strip() for value in values if value.strip()]
+    )
+    rows = pd.DataFrame({
+        'mirtarbase_id': data['miRTarBase ID'],
+        'mirna': data['miRNA'],
+        'gene': data['Target Gene'],
+        'target_gene_entrez_id': _clean_integer(data['Target Gene (Entrez ID)']),
+        'experiments': experiments.map(_to_array_literal),
+        'support_type': data['Support Type'],
+        'pmid': _clean_integer(data['References (PMID)']),
+    })
+    return bulk_load.copy_dataframe(MirTarBaseInteraction, rows, table=table)
+
+
+def process(file_path: Optional[str] = None) -> int:
+    """
+    Replaces the miRTarBase interactions with the ones of the hsa_MTI.csv file without blocking the queries on them
+    (see table_swap.import_with_swap()).
+    :param file_path: Path of the file. By default, files/hsa_MTI.csv.
+    :return: Number of loaded interactions.
+    """
+    if file_path is None:
+        parent_dir = pathlib.Path(__file__).parent.absolute().parent
+        file_path = os.path.join(parent_dir, "files/hsa_MTI.csv")
+    logger.info("loading miRTarBase interactions")
+    return table_swap.import_with_swap(MirTarBaseInteraction, lambda table: _load(file_path, table))
+
+
+def rollback():
+    """Restores the interactions previous to the last import."""
+    table_swap.rollback_swap(MirTarBaseInteraction)
@@ -1,73 +1,90 @@
-import csv
 import logging
 import os
 import pathlib
 import sys
+import time
+from typing import Iterator, List, Tuple
 from fasta_reader import read_fasta
 
-import pandas as pd
-from django.db import transaction, connection
+from django.db import connection
 
-from modulector.models import Mirna
-from modulector.serializers import get_mirna_from_accession
+from modulector.models import Mirna, MirbaseIdMirna
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler(sys.stdout))
 logger.setLevel(logging.INFO)
 
 
-def process():
-    parent_dir = pathlib.Path(__file__).parent.absolute().parent
-    db_path = os.path.join(parent_dir, "files/mature.fa") # Download DB from mirbase for mature mirnas https://www.mirbase.org/ftp.shtml
-    file_path = os.path.join(parent_dir, "files/miraccs-adapted.xlsx")
-
-    # creo archivo miraccs-adapted.xlsx
-    csv_mature_file = open(file_path, 'w')
-    #data_mature_out = csv.writer(csv_mature_file, dialect='excel', delimiter='\t')
-    data_mature_out = csv.writer(csv_mature_file)
-    data_mature_out.writerow(['mimat', 'mirna', 'sequence'])
+def read_human_sequences(db_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Streams the human entries of a miRBase FASTA file (e.g. mature.fa).
+    :return: (accession ID, sequence) pairs in the file order.
+    """
     for item in read_fasta(db_path):
         defline = item.defline
         if "Homo sapiens" in defline:
-            data = defline.split(" ")
-            mirbase_id = data[0]
-            mimat_id = data[1]
-            sequence = item.sequence
-            data_mature_out.writerow([mimat_id, mirbase_id, sequence])
-    csv_mature_file.close()
+            # Deflines have the format '<miRNA> <accession ID> Homo sapiens <miRNA without species>'
+            mimat_id = defline.split(" ")[1]
+            yield mimat_id, item.sequence
 
-    logger.info("loading sequence info")
+
+def _get_update_query() -> str:
+    """
+    Generates the query which resolves the accession IDs to their mature miRNAs and updates the sequences of all of
+    them in a single statement. If a miRNA belongs to several accession IDs, the last one in the file wins.
+    """
     mirna_table = Mirna._meta.db_table
-    update_template = "UPDATE {} set mirna_sequence= '{}' where mirna_code in {}"
+    aliases_table = MirbaseIdMirna._meta.db_table
+    return f"""
+        WITH sequences AS (
+            SELECT * FROM unnest(%s::varchar[], %s::varchar[]) WITH ORDINALITY AS s(accession, sequence, position)
+        ), matches AS (
+            SELECT m.id AS mirna_id, s.accession, s.sequence, s.position
+            FROM sequences s
+            JOIN {aliases_table} a ON a.mirbase_accession_id = s.accession
+            JOIN {mirna_table} m ON m.mirna_code = a.mature_mirna
+            WHERE a.mature_mirna <> ''
+        ), resolved AS (
+            SELECT DISTINCT ON (mirna_id) mirna_id, accession, sequence
+            FROM matches
+            ORDER BY mirna_id, position DESC
+        ), updated AS (
+            UPDATE {mirna_table} m
+            SET mirna_sequence = r.sequence
+            FROM resolved r
+            WHERE m.id = r.mirna_id
+            RETURNING r.accession
+        )
+        SELECT
+            (SELECT count(*) FROM updated),
+            (SELECT count(DISTINCT accession) FROM updated),
+            (SELECT count(DISTINCT accession) FROM sequences WHERE accession NOT IN (SELECT accession FROM matches))
+    """
+
 
-    mimat_map = {}
-    # loading files
-    #data = pd.read_excel(io=file_path, usecols=[0, 1, 2], names=['mimat', 'mirna', 'sequence'])
-    data = pd.read_csv(file_path, usecols=[0, 1, 2], names=['mimat', 'mirna', 'sequence'])
-    data = data[data["mimat"].notnull()]
-    with transaction.atomic():
-        updates = []
-        for index, row in data.iterrows():
-            mimat, mirna, sequence = row
-            if mimat not in mimat_map:
-                mirnas = get_mirna_from_accession(mimat)
-                mimat_map[mimat] = mirnas
-            else:
-                mirnas = mimat_map[mimat]
-            mirna_values = []
-            mirna_values.extend("(")
-            for i, mirna in enumerate(mirnas):
-                value = "'" + mirna + "'"
-                if i != 0:
-                    value = ", " + value
-                mirna_values.extend(value)
-            mirna_values.extend(")")
-            mirna_values = ''.join(mirna_values)
+def load_sequences(sequences: List[Tuple[str, str]]) -> Tuple[int, int, int]:
+    """
+    Updates the sequences of the miRNAs of a list of accession IDs.
+    :param sequences: (accession ID, sequence) pairs.
+    :return: Number of updated miRNAs, matched accession IDs and skipped accession IDs (without miRNAs in the DB).
+    Accession IDs whose miRNAs were all updated by a later accession ID are neither matched nor skipped.
+    """
+    accessions = [accession for accession, _ in sequences]
+    with connection.cursor() as cursor:
+        cursor.execute(_get_update_query(), [accessions, [sequence for _, sequence in sequences]])
+        return cursor.fetchone()
 
-            if mirna_values != "()":
-                updates.append(update_template.format(mirna_table, sequence, mirna_values))
-        logger.info(len(updates))
-        for update in updates:
-            with connection.cursor() as cursor:
-                cursor.execute(update)
-        logger.info("mirna sequence updated")
+
+def process():
+    parent_dir = pathlib.Path(__file__).parent.absolute().parent
+    # Download DB from mirbase for mature mirnas https://www.mirbase.org/ftp.shtml
+    db_path = os.path.join(parent_dir, "files/mature.fa")
+
+    logger.info("loading sequence info")
+    start = time.perf_counter()
+    sequences = list(read_human_sequences(db_path))
+    updated, matched, skipped = load_sequences(sequences)
+    superseded = len({accession for accession, _ in sequences}) - matched - skipped
+    logger.info(f"mirna sequence updated: {updated} miRNAs from {matched} accession IDs ({skipped} accession IDs "
+                f"without miRNAs skipped, {superseded} superseded by later accession IDs) in "
+                f"{time.perf_counter() - start:.2f} seconds")
@@ -1,11 +1,13 @@
 import logging
-from typing import List, Optional, Dict, Set
+from typing import Any, List, Optional, Dict, Set, Tuple
 
-from django.db.models import Q
+from asgiref.sync import sync_to_async
+from django.db.models import QuerySet
 from rest_framework import serializers
 from ModulectorBackend.settings import USE_PUBMED_API, PUBMED_API_TIMEOUT
-from modulector.models import MirnaXGene, MirnaSource, Mirna, MirnaColumns, MirbaseIdMirna, MirnaDisease, MirnaDrug, MirTarBaseInteraction
-from modulector.services import url_service, pubmed_service
+from modulector.models import MirnaXGene, MirnaSource, Mirna, MirnaColumns, MirbaseIdMirna, MirnaDisease, MirnaDrug, MirTarBaseInteraction, \
+    Pubmed
+from modulector.services import url_service, pubmed_service, mirna_alias_service
 from modulector.utils import link_builder
 
 
@@ -39,6 +41,26 @@ class MirnaSourceSerializer(serializers.ModelSerializer):
         return source
 
 
+class MirnaXGenListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of miRNA-Gene interactions. When PubMeds are requested, the stored PubMed URLs of the entire
+    page are retrieved in a single query instead of one per interaction.
+    """
+
+    def to_representation(self, data):
+        interactions = list(data.all() if isinstance(data, QuerySet) else data)
+        # Async views retrieve them before serializing the page (see aget_page_pubmeds())
+        if self.context.get('include_pubmeds') and 'page_pubmeds' not in self.context:
+            self.context['page_pubmeds'] = get_pubmeds_by_mirna_and_gene(interactions)
+            if USE_PUBMED_API:
+                # NCBI API is queried concurrently for all the different terms of the page
+                self.context['page_api_pubmeds'] = pubmed_service.get_pubmed_ids_by_terms(
+                    {(interaction.mirna.mirna_code, interaction.gene) for interaction in interactions},
+                    timeout=PUBMED_API_TIMEOUT
+                )
+        return super().to_representation(interactions)
+
+
 class MirnaXGenSerializer(serializers.ModelSerializer):
     source_name = serializers.CharField(
         read_only=True, source='mirna_source.name')
@@ -52,6 +74,7 @@ class MirnaXGenSerializer(serializers.ModelSerializer):
         model = MirnaXGene
         fields = ['id', 'mirna', 'gene', 'score',
                   'source_name', 'pubmeds', 'sources', 'score_class', 'mirna_aliases', 'gene_aliases']
+        list_serializer_class = MirnaXGenListSerializer
     
     def get_pubmeds(self, mirna_gene_interaction: MirnaXGene) -> Set[str]:
         """
@@ -64,13 +87,25 @@ class MirnaXGenSerializer(serializers.ModelSerializer):
         if not self.context["include_pubmeds"]:
             return pubmed_urls
 
-        pubmed_urls.update(
-            list(mirna_gene_interaction.pubmed.values_list('pubmed_url', flat=True))
-        )
-
-        # If the api call is enabled, it will query the API and get the pubmeds
+        # If the interaction is serialized as part of a page, the stored PubMeds were already retrieved
         mirna = mirna_gene_interaction.mirna.mirna_code
         gene = mirna_gene_interaction.gene
+        page_pubmeds = self.context.get('page_pubmeds')
+        if page_pubmeds is not None:
+            pubmed_urls.update(page_pubmeds.get((mirna, gene), []))
+        else:
+            pubmed_urls.update(
+                list(mirna_gene_interaction.pubmed.values_list('pubmed_url', flat=True))
+            )
+
+        # If the api call is enabled, it will query the API and get the pubmeds. Terms that failed for the page are
+        # omitted keeping the stored PubMeds
+        page_api_pubmeds = self.context.get('page_api_pubmeds')
+        if page_api_pubmeds is not None:
+            api_pubmeds = page_api_pubmeds.get((mirna, gene), set())
+            pubmed_urls.update([link_builder.build_pubmed_url(pubmed_id) for pubmed_id in api_pubmeds])
+            return pubmed_urls
+
         term = pubmed_service.build_search_term(mirna, gene)
         if USE_PUBMED_API:  # Checks if the api call is enabled in the settings
             try:
@@ -187,6 +222,45 @@ class MirnaDrugsSerializer(serializers.ModelSerializer):
         return link_builder.build_pubmed_url(drug.pubmed_id)
 
 
+def get_pubmeds_by_mirna_and_gene(interactions: List[MirnaXGene]) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Retrieves from DB, in a single query, the stored PubMed URLs of a list of miRNA-Gene interactions.
+    :param interactions: miRNA-Gene interactions with their miRNA already loaded
+    :return: Dict with the PubMed URLs grouped by (miRNA code, gene)
+    """
+    keys = {(interaction.mirna.mirna_code, interaction.gene) for interaction in interactions}
+    pubmeds: Dict[Tuple[str, str], List[str]] = {}
+    if not keys:
+        return pubmeds
+
+    # The query gets the cartesian product of miRNAs and genes so the pairs are filtered here
+    records = Pubmed.objects.filter(
+        mirna_code__in={mirna for mirna, _ in keys},
+        gene__in={gene for _, gene in keys}
+    ).values_list('mirna_code', 'gene', 'pubmed_url')
+    for mirna_code, gene, pubmed_url in records:
+        if (mirna_code, gene) in keys:
+            pubmeds.setdefault((mirna_code, gene), []).append(pubmed_url)
+
+    return pubmeds
+
+
+async def aget_page_pubmeds(interactions: List[MirnaXGene]) -> Dict[str, Any]:
+    """
+    Retrieves the PubMeds of a page of miRNA-Gene interactions for MirnaXGenListSerializer from an async view. The
+    stored PubMeds are queried in a thread, while the NCBI API is awaited in the event loop, so no thread waits for it.
+    :param interactions: miRNA-Gene interactions with their miRNA already loaded
+    :return: Entries to add to the serializer context
+    """
+    context: Dict[str, Any] = {'page_pubmeds': await sync_to_async(get_pubmeds_by_mirna_and_gene)(interactions)}
+    if USE_PUBMED_API:
+        context['page_api_pubmeds'] = await pubmed_service.aget_pubmed_ids_by_terms(
+            {(interaction.mirna.mirna_code, interaction.gene) for interaction in interactions},
+            timeout=PUBMED_API_TIMEOUT
+        )
+    return context
+
+
 def get_mirna_aliases(mirna_code: str) -> List[str]:
     """
     Gets all the aliases for a miRNA code (not duplicates)
@@ -211,29 +285,21 @@ def get_mirna_aliases(mirna_code: str) -> List[str]:
 
 def get_mirna_from_accession(accession_id: str) -> List[str]:
     """
-    Retrieves from DB all the mature miRNA identifiers (not duplicates) for a specific accession id.
+    Retrieves all the mature miRNA identifiers (not duplicates) for a specific accession id from the in-memory
+    alias index.
     :param accession_id: Accession id to make the query
     :return: List of related mature miRNA identifiers
     """
-    return list(
-        MirbaseIdMirna.objects.filter(
-        mirbase_accession_id=accession_id
-        ).values_list('mature_mirna', flat=True).distinct()
-    )
+    return mirna_alias_service.get_mature_mirnas(accession_id)
 
 
 def get_accession_from_mirna(mirna_code: str) -> Optional[str]:
     """
-    Retrieves an accession id from a miRNA code.
+    Retrieves an accession id from a miRNA code using the in-memory alias index.
     :param mirna_code: miRNA code, previous miRNA code, or accession ID to make the query
     :return: Accession id if found, None otherwise
     """
-    record = MirbaseIdMirna.objects.filter(
-        Q(mirbase_accession_id=mirna_code) |
-        Q(mature_mirna=mirna_code) |
-        Q(previous_mature_mirna=mirna_code)
-    ).only('mirbase_accession_id').first()
-    return record.mirbase_accession_id if record is not None else None
+    return mirna_alias_service.get_accession(mirna_code)
 
 
 class MirTarBaseInteractionSerializer(serializers.ModelSerializer):
@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Final, Iterable, List, Optional
+from django.core.cache import caches
+from django.db import DatabaseError, connection, transaction
+from ModulectorBackend.settings import DEBUG, REFERENCE_CACHE_ALIAS, REFERENCE_CACHE_TIMEOUT, \
+    DATASET_VERSION_CHECK_INTERVAL, METRICS_LOG_INTERVAL
+from modulector.models import DatasetVersion
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+# Reference datasets. Their versions are stored in the DatasetVersion table and taken from this sequence
+DATASET_VERSION_SEQUENCE: Final[str] = 'modulector_datasetversion_version_seq'
+MIRBASE_DATASET: Final[str] = 'mirbase'
+GENE_ALIASES_DATASET: Final[str] = 'gene_aliases'
+URL_TEMPLATES_DATASET: Final[str] = 'url_templates'
+METHYLATION_DATASET: Final[str] = 'methylation'
+INTERACTIONS_DATASET: Final[str] = 'interactions'
+DRUGS_DATASET: Final[str] = 'drugs'
+REFSEQ_MAPPINGS_DATASET: Final[str] = 'refseq_mappings'
+
+# Cache namespaces and the dataset they are generated from
+MIRNA_ALIASES_NAMESPACE: Final[str] = 'mirna_aliases'
+GENE_ALIASES_NAMESPACE: Final[str] = 'gene_aliases'
+URL_TEMPLATES_NAMESPACE: Final[str] = 'url_templates'
+
+NAMESPACES_DATASETS: Final[Dict[str, str]] = {
+    MIRNA_ALIASES_NAMESPACE: MIRBASE_DATASET,
+    GENE_ALIASES_NAMESPACE: GENE_ALIASES_DATASET,
+    URL_TEMPLATES_NAMESPACE: URL_TEMPLATES_DATASET,
+}
+
+# Used to distinguish cached None values from missing entries
+_MISSING = object()
+
+
+class CacheStats:
+    """
+    Hits and misses of every namespace in the current process. They're logged every METRICS_LOG_INTERVAL seconds
+    (when there are lookups).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._log_time = time.monotonic()
+
+    def record(self, namespace: str, hit: bool):
+        now = time.monotonic()
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {'hits': 0, 'misses': 0})
+            counters['hits' if hit else 'misses'] += 1
+            must_log = 0 < METRICS_LOG_INTERVAL <= now - self._log_time
+            if must_log:
+                self._log_time = now
+        if must_log:
+            logger.info(f'Reference cache stats: {self.as_dict()}')
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Gets the hits, misses and hit rate by namespace."""
+        with self._lock:
+            return {
+                namespace: {
+                    **counters,
+                    'hit_rate': counters['hits'] / (counters['hits'] + counters['misses'])
+                }
+                for namespace, counters in self._counters.items()
+            }
+
+
+stats = CacheStats()
+
+# Dataset versions read from the DB and the time they were read
+_versions: Dict[str, int] = {}
+_versions_check_time: Dict[str, float] = {}
+_versions_lock = threading.Lock()
+
+
+def get_dataset_version(dataset: str) -> int:
+    """
+    Gets the current version of a dataset. It's read from the DB at most every DATASET_VERSION_CHECK_INTERVAL
+    seconds, so reloads made by other processes are noticed after that time.
+    :param dataset: Dataset name.
+    :return: Dataset version. 0 if it couldn't be read from the DB.
+    """
+    now = time.monotonic()
+    version = get_checked_dataset_version(dataset)
+    if version is not None:
+        return version
+
+    try:
+        version = DatasetVersion.objects.filter(dataset=dataset).values_list('version', flat=True).first() or 1
+    except DatabaseError as ex:
+        logger.warning(f'Version of dataset "{dataset}" could not be read: {ex}')
+        version = 0
+
+    with _versions_lock:
+        _versions[dataset] = version
+        _versions_check_time[dataset] = now
+    return version
+
+
+def get_checked_dataset_version(dataset: str) -> Optional[int]:
+    """
+    Gets the version of a dataset only if it was read from the DB less than DATASET_VERSION_CHECK_INTERVAL seconds
+    ago, so it never queries the DB (e.g. it can be called from the event loop).
+    :param dataset: Dataset name.
+    :return: Dataset version or None if it must be read from the DB.
+    """
+    with _versions_lock:
+        if dataset in _versions and time.monotonic() - _versions_check_time[dataset] < DATASET_VERSION_CHECK_INTERVAL:
+            return _versions[dataset]
+    return None
+
+
+def bump_dataset_version(dataset: str) -> int:
+    """
+    Changes the version of a dataset. It must be called after the dataset is reloaded so all the cached data
+    generated from the old version is discarded in every process. The new version is taken from a sequence, so it's
+    never reused even if the reload is rolled back, and it's only used by this process once the reload is committed.
+    :param dataset: Dataset name.
+    :return: New version.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s)', [DATASET_VERSION_SEQUENCE])
+        version = cursor.fetchone()[0]
+    DatasetVersion.objects.update_or_create(dataset=dataset, defaults={'version': version})
+
+    def set_version():
+        with _versions_lock:
+            _versions[dataset] = version
+            _versions_check_time[dataset] = time.monotonic()
+        logger.info(f'Dataset "{dataset}" is now in version {version}')
+
+    transaction.on_commit(set_version)
+    return version
+
+
+def _get_key(namespace: str, key: str) -> str:
+    """Generates a cache key that is valid for any backend, including the dataset version."""
+    version = get_dataset_version(NAMESPACES_DATASETS[namespace])
+    return f'{namespace}:{version}:' + hashlib.md5(key.encode('utf8')).hexdigest()
+
+
+def get_or_set(namespace: str, key: str, compute: Callable[[], Any]) -> Any:
+    """
+    Gets a value from the reference data cache, computing and storing it in case it's not present.
+    :param namespace: Namespace of the value. It defines the dataset which invalidates it.
+    :param key: Key of the value inside the namespace.
+    :param compute: Function which generates the value. It must return a picklable object.
+    :return: Cached or computed value.
+    """
+    cache_key = _get_key(namespace, key)
+    reference_cache = caches[REFERENCE_CACHE_ALIAS]
+    value = reference_cache.get(cache_key, _MISSING)
+    stats.record(namespace, hit=value is not _MISSING)
+    if value is _MISSING:
+        value = compute()
+        reference_cache.set(cache_key, value, REFERENCE_CACHE_TIMEOUT)
+    return value
+
+
+def get_or_set_many(namespace: str, keys: Iterable[str],
+                    compute: Callable[[List[str]], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Same as get_or_set() for several keys, retrieving all the cached values in a single operation and computing all
+    the missing ones in a single call.
+    :param namespace: Namespace of the values. It defines the dataset which invalidates them.
+    :param keys: Keys of the values inside the namespace.
+    :param compute: Function which receives the missing keys and generates a dict with a value for each of them.
+    :return: Dict with the cached or computed value of every key.
+    """
+    cache_keys = {key: _get_key(namespace, key) for key in keys}
+    reference_cache = caches[REFERENCE_CACHE_ALIAS]
+    cached = reference_cache.get_many(list(cache_keys.values()))
+    values = {key: cached[cache_key] for key, cache_key in cache_keys.items() if cache_key in cached}
+    for key in cache_keys:
+        stats.record(namespace, hit=key in values)
+
+    missing = [key for key in cache_keys if key not in values]
+    if missing:
+        computed = compute(missing)
+        reference_cache.set_many(
+            {cache_keys[key]: value for key, value in computed.items()}, REFERENCE_CACHE_TIMEOUT
+        )
+        values.update(computed)
+    return values
@@ -0,0 +1,158 @@
+import logging
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from django.db import DatabaseError
+from ModulectorBackend.settings import DEBUG
+from modulector.models import GeneAliases
+from modulector.services import cache_service
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+
+class GeneSynonymIndex:
+    """
+    Read-only snapshot of the GeneAliases table as a synonym graph: every alias and gene symbol points to its
+    canonical gene symbol, which points to all its aliases. Gene symbols and aliases are interned and stored once in
+    tuples and the gene symbol -> aliases relation is kept as a CSR structure (offsets + indexes) in compact unsigned
+    int arrays.
+    """
+    __slots__ = ('gene_symbols', 'aliases', '_alias_offsets', '_alias_indexes', '_lookup')
+
+    def __init__(self, rows: List[Tuple[str, str]]):
+        """
+        Builds the index.
+        :param rows: (gene_symbol, alias) tuples ordered by ID.
+        """
+        symbol_positions: Dict[str, int] = {}
+        alias_positions: Dict[str, int] = {}
+        aliases_by_symbol: List[List[int]] = []
+        lookup: Dict[str, int] = {}
+
+        for gene_symbol, alias in rows:
+            symbol_pos = symbol_positions.get(gene_symbol)
+            if symbol_pos is None:
+                symbol_pos = len(aliases_by_symbol)
+                symbol_positions[sys.intern(gene_symbol)] = symbol_pos
+                aliases_by_symbol.append([])
+
+            alias_pos = alias_positions.get(alias)
+            if alias_pos is None:
+                alias_pos = len(alias_positions)
+                alias_positions[sys.intern(alias)] = alias_pos
+            if alias_pos not in aliases_by_symbol[symbol_pos]:
+                aliases_by_symbol[symbol_pos].append(alias_pos)
+
+            # Every gene is resolved to the gene symbol of the first row (by ID) which has it as alias or gene symbol
+            for key in (alias, gene_symbol):
+                lookup.setdefault(sys.intern(key), symbol_pos)
+
+        self.gene_symbols: Tuple[str, ...] = tuple(symbol_positions)
+        self.aliases: Tuple[str, ...] = tuple(alias_positions)
+        self._alias_offsets = array('I', [0])
+        self._alias_indexes = array('I')
+        for alias_list in aliases_by_symbol:
+            self._alias_indexes.extend(alias_list)
+            self._alias_offsets.append(len(self._alias_indexes))
+        self._lookup = lookup
+
+    def __len__(self) -> int:
+        return len(self._lookup)
+
+    def get_gene_symbol(self, gene: str) -> Optional[str]:
+        """
+        Gets the canonical gene symbol of a gene symbol or alias.
+        :param gene: Gene symbol or alias.
+        :return: Gene symbol if found, None otherwise.
+        """
+        symbol_pos = self._lookup.get(gene)
+        return self.gene_symbols[symbol_pos] if symbol_pos is not None else None
+
+    def get_aliases(self, gene: str) -> List[str]:
+        """
+        Gets all the aliases of a gene.
+        :param gene: Gene symbol or alias.
+        :return: Aliases of the gene (in the table order) followed by the gene symbol and the gene itself, without
+        duplicates. Empty list if it was not found.
+        """
+        symbol_pos = self._lookup.get(gene)
+        if symbol_pos is None:
+            return []
+
+        start, end = self._alias_offsets[symbol_pos], self._alias_offsets[symbol_pos + 1]
+        aliases = [self.aliases[alias_pos] for alias_pos in self._alias_indexes[start:end]]
+        # Adds the gene_symbol and the gene to not omit them in the future search. Removes duplicates
+        # preserving the order
+        return list(dict.fromkeys(aliases + [self.gene_symbols[symbol_pos], gene]))
+
+
+_index: Optional[GeneSynonymIndex] = None
+_index_version: Optional[int] = None
+_index_lock = threading.Lock()
+
+
+def build_index() -> GeneSynonymIndex:
+    """Generates a new index from the current content of the GeneAliases table."""
+    rows = GeneAliases.objects.order_by('id').values_list('gene_symbol', 'alias')
+    index = GeneSynonymIndex(list(rows))
+    logger.debug(f'Gene synonym index built with {len(index.gene_symbols)} gene symbols and {len(index)} keys')
+    return index
+
+
+def get_index() -> GeneSynonymIndex:
+    """
+    Gets the process-wide index. It's loaded from the shared cache (or built from the DB) in case it wasn't loaded
+    yet or the gene aliases dataset was reloaded.
+    """
+    global _index, _index_version
+    version = cache_service.get_dataset_version(cache_service.GENE_ALIASES_DATASET)
+    index = _index
+    if index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = cache_service.get_or_set(cache_service.GENE_ALIASES_NAMESPACE, 'index', build_index)
+                _index_version = version
+            index = _index
+    return index
+
+
+def warm_up():
+    """Loads the index at startup. DB errors are only logged as the table could not be created yet."""
+    try:
+        get_index()
+    except DatabaseError as ex:
+        logger.warning(f'Gene synonym index could not be loaded at startup: {ex}')
+
+
+def get_gene_symbols(genes: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Resolves a batch of genes to their canonical gene symbols in a single pass over the process-wide index.
+    :param genes: Gene symbols or aliases.
+    :return: Iterator of (input gene, gene symbol or None) pairs in the input order.
+    """
+    index = get_index()
+    for gene in genes:
+        yield gene, index.get_gene_symbol(gene)
+
+
+def get_genes_aliases(genes: Sequence[str]) -> Dict[str, List[str]]:
+    """
+    Gets the aliases of a list of genes from the process-wide index.
+    :param genes: Gene symbols or aliases.
+    :return: Dict with the aliases of every gene. Empty list for genes that were not found.
+    """
+    index = get_index()
+    return {gene: index.get_aliases(gene) for gene in genes}
+
+
+def get_gene_aliases(gene: str) -> List[str]:
+    """
+    Gets the aliases of a gene.
+    :param gene: Gene symbol or alias.
+    :return: Aliases of the gene, including the gene symbol and the gene itself. Empty list if it was not found.
+    """
+    return get_index().get_aliases(gene)
@@ -0,0 +1,239 @@
+import itertools
+from typing import Any, Dict, Final, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from django.db import connection
+from modulector.models import Mirna, MirnaSource, MirnaXGene
+from modulector.serializers import get_mirna_aliases
+from modulector.services import gene_alias_service, interactions_snapshot_service
+from modulector.services.interactions_snapshot_service import InteractionsSnapshot
+
+# Fields of every interaction returned by get_interactions_by_input()
+INTERACTION_FIELDS = ('id', 'mirna', 'gene', 'score', 'source_name', 'sources', 'score_class')
+
+# Number of cells retrieved from the DB at a time to fill the score matrix
+SCORE_MATRIX_FETCH_SIZE: Final[int] = 100000
+
+
+def _get_batch_query(group_by_mirna: bool, filter_other: bool, filter_score: bool, limit: bool) -> str:
+    """
+    Generates the query which joins the aliases of the grouping identifiers (with the position of the input they
+    belong to) against MirnaXGene. The other identifiers, the score and the number of interactions per alias are
+    optional filters. When limited, the top interactions of every alias are read in order from the score indexes
+    (see MirnaXGene.Meta), so they are not sorted.
+    """
+    interactions_table = MirnaXGene._meta.db_table
+    mirnas_table = Mirna._meta.db_table
+    sources_table = MirnaSource._meta.db_table
+
+    if group_by_mirna:
+        alias_condition = "x.mirna_id = m.id"
+        other_condition = "x.gene = ANY(%s)"
+    else:
+        alias_condition = "x.gene = i.identifier"
+        other_condition = "m.mirna_code = ANY(%s)"
+
+    conditions = ([other_condition] if filter_other else []) + (["x.score >= %s"] if filter_score else [])
+    if limit:
+        interactions = f"""
+            CROSS JOIN LATERAL (
+                SELECT * FROM {interactions_table} x
+                WHERE {' AND '.join([alias_condition] + conditions)}
+                ORDER BY x.score DESC, x.id
+                LIMIT %s
+            ) x
+        """
+        where = ""
+    else:
+        interactions = f"JOIN {interactions_table} x ON {alias_condition}"
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    if group_by_mirna:
+        joins = f"""
+            JOIN {mirnas_table} m ON m.mirna_code = i.identifier
+            {interactions}
+        """
+    else:
+        joins = f"""
+            {interactions}
+            JOIN {mirnas_table} m ON m.id = x.mirna_id
+        """
+
+    return f"""
+        SELECT i.position, x.id, m.mirna_code, x.gene, x.score, s.name, x.sources, x.score_class
+        FROM unnest(%s::varchar[], %s::int[]) AS i(identifier, position)
+        {joins}
+        JOIN {sources_table} s ON s.id = x.mirna_source_id
+        {where}
+        ORDER BY i.position, x.score DESC, x.id
+    """
+
+
+def _flatten_aliases(aliases_by_input: Sequence[List[str]]) -> Tuple[List[str], List[int]]:
+    """Generates the parallel arrays of (alias, position of the input it belongs to) sent to the DB."""
+    identifiers: List[str] = []
+    positions: List[int] = []
+    for position, aliases in enumerate(aliases_by_input):
+        identifiers.extend(aliases)
+        positions.extend([position] * len(aliases))
+    return identifiers, positions
+
+
+def get_interactions_by_input(mirnas: Optional[Sequence[str]], genes: Optional[Sequence[str]], score: Optional[float],
+                              limit: Optional[int] = None) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Gets the interactions between a list of miRNAs and a list of genes in a single query. All the aliases are
+    resolved in bulk and the rows are read with a server-side cursor, so the result can be streamed. The current
+    interactions snapshot is used instead of the DB if it's enabled.
+    :param mirnas: miRNA codes or accession IDs. If None, interactions with any miRNA are returned.
+    :param genes: Gene symbols or aliases. If None, interactions with any gene are returned.
+    :param score: Minimum score of the interactions. None to not filter by score.
+    :param limit: Maximum number of interactions (the ones with the highest scores) of every input. None to return
+    all of them.
+    :return: Iterator of (input identifier, interactions) pairs in the input order. Interactions are grouped by
+    input miRNA, or by input gene if no miRNAs are provided, and sorted by descending score. When both lists are
+    provided, every interaction also contains the input genes it matched ('input_genes').
+    """
+    if not mirnas and not genes:
+        raise ValueError("'mirnas' or 'genes' are mandatory")
+
+    genes_aliases = gene_alias_service.get_genes_aliases(genes) if genes else {}
+    group_by_mirna = bool(mirnas)
+    if group_by_mirna:
+        inputs = mirnas
+        identifiers, positions = _flatten_aliases([get_mirna_aliases(mirna) for mirna in mirnas])
+        other_identifiers = list({alias for aliases in genes_aliases.values() for alias in aliases})
+    else:
+        inputs = genes
+        identifiers, positions = _flatten_aliases([genes_aliases[gene] for gene in genes])
+        other_identifiers = []
+
+    # Input genes that every gene alias belongs to
+    input_genes_by_alias: Dict[str, List[str]] = {}
+    if group_by_mirna:
+        for gene, aliases in genes_aliases.items():
+            for alias in aliases:
+                input_genes_by_alias.setdefault(alias, []).append(gene)
+
+    filter_other = group_by_mirna and bool(genes)
+    snapshot = interactions_snapshot_service.get_snapshot()
+    if snapshot is not None:
+        yield from _iter_snapshot_interactions(snapshot, inputs, identifiers, positions, group_by_mirna,
+                                               other_identifiers if filter_other else None, score, limit,
+                                               input_genes_by_alias)
+        return
+
+    params: List[Any] = [identifiers, positions]
+    if filter_other:
+        params.append(other_identifiers)
+    if score is not None:
+        params.append(score)
+    if limit is not None:
+        params.append(limit)
+    query = _get_batch_query(group_by_mirna, filter_other, score is not None, limit is not None)
+
+    next_position = 0
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(query, params)
+        for position, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+            # Inputs without interactions
+            for empty_position in range(next_position, position):
+                yield inputs[empty_position], []
+            next_position = position + 1
+
+            # Every alias returns its top interactions, so the top ones of the input are the first of the merge
+            interactions = []
+            for _, interaction_id, mirna_code, gene, interaction_score, source_name, sources, score_class in \
+                    itertools.islice(rows, limit):
+                interaction = dict(zip(INTERACTION_FIELDS, (
+                    interaction_id, mirna_code, gene, str(interaction_score), source_name,
+                    sources.split('|') if sources else [], score_class
+                )))
+                if filter_other:
+                    interaction['input_genes'] = input_genes_by_alias.get(gene, [])
+                interactions.append(interaction)
+            yield inputs[position], interactions
+
+    for empty_position in range(next_position, len(inputs)):
+        yield inputs[empty_position], []
+
+
+def _iter_snapshot_interactions(
+        snapshot: InteractionsSnapshot, inputs: Sequence[str], identifiers: List[str], positions: List[int],
+        group_by_mirna: bool, other_identifiers: Optional[List[str]], score: Optional[float], limit: Optional[int],
+        input_genes_by_alias: Dict[str, List[str]]
+) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Same as get_interactions_by_input() reading the interactions from a columnar snapshot instead of the DB."""
+    column = 'mirna' if group_by_mirna else 'gene'
+    other_codes = snapshot.encode('gene', other_identifiers) if other_identifiers is not None else None
+    rows, match_positions, match_rows = snapshot.select_by_position(
+        column, snapshot.encode_pairs(column, identifiers, positions), other_codes, score
+    )
+    bounds = np.searchsorted(match_positions, np.arange(len(inputs) + 1))
+
+    for position, input_identifier in enumerate(inputs):
+        interactions = []
+        end = bounds[position + 1] if limit is None else min(bounds[position + 1], bounds[position] + limit)
+        for row in match_rows[bounds[position]:end]:
+            gene = snapshot.decode('gene', rows['gene'][row])
+            sources = snapshot.decode('sources', rows['sources'][row])
+            interaction = dict(zip(INTERACTION_FIELDS, (
+                int(rows['id'][row]), snapshot.decode('mirna', rows['mirna'][row]), gene,
+                f"{rows['score'][row]:.4f}", snapshot.decode('source_name', rows['source_name'][row]),
+                sources.split('|') if sources else [], snapshot.decode('score_class', rows['score_class'][row])
+            )))
+            if other_identifiers is not None:
+                interaction['input_genes'] = input_genes_by_alias.get(gene, [])
+            interactions.append(interaction)
+        yield input_identifier, interactions
+
+
+def _get_score_matrix_query() -> str:
+    """
+    Generates the query which gets the maximum score of every (miRNA position, gene position) cell joining the
+    aliases of both lists against MirnaXGene.
+    """
+    interactions_table = MirnaXGene._meta.db_table
+    mirnas_table = Mirna._meta.db_table
+
+    return f"""
+        SELECT mi.position, gi.position, max(x.score)
+        FROM unnest(%s::varchar[], %s::int[]) AS mi(identifier, position)
+        JOIN {mirnas_table} m ON m.mirna_code = mi.identifier
+        JOIN {interactions_table} x ON x.mirna_id = m.id
+        JOIN unnest(%s::varchar[], %s::int[]) AS gi(identifier, position) ON gi.identifier = x.gene
+        GROUP BY mi.position, gi.position
+    """
+
+
+def get_score_matrix(mirnas: Sequence[str], genes: Sequence[str]) -> np.ndarray:
+    """
+    Builds the dense matrix of interaction scores between a list of miRNAs and a list of genes in a single query.
+    All the aliases are considered and, if several interactions fall in the same cell, the maximum score is kept.
+    The current interactions snapshot is used instead of the DB if it's enabled.
+    :param mirnas: miRNA codes or accession IDs (rows). Must not contain duplicates.
+    :param genes: Gene symbols or aliases (columns). Must not contain duplicates.
+    :return: float32 matrix of shape (len(mirnas), len(genes)) with NaN where there is no interaction.
+    """
+    matrix = np.full((len(mirnas), len(genes)), np.nan, dtype=np.float32)
+    genes_aliases = gene_alias_service.get_genes_aliases(genes)
+    mirna_identifiers, mirna_positions = _flatten_aliases([get_mirna_aliases(mirna) for mirna in mirnas])
+    gene_identifiers, gene_positions = _flatten_aliases([genes_aliases[gene] for gene in genes])
+
+    snapshot = interactions_snapshot_service.get_snapshot()
+    if snapshot is not None:
+        return snapshot.score_matrix(
+            snapshot.encode_pairs('mirna', mirna_identifiers, mirna_positions),
+            snapshot.encode_pairs('gene', gene_identifiers, gene_positions),
+            matrix.shape
+        )
+
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(
+            _get_score_matrix_query(),
+            [mirna_identifiers, mirna_positions, gene_identifiers, gene_positions]
+        )
+        while rows := cursor.fetchmany(SCORE_MATRIX_FETCH_SIZE):
+            cells = np.array(rows, dtype=np.float64)
+            matrix[cells[:, 0].astype(np.intp), cells[:, 1].astype(np.intp)] = cells[:, 2]
+
+    return matrix
@@ -0,0 +1,398 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, Final, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from django.db import connection
+from ModulectorBackend.settings import DEBUG, DATASET_VERSION_CHECK_INTERVAL, INTERACTIONS_SNAPSHOT_DIR, \
+    INTERACTIONS_SNAPSHOT_READS
+from modulector.models import Mirna, MirnaSource, MirnaXGene
+from modulector.services import cache_service
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+# Version of the files layout. Snapshots in other versions are ignored
+SNAPSHOT_FORMAT: Final[int] = 2
+
+# File with the name of the current snapshot directory
+CURRENT_FILE: Final[str] = 'CURRENT'
+
+# Datasets the snapshot is generated from. The snapshot is not used if any of them was reloaded after the export
+SNAPSHOT_DATASETS: Final[Tuple[str, ...]] = (cache_service.MIRBASE_DATASET, cache_service.INTERACTIONS_DATASET)
+
+# Columns of every partition and their types. Strings are dictionary-encoded (-1 is NULL)
+COLUMNS_TYPES: Final[Dict[str, type]] = {
+    'id': np.int64,
+    'mirna': np.int32,
+    'gene': np.int32,
+    'score': np.float32,
+    'source_name': np.int32,
+    'sources': np.int32,
+    'score_class': np.int32,
+}
+
+# Dictionary-encoded columns
+DICTIONARY_COLUMNS: Final[Tuple[str, ...]] = ('mirna', 'gene', 'source_name', 'sources', 'score_class')
+
+# Files of every partition with the rows sorted by gene ('gene_order', row indices) and the position in it where the
+# rows of every gene code start ('gene_offsets'), so the rows of a gene are found without scanning the gene column
+GENE_INDEX_FILES: Final[Tuple[str, ...]] = ('gene_order', 'gene_offsets')
+
+# Number of rows retrieved from the DB at a time during the export
+EXPORT_FETCH_SIZE: Final[int] = 100000
+
+
+def get_partition(mirna_code: str, partitions: int) -> int:
+    """Gets the partition of a miRNA. crc32 is used instead of hash() as it's the same in every process."""
+    return zlib.crc32(mirna_code.encode('utf8')) % partitions
+
+
+class _DictionaryEncoder:
+    """Assigns a consecutive code to every distinct string. None is encoded as -1."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, values: Sequence[Optional[str]]) -> np.ndarray:
+        codes = self.codes
+        return np.fromiter(
+            (-1 if value is None else codes.setdefault(value, len(codes)) for value in values),
+            dtype=np.int32,
+            count=len(values)
+        )
+
+    @property
+    def values(self) -> List[str]:
+        return list(self.codes)
+
+
+def _export_partition(path: str, mirna_ids: List[int], mirna_codes_by_id: np.ndarray, source_names_by_id: np.ndarray,
+                      encoders: Dict[str, _DictionaryEncoder]) -> int:
+    """
+    Writes the interactions of a list of miRNAs sorted by (miRNA, gene). Every column is stored in a .npy file so it
+    can be memory-mapped, along with the gene index (see GENE_INDEX_FILES).
+    :return: Number of written rows.
+    """
+    chunks: Dict[str, List[np.ndarray]] = {column: [] for column in COLUMNS_TYPES}
+    query = f"""
+        SELECT id, mirna_id, gene, score, mirna_source_id, sources, score_class
+        FROM {MirnaXGene._meta.db_table}
+        WHERE mirna_id = ANY(%s)
+    """
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(query, [mirna_ids])
+        while rows := cursor.fetchmany(EXPORT_FETCH_SIZE):
+            ids, row_mirna_ids, genes, scores, source_ids, sources, score_classes = zip(*rows)
+            chunks['id'].append(np.array(ids, dtype=np.int64))
+            chunks['mirna'].append(mirna_codes_by_id[np.array(row_mirna_ids, dtype=np.int64)])
+            chunks['gene'].append(encoders['gene'].encode(genes))
+            chunks['score'].append(np.array(scores, dtype=np.float32))
+            chunks['source_name'].append(source_names_by_id[np.array(source_ids, dtype=np.int64)])
+            chunks['sources'].append(encoders['sources'].encode(sources))
+            chunks['score_class'].append(encoders['score_class'].encode(score_classes))
+
+    columns = {
+        column: np.concatenate(chunks[column]) if chunks[column] else np.empty(0, dtype=column_type)
+        for column, column_type in COLUMNS_TYPES.items()
+    }
+    order = np.lexsort((columns['gene'], columns['mirna']))
+    os.makedirs(path)
+    for column, values in columns.items():
+        np.save(os.path.join(path, f'{column}.npy'), values[order])
+
+    # Partitions have far less than 2^31 rows
+    genes = columns['gene'][order]
+    gene_order = np.argsort(genes, kind='stable').astype(np.int32)
+    gene_offsets = np.searchsorted(genes[gene_order], np.arange(genes.max(initial=-1) + 2))
+    np.save(os.path.join(path, 'gene_order.npy'), gene_order)
+    np.save(os.path.join(path, 'gene_offsets.npy'), gene_offsets)
+    return len(order)
+
+
+def export_snapshot(directory: str, partitions: int) -> str:
+    """
+    Exports MirnaXGene to a new columnar snapshot partitioned by miRNA hash and makes it the current one. Only one
+    partition is kept in memory at a time. Old snapshots are removed (processes which have them memory-mapped can
+    keep reading them until they load the new one).
+    :param directory: Directory where snapshots are stored.
+    :param partitions: Number of partitions.
+    :return: Path of the new snapshot.
+    """
+    versions = {dataset: cache_service.get_dataset_version(dataset) for dataset in SNAPSHOT_DATASETS}
+    name = time.strftime('snapshot-%Y%m%d%H%M%S')
+    path = os.path.join(directory, name)
+    tmp_path = os.path.join(directory, f'.{name}')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    # miRNAs and sources are encoded with lookup arrays indexed by their IDs
+    encoders = {column: _DictionaryEncoder() for column in DICTIONARY_COLUMNS}
+    mirnas = list(Mirna.objects.order_by('mirna_code').values_list('id', 'mirna_code'))
+    mirna_codes_by_id = np.full(max((mirna_id for mirna_id, _ in mirnas), default=0) + 1, -1, dtype=np.int32)
+    mirna_codes_by_id[[mirna_id for mirna_id, _ in mirnas]] = encoders['mirna'].encode(
+        [mirna_code for _, mirna_code in mirnas]
+    )
+    sources = list(MirnaSource.objects.order_by('id').values_list('id', 'name'))
+    source_names_by_id = np.full(max((source_id for source_id, _ in sources), default=0) + 1, -1, dtype=np.int32)
+    source_names_by_id[[source_id for source_id, _ in sources]] = encoders['source_name'].encode(
+        [source_name for _, source_name in sources]
+    )
+
+    mirna_ids_by_partition: List[List[int]] = [[] for _ in range(partitions)]
+    for mirna_id, mirna_code in mirnas:
+        mirna_ids_by_partition[get_partition(mirna_code, partitions)].append(mirna_id)
+
+    total_rows = 0
+    for partition, mirna_ids in enumerate(mirna_ids_by_partition):
+        total_rows += _export_partition(os.path.join(tmp_path, f'part-{partition:04d}'), mirna_ids, mirna_codes_by_id,
+                                        source_names_by_id, encoders)
+        logger.debug(f'Partition {partition + 1}/{partitions} exported ({total_rows} rows)')
+
+    with open(os.path.join(tmp_path, 'dictionaries.json'), 'w') as fp:
+        json.dump({column: encoder.values for column, encoder in encoders.items()}, fp)
+    with open(os.path.join(tmp_path, 'metadata.json'), 'w') as fp:
+        json.dump({
+            'format': SNAPSHOT_FORMAT,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'partitions': partitions,
+            'rows': total_rows,
+            'datasets': versions,
+        }, fp)
+
+    # Publishes the snapshot replacing the CURRENT file atomically
+    os.rename(tmp_path, path)
+    current_tmp_path = os.path.join(directory, f'.{CURRENT_FILE}')
+    with open(current_tmp_path, 'w') as fp:
+        fp.write(name)
+    os.replace(current_tmp_path, os.path.join(directory, CURRENT_FILE))
+
+    for old_name in os.listdir(directory):
+        if old_name.startswith('snapshot-') and old_name != name:
+            shutil.rmtree(os.path.join(directory, old_name), ignore_errors=True)
+
+    logger.info(f'Interactions snapshot {name} exported with {total_rows} rows in {partitions} partitions')
+    return path
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenates the ranges [start, end) of two arrays of bounds."""
+    counts = ends - starts
+    return np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+
+
+def _expand(values: np.ndarray, pair_values: np.ndarray,
+            pair_positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Joins an array against a list of (value, position) pairs sorted by value.
+    :return: Index in 'values' and position of every match.
+    """
+    left = np.searchsorted(pair_values, values, side='left')
+    counts = np.searchsorted(pair_values, values, side='right') - left
+    indices = np.repeat(np.arange(len(values)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return indices, pair_positions[np.repeat(left, counts) + offsets]
+
+
+class InteractionsSnapshot:
+    """Read-only view of an exported snapshot. Columns are memory-mapped, so they're shared between processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'metadata.json')) as fp:
+            self.metadata = json.load(fp)
+        if self.metadata['format'] != SNAPSHOT_FORMAT:
+            raise ValueError(f'Snapshot {path} is in format {self.metadata["format"]} instead of {SNAPSHOT_FORMAT}')
+        with open(os.path.join(path, 'dictionaries.json')) as fp:
+            self.dictionaries: Dict[str, List[str]] = json.load(fp)
+
+        self._codes = {
+            column: {value: code for code, value in enumerate(self.dictionaries[column])}
+            for column in ('mirna', 'gene')
+        }
+        partitions = self.metadata['partitions']
+        self._mirna_partitions = np.array(
+            [get_partition(mirna_code, partitions) for mirna_code in self.dictionaries['mirna']], dtype=np.int32
+        )
+        self._partitions = [
+            {
+                column: np.load(os.path.join(path, f'part-{partition:04d}', f'{column}.npy'), mmap_mode='r')
+                for column in COLUMNS_TYPES
+            }
+            for partition in range(partitions)
+        ]
+        self._gene_indexes = [
+            tuple(
+                np.load(os.path.join(path, f'part-{partition:04d}', f'{name}.npy'), mmap_mode='r')
+                for name in GENE_INDEX_FILES
+            )
+            for partition in range(partitions)
+        ]
+
+    @property
+    def datasets(self) -> Dict[str, int]:
+        return self.metadata['datasets']
+
+    def encode_pairs(self, column: str, identifiers: Sequence[str],
+                     positions: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encodes a list of (identifier, position) pairs, discarding the unknown identifiers.
+        :return: Codes and positions sorted by code.
+        """
+        codes = self._codes[column]
+        pairs = [(codes[identifier], position) for identifier, position in zip(identifiers, positions)
+                 if identifier in codes]
+        pairs.sort()
+        return (np.array([code for code, _ in pairs], dtype=np.int32),
+                np.array([position for _, position in pairs], dtype=np.int64))
+
+    def encode(self, column: str, identifiers: Iterable[str]) -> np.ndarray:
+        """Gets the sorted codes of the known identifiers, without duplicates."""
+        codes = self._codes[column]
+        return np.unique(np.array([codes[value] for value in identifiers if value in codes], dtype=np.int32))
+
+    def select(self, mirna_codes: Optional[np.ndarray], gene_codes: Optional[np.ndarray],
+               min_score: Optional[float]) -> Dict[str, np.ndarray]:
+        """
+        Gets the interactions of a set of miRNAs and/or genes. The rows of the miRNAs are found by binary search in
+        their partitions. Filtering only by genes, their rows are found in the gene index of every partition.
+        :param mirna_codes: Codes of the miRNAs, or None to not filter by miRNA.
+        :param gene_codes: Sorted codes of the genes, or None to not filter by gene.
+        :param min_score: Minimum score, or None to not filter by score.
+        :return: Columns of the matching rows (copied from the memory-mapped files).
+        """
+        if mirna_codes is not None:
+            mirna_codes = np.unique(mirna_codes)
+        selected: List[Dict[str, np.ndarray]] = []
+        for partition, columns in enumerate(self._partitions):
+            if mirna_codes is not None:
+                partition_codes = mirna_codes[self._mirna_partitions[mirna_codes] == partition]
+                if len(partition_codes) == 0:
+                    continue
+                starts = np.searchsorted(columns['mirna'], partition_codes, side='left')
+                ends = np.searchsorted(columns['mirna'], partition_codes, side='right')
+                indices = _ranges(starts, ends)
+                if gene_codes is not None:
+                    indices = indices[np.isin(columns['gene'][indices], gene_codes)]
+            elif gene_codes is not None:
+                gene_order, gene_offsets = self._gene_indexes[partition]
+                partition_codes = gene_codes[gene_codes + 1 < len(gene_offsets)]
+                # Sorted to read the columns in file order
+                indices = np.sort(gene_order[_ranges(gene_offsets[partition_codes], gene_offsets[partition_codes + 1])])
+            else:
+                indices = np.arange(len(columns['mirna']))
+
+            if min_score is not None:
+                indices = indices[columns['score'][indices] >= np.float32(min_score)]
+            selected.append({column: np.asarray(values[indices]) for column, values in columns.items()})
+
+        return {
+            column: np.concatenate([rows[column] for rows in selected]) if selected else np.empty(0, column_type)
+            for column, column_type in COLUMNS_TYPES.items()
+        }
+
+    def select_by_position(self, column: str, pairs: Tuple[np.ndarray, np.ndarray], other_codes: Optional[np.ndarray],
+                           min_score: Optional[float]) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+        """
+        Gets the interactions of a list of miRNAs or genes aliases grouped by the input they belong to.
+        :param column: 'mirna' or 'gene'.
+        :param pairs: Encoded (alias, input position) pairs sorted by code (see encode_pairs()).
+        :param other_codes: Sorted codes of the genes to filter the interactions of the miRNAs, or None to not filter.
+        :param min_score: Minimum score, or None to not filter by score.
+        :return: Selected rows and the input position and row index of every match, sorted by position, descending
+        score and ID.
+        """
+        if column == 'mirna':
+            rows = self.select(pairs[0], other_codes, min_score)
+        else:
+            rows = self.select(None, np.unique(pairs[0]), min_score)
+        order = np.lexsort((rows['id'], -rows['score']))
+        indices, positions = _expand(rows[column][order], *pairs)
+        matches = order[indices]
+
+        # A stable sort keeps the score order inside every position
+        by_position = np.argsort(positions, kind='stable')
+        return rows, positions[by_position], matches[by_position]
+
+    def score_matrix(self, mirna_pairs: Tuple[np.ndarray, np.ndarray], gene_pairs: Tuple[np.ndarray, np.ndarray],
+                     shape: Tuple[int, int]) -> np.ndarray:
+        """
+        Builds the score matrix of a list of miRNAs and genes aliases.
+        :param mirna_pairs: Encoded (miRNA alias, row) pairs sorted by code (see encode_pairs()).
+        :param gene_pairs: Encoded (gene alias, column) pairs sorted by code.
+        :param shape: Shape of the matrix.
+        :return: float32 matrix with the maximum score of every cell and NaN where there is no interaction.
+        """
+        matrix = np.full(shape, np.nan, dtype=np.float32)
+        rows = self.select(mirna_pairs[0], np.unique(gene_pairs[0]), None)
+        indices, row_positions = _expand(rows['mirna'], *mirna_pairs)
+        gene_indices, column_positions = _expand(rows['gene'][indices], *gene_pairs)
+        np.fmax.at(matrix, (row_positions[gene_indices], column_positions), rows['score'][indices][gene_indices])
+        return matrix
+
+    def decode(self, column: str, code: int) -> Optional[str]:
+        return None if code == -1 else self.dictionaries[column][code]
+
+
+_snapshot: Optional[InteractionsSnapshot] = None
+_snapshot_name: Optional[str] = None
+_snapshot_check_time: float = float('-inf')
+_snapshot_lock = threading.Lock()
+
+
+def _read_current_name() -> Optional[str]:
+    try:
+        with open(os.path.join(INTERACTIONS_SNAPSHOT_DIR, CURRENT_FILE)) as fp:
+            return fp.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def get_snapshot() -> Optional[InteractionsSnapshot]:
+    """
+    Gets the process-wide snapshot. The CURRENT file is checked at most every DATASET_VERSION_CHECK_INTERVAL seconds
+    to load new exports.
+    :return: Current snapshot, or None if reads from snapshots are disabled, there isn't any snapshot or the datasets
+    were reloaded after it was exported (the DB must be used in those cases).
+    """
+    global _snapshot, _snapshot_name, _snapshot_check_time
+    if not INTERACTIONS_SNAPSHOT_READS:
+        return None
+
+    now = time.monotonic()
+    if now - _snapshot_check_time >= DATASET_VERSION_CHECK_INTERVAL:
+        with _snapshot_lock:
+            if now - _snapshot_check_time >= DATASET_VERSION_CHECK_INTERVAL:
+                name = _read_current_name()
+                if name != _snapshot_name:
+                    try:
+                        _snapshot = InteractionsSnapshot(os.path.join(INTERACTIONS_SNAPSHOT_DIR, name)) \
+                            if name is not None else None
+                    except (OSError, ValueError, KeyError) as ex:
+                        logger.warning(f'Interactions snapshot {name} could not be loaded: {ex}')
+                        _snapshot = None
+                    _snapshot_name = name
+                _snapshot_check_time = now
+
+    snapshot = _snapshot
+    if snapshot is None:
+        return None
+    for dataset, version in snapshot.datasets.items():
+        if cache_service.get_dataset_version(dataset) != version:
+            return None
+    return snapshot
+
+
+def warm_up():
+    """Loads the current snapshot at startup (if enabled)."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        logger.info(f'Interactions snapshot {os.path.basename(snapshot.path)} loaded')
+
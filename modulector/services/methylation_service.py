@@ -0,0 +1,315 @@
+import functools
+import itertools
+import json
+import logging
+import sys
+import threading
+from typing import Dict, Final, Iterator, List, Optional, Sequence, Tuple
+from django.db import DatabaseError, connection, transaction
+from ModulectorBackend.settings import DEBUG, METHYLATION_FINDER_INCLUDE_LEGACY_LOCI
+from modulector.models import MethylationEPIC, MethylationUCSCRefGene, MethylationLoci, MethylationUCSC_CPGIsland, \
+    MethylationSiteDetails
+from modulector.services import cache_service
+from modulector.utils import executors
+from modulector.utils.prefix_index import CompactPrefixIndex
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+# Number of input identifiers sent to the DB in every bulk query
+BULK_QUERY_BATCH_SIZE: Final[int] = 50000
+
+# Columns of MethylationEPIC that can be used to identify a CpG site
+LOCI_COLUMNS: Final[Tuple[str, ...]] = ('ilmnid', 'name', 'methyl450_loci', 'methyl27_loci', 'epicv1_loci')
+
+# Legacy columns of MethylationEPIC that can be included in the finder
+LEGACY_LOCI_COLUMNS: Final[Tuple[str, ...]] = ('methyl450_loci', 'methyl27_loci', 'epicv1_loci')
+
+_finder_index: Optional[CompactPrefixIndex] = None
+_finder_index_version: Optional[int] = None
+_finder_index_lock = threading.Lock()
+
+
+def refresh_methylation_loci():
+    """Regenerates the MethylationLoci lookup table from MethylationEPIC."""
+    epic_table = MethylationEPIC._meta.db_table
+    loci_table = MethylationLoci._meta.db_table
+    sites_ids = ' UNION '.join(
+        f"SELECT {column}, id FROM {epic_table} WHERE {column} <> ''" for column in LOCI_COLUMNS
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE TABLE {loci_table}")
+        cursor.execute(f"INSERT INTO {loci_table} (loci, methylation_epic_v2_ilmnid_id) {sites_ids}")
+        logger.info(f'{cursor.rowcount} Loci IDs loaded into {loci_table}')
+
+
+def _get_details_query() -> str:
+    """
+    Generates the query which builds the JSON document of every EPIC v2 site name. If a name has more than one
+    site, the first one (by ID) is used. The json type (not jsonb) is used to keep the keys order.
+    """
+    epic_table = MethylationEPIC._meta.db_table
+    islands_table = MethylationUCSC_CPGIsland._meta.db_table
+    genes_table = MethylationUCSCRefGene._meta.db_table
+
+    return f"""
+        SELECT DISTINCT ON (e.name) e.name, json_strip_nulls(json_build_object(
+            'name', e.name,
+            'chromosome_position', CASE e.strand_fr
+                WHEN 'F' THEN e.chr || ':' || e.mapinfo || ' [+]'
+                WHEN 'R' THEN e.chr || ':' || e.mapinfo || ' [-]'
+            END,
+            'aliases', (
+                SELECT coalesce(json_agg(a.alias ORDER BY a.position), '[]'::json)
+                FROM (VALUES (1, e.methyl27_loci), (2, e.methyl450_loci), (3, e.epicv1_loci), (4, e.ilmnid))
+                    AS a(position, alias)
+                WHERE a.alias <> '' AND a.alias <> e.name
+            ),
+            'ucsc_cpg_islands', (
+                SELECT coalesce(json_agg(json_build_object(
+                    'cpg_island', i.ucsc_cpg_island_name,
+                    'relation', i.relation_to_ucsc_cpg_island
+                ) ORDER BY i.id), '[]'::json)
+                FROM {islands_table} i
+                WHERE i.methylation_epic_v2_ilmnid_id = e.id
+            ),
+            'genes', (
+                SELECT coalesce(json_object_agg(g.gene, g.groups ORDER BY g.first_id), '{{}}'::json)
+                FROM (
+                    SELECT gg.gene, json_agg(gg.gene_group ORDER BY gg.first_id) AS groups,
+                        min(gg.first_id) AS first_id
+                    FROM (
+                        SELECT ucsc_refgene_name AS gene, ucsc_refgene_group AS gene_group, min(id) AS first_id
+                        FROM {genes_table}
+                        WHERE methylation_epic_v2_ilmnid_id = e.id
+                        GROUP BY ucsc_refgene_name, ucsc_refgene_group
+                    ) gg
+                    GROUP BY gg.gene
+                ) g
+            )
+        ))::text
+        FROM {epic_table} e
+        ORDER BY e.name, e.id
+    """
+
+
+def refresh_methylation_details():
+    """Regenerates the MethylationSiteDetails table from MethylationEPIC and its islands and genes relations."""
+    details_table = MethylationSiteDetails._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE TABLE {details_table}")
+        cursor.execute(f"INSERT INTO {details_table} (name, document) {_get_details_query()}")
+        logger.info(f'{cursor.rowcount} sites details loaded into {details_table}')
+
+
+def refresh_methylation_tables():
+    """
+    Regenerates all the tables derived from MethylationEPIC (MethylationLoci and MethylationSiteDetails) and
+    discards the cached methylation data. It must be called every time the EPIC v2 data is reloaded.
+    """
+    with transaction.atomic():
+        refresh_methylation_loci()
+        refresh_methylation_details()
+        cache_service.bump_dataset_version(cache_service.METHYLATION_DATASET)
+
+
+def _get_translation_query() -> str:
+    """Generates the query which joins an array of identifiers against MethylationLoci to get the EPIC v2 names."""
+    loci_table = MethylationLoci._meta.db_table
+    epic_table = MethylationEPIC._meta.db_table
+
+    return f"""
+        SELECT i.input_name, e.name
+        FROM unnest(%s::varchar[]) WITH ORDINALITY AS i(input_name, position)
+        LEFT JOIN {loci_table} l ON l.loci = i.input_name
+        LEFT JOIN {epic_table} e ON e.id = l.methylation_epic_v2_ilmnid_id
+        ORDER BY i.position, e.id
+    """
+
+
+def _get_sites_to_genes_query() -> str:
+    """Generates the query which joins an array of identifiers against MethylationLoci and MethylationUCSCRefGene."""
+    loci_table = MethylationLoci._meta.db_table
+    genes_table = MethylationUCSCRefGene._meta.db_table
+
+    return f"""
+        SELECT i.input_name, g.ucsc_refgene_name
+        FROM unnest(%s::varchar[]) WITH ORDINALITY AS i(input_name, position)
+        JOIN {loci_table} l ON l.loci = i.input_name
+        JOIN {genes_table} g ON g.methylation_epic_v2_ilmnid_id = l.methylation_epic_v2_ilmnid_id
+        ORDER BY i.position, l.methylation_epic_v2_ilmnid_id, g.id
+    """
+
+
+def _fetch_batch(query: str, batch: Sequence[str]) -> List[Tuple]:
+    """Executes the query for a batch of sites."""
+    with connection.cursor() as cursor:
+        cursor.execute(query, [list(batch)])
+        return cursor.fetchall()
+
+
+def _iter_batches(methylation_sites: Sequence[str], query: str) -> Iterator[Tuple]:
+    """
+    Executes the query every BULK_QUERY_BATCH_SIZE sites yielding the rows in the input order. The batches of big
+    lists are queried in parallel in the thread pool, every worker with its own connection.
+    """
+    for rows in executors.map_shards(functools.partial(_fetch_batch, query), methylation_sites,
+                                     BULK_QUERY_BATCH_SIZE):
+        yield from rows
+
+
+class MethylationSitesTranslation:
+    """
+    Translates a list of CpG sites identified by any type of Loci ID to the names of the EPIC v2 array. Sites are
+    resolved with an indexed join against MethylationLoci, one query every BULK_QUERY_BATCH_SIZE sites (run in
+    parallel for big lists). Iterating the instance yields the mapping and updates the matched, unmatched and
+    ambiguous (more than one EPIC v2 site) counters.
+    """
+
+    def __init__(self, methylation_sites: Sequence[str]):
+        """
+        :param methylation_sites: Sites to translate. Must not contain duplicates.
+        """
+        self.methylation_sites = methylation_sites
+        self.matched = 0
+        self.unmatched = 0
+        self.ambiguous = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, List[str]]]:
+        query = _get_translation_query()
+        rows = _iter_batches(self.methylation_sites, query)
+        for input_name, input_rows in itertools.groupby(rows, key=lambda row: row[0]):
+            names = [name for _, name in input_rows if name is not None]
+            if not names:
+                self.unmatched += 1
+            else:
+                self.matched += 1
+                if len(names) > 1:
+                    self.ambiguous += 1
+            yield input_name, names
+
+        logger.debug(f'Methylation sites translated. Matched: {self.matched}, unmatched: {self.unmatched}, '
+                     f'ambiguous: {self.ambiguous}')
+
+    def get_stats(self) -> Dict[str, int]:
+        """Gets the counters. Only valid once all the sites were translated."""
+        return {'matched': self.matched, 'unmatched': self.unmatched, 'ambiguous': self.ambiguous}
+
+    def get_stats_headers(self) -> Dict[str, str]:
+        """
+        Gets the counters as response headers. Only valid once all the sites were translated, so streamed responses
+        can't include them (see get_stats()).
+        """
+        return {f'X-{counter.capitalize()}-Sites': str(value) for counter, value in self.get_stats().items()}
+
+
+def get_genes_from_methylation_sites(methylation_sites: Sequence[str]) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Gets the genes of a list of CpG sites identified by any type of Loci ID through MethylationLoci. One query is
+    issued every BULK_QUERY_BATCH_SIZE sites, in parallel for big lists, and the rows are consumed in order as the
+    batches finish.
+    :param methylation_sites: Sites to query. Must not contain duplicates.
+    :return: Iterator of (input site, genes without duplicates) pairs in the input order. Sites without genes are
+    omitted.
+    """
+    query = _get_sites_to_genes_query()
+    rows = _iter_batches(methylation_sites, query)
+    for input_name, input_rows in itertools.groupby(rows, key=lambda row: row[0]):
+        yield input_name, list(dict.fromkeys(gene for _, gene in input_rows))
+
+
+def build_finder_index() -> CompactPrefixIndex:
+    """
+    Generates a new index with the names of the EPIC v2 sites, plus the 450k, 27k and EPIC v1 Loci IDs if
+    METHYLATION_FINDER_INCLUDE_LEGACY_LOCI is enabled. It takes about 25 bytes per site (~25 MB for the EPIC v2
+    names).
+    """
+    columns = ('name',) + (LEGACY_LOCI_COLUMNS if METHYLATION_FINDER_INCLUDE_LEGACY_LOCI else ())
+    rows = MethylationEPIC.objects.values_list(*columns).iterator(chunk_size=BULK_QUERY_BATCH_SIZE)
+    index = CompactPrefixIndex(itertools.chain.from_iterable(rows))
+    logger.debug(f'Methylation finder index built with {len(index)} identifiers')
+    return index
+
+
+def get_finder_index() -> CompactPrefixIndex:
+    """
+    Gets the process-wide finder index. It's built at startup (or on the first search) and rebuilt when the
+    methylation dataset is reloaded.
+    """
+    global _finder_index, _finder_index_version
+    version = cache_service.get_dataset_version(cache_service.METHYLATION_DATASET)
+    index = _finder_index
+    if index is None or _finder_index_version != version:
+        with _finder_index_lock:
+            if _finder_index is None or _finder_index_version != version:
+                # Drops the old index before building the new one to not keep both in memory
+                _finder_index = None
+                _finder_index = build_finder_index()
+                _finder_index_version = version
+            index = _finder_index
+    return index
+
+
+def get_current_finder_index() -> Optional[CompactPrefixIndex]:
+    """
+    Gets the process-wide finder index without querying the DB (e.g. from the event loop). None if the dataset
+    version must be checked in the DB or the index must be (re)built, in which case get_finder_index() must be called
+    in a thread.
+    """
+    version = cache_service.get_checked_dataset_version(cache_service.METHYLATION_DATASET)
+    index = _finder_index
+    return index if version is not None and _finder_index_version == version else None
+
+
+def warm_up():
+    """Builds the finder index at startup. DB errors are only logged as the table could not be created yet."""
+    try:
+        get_finder_index()
+    except DatabaseError as ex:
+        logger.warning(f'Methylation finder index could not be built at startup: {ex}')
+
+
+def find_methylation_sites(query: str, limit: int) -> List[str]:
+    """
+    Gets the CpG site identifiers starting with a string, ignoring case.
+    :param query: String to search.
+    :param limit: Maximum number of identifiers to return.
+    :return: Identifiers without duplicates, ranked in lexicographic order (exact match first).
+    """
+    return get_finder_index().search(query, limit)
+
+
+def get_methylation_site_details(methylation_site: str) -> Optional[dict]:
+    """
+    Gets the details of a CpG site with a single primary key lookup on MethylationSiteDetails.
+    :param methylation_site: EPIC v2 site name.
+    :return: Site details (name, chromosome_position, aliases, ucsc_cpg_islands and genes). None if not found.
+    """
+    document = MethylationSiteDetails.objects.filter(pk=methylation_site).values_list('document', flat=True).first()
+    return json.loads(document) if document is not None else None
+
+
+async def aget_methylation_site_details(methylation_site: str) -> Optional[dict]:
+    """Async version of get_methylation_site_details() which uses the async interface of the ORM."""
+    document = await MethylationSiteDetails.objects.filter(pk=methylation_site).values_list(
+        'document', flat=True
+    ).afirst()
+    return json.loads(document) if document is not None else None
+
+
+def get_methylation_sites_details(methylation_sites: Sequence[str]) -> Iterator[Tuple[str, Optional[dict]]]:
+    """
+    Gets the details of a list of CpG sites. One query is issued every BULK_QUERY_BATCH_SIZE sites.
+    :param methylation_sites: EPIC v2 site names. Must not contain duplicates.
+    :return: Iterator of (input site, site details or None) pairs in the input order.
+    """
+    for start in range(0, len(methylation_sites), BULK_QUERY_BATCH_SIZE):
+        batch = methylation_sites[start:start + BULK_QUERY_BATCH_SIZE]
+        documents = dict(MethylationSiteDetails.objects.filter(pk__in=batch).values_list('name', 'document'))
+        for methylation_site in batch:
+            document = documents.get(methylation_site)
+            yield methylation_site, json.loads(document) if document is not None else None
@@ -0,0 +1,160 @@
+import logging
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from django.db import DatabaseError
+from ModulectorBackend.settings import DEBUG
+from modulector.models import MirbaseIdMirna
+from modulector.services import cache_service
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+
+class MirnaAliasIndex:
+    """
+    Read-only snapshot of the MirbaseIdMirna table. Accession IDs and mature names are stored once in tuples and the
+    accession -> mature names relation is kept as a CSR structure (offsets + indexes) in compact unsigned int arrays.
+    """
+    __slots__ = ('accessions', 'mature_names', '_mature_offsets', '_mature_indexes', '_lookup')
+
+    def __init__(self, rows: List[Tuple[str, str, Optional[str]]]):
+        """
+        Builds the index.
+        :param rows: (mirbase_accession_id, mature_mirna, previous_mature_mirna) tuples ordered by ID.
+        """
+        accession_positions: Dict[str, int] = {}
+        mature_positions: Dict[str, int] = {}
+        matures_by_accession: List[List[int]] = []
+        lookup: Dict[str, int] = {}
+
+        for accession_id, mature_mirna, previous_mature_mirna in rows:
+            if not accession_id:
+                continue
+
+            accession_pos = accession_positions.get(accession_id)
+            if accession_pos is None:
+                accession_pos = len(matures_by_accession)
+                accession_positions[sys.intern(accession_id)] = accession_pos
+                matures_by_accession.append([])
+
+            if mature_mirna:
+                mature_pos = mature_positions.get(mature_mirna)
+                if mature_pos is None:
+                    mature_pos = len(mature_positions)
+                    mature_positions[sys.intern(mature_mirna)] = mature_pos
+                if mature_pos not in matures_by_accession[accession_pos]:
+                    matures_by_accession[accession_pos].append(mature_pos)
+
+            # The first row (by ID) wins, as the previous '.first()' query did
+            for key in (accession_id, mature_mirna, previous_mature_mirna):
+                if key:
+                    lookup.setdefault(sys.intern(key), accession_pos)
+
+        self.accessions: Tuple[str, ...] = tuple(accession_positions)
+        self.mature_names: Tuple[str, ...] = tuple(mature_positions)
+        self._mature_offsets = array('I', [0])
+        self._mature_indexes = array('I')
+        for mature_list in matures_by_accession:
+            self._mature_indexes.extend(mature_list)
+            self._mature_offsets.append(len(self._mature_indexes))
+        self._lookup = lookup
+
+    def __len__(self) -> int:
+        return len(self._lookup)
+
+    def get_accession(self, mirna_code: str) -> Optional[str]:
+        """
+        Gets the accession ID for an accession ID, mature miRNA or previous mature miRNA.
+        :param mirna_code: Identifier to resolve.
+        :return: Accession ID if found, None otherwise.
+        """
+        accession_pos = self._lookup.get(mirna_code)
+        return self.accessions[accession_pos] if accession_pos is not None else None
+
+    def get_mature_mirnas(self, accession_id: str) -> List[str]:
+        """
+        Gets all the mature miRNAs (not duplicates) for an accession ID.
+        :param accession_id: Accession ID to resolve.
+        :return: List of mature miRNAs. Empty if the accession ID doesn't exist.
+        """
+        accession_pos = self._lookup.get(accession_id)
+        if accession_pos is None or self.accessions[accession_pos] != accession_id:
+            return []
+
+        start, end = self._mature_offsets[accession_pos], self._mature_offsets[accession_pos + 1]
+        return [self.mature_names[mature_pos] for mature_pos in self._mature_indexes[start:end]]
+
+
+_index: Optional[MirnaAliasIndex] = None
+_index_version: Optional[int] = None
+_index_lock = threading.Lock()
+
+
+def build_index() -> MirnaAliasIndex:
+    """Generates a new index from the current content of the MirbaseIdMirna table."""
+    rows = MirbaseIdMirna.objects.order_by('id').values_list(
+        'mirbase_accession_id', 'mature_mirna', 'previous_mature_mirna'
+    )
+    index = MirnaAliasIndex(list(rows))
+    logger.debug(f'miRNA alias index built with {len(index.accessions)} accession IDs and {len(index)} keys')
+    return index
+
+
+def get_index() -> MirnaAliasIndex:
+    """
+    Gets the process-wide index. It's loaded from the shared cache (or built from the DB) in case it wasn't loaded
+    yet or the miRBase dataset was reloaded.
+    """
+    global _index, _index_version
+    version = cache_service.get_dataset_version(cache_service.MIRBASE_DATASET)
+    index = _index
+    if index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = cache_service.get_or_set(cache_service.MIRNA_ALIASES_NAMESPACE, 'index', build_index)
+                _index_version = version
+            index = _index
+    return index
+
+
+def invalidate():
+    """
+    Discards the current index in every process. It must be called after the MirbaseIdMirna table is modified.
+    """
+    global _index
+    cache_service.bump_dataset_version(cache_service.MIRBASE_DATASET)
+    with _index_lock:
+        _index = None
+
+
+def warm_up():
+    """Loads the index at startup. DB errors are only logged as the table could not be created yet."""
+    try:
+        get_index()
+    except DatabaseError as ex:
+        logger.warning(f'miRNA alias index could not be loaded at startup: {ex}')
+
+
+def get_accession(mirna_code: str) -> Optional[str]:
+    """Shortcut for MirnaAliasIndex.get_accession() using the process-wide index."""
+    return get_index().get_accession(mirna_code)
+
+
+def get_accessions(mirna_codes: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Resolves a batch of miRNA codes in a single pass over the process-wide index.
+    :param mirna_codes: miRNA codes, previous miRNA codes, or accession IDs.
+    :return: Iterator of (input code, accession ID or None) pairs in the input order.
+    """
+    index = get_index()
+    for mirna_code in mirna_codes:
+        yield mirna_code, index.get_accession(mirna_code)
+
+
+def get_mature_mirnas(accession_id: str) -> List[str]:
+    """Shortcut for MirnaAliasIndex.get_mature_mirnas() using the process-wide index."""
+    return get_index().get_mature_mirnas(accession_id)
@@ -0,0 +1,76 @@
+import itertools
+import logging
+import sys
+import threading
+from typing import List, Optional
+from django.db import DatabaseError
+from ModulectorBackend.settings import DEBUG
+from modulector.models import Mirna, MirbaseIdMirna
+from modulector.services import cache_service
+from modulector.utils.prefix_index import PrefixIndex
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+_index: Optional[PrefixIndex] = None
+_index_version: Optional[int] = None
+_index_lock = threading.Lock()
+
+
+def build_index() -> PrefixIndex:
+    """
+    Generates a new index with the union of all the miRNA identifiers: miRNA codes, mature miRNAs, previous mature
+    miRNAs and accession IDs.
+    """
+    mirna_codes = Mirna.objects.values_list('mirna_code', flat=True)
+    aliases = MirbaseIdMirna.objects.values_list('mature_mirna', 'previous_mature_mirna', 'mirbase_accession_id')
+    index = PrefixIndex(itertools.chain(mirna_codes, itertools.chain.from_iterable(aliases)))
+    logger.debug(f'miRNA finder index built with {len(index)} identifiers')
+    return index
+
+
+def get_index() -> PrefixIndex:
+    """
+    Gets the process-wide index. It's built from the DB in case it wasn't built yet or the miRBase dataset was
+    reloaded.
+    """
+    global _index, _index_version
+    version = cache_service.get_dataset_version(cache_service.MIRBASE_DATASET)
+    index = _index
+    if index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = build_index()
+                _index_version = version
+            index = _index
+    return index
+
+
+def get_current_index() -> Optional[PrefixIndex]:
+    """
+    Gets the process-wide index without querying the DB (e.g. from the event loop). None if the dataset version must
+    be checked in the DB or the index must be (re)built, in which case get_index() must be called in a thread.
+    """
+    version = cache_service.get_checked_dataset_version(cache_service.MIRBASE_DATASET)
+    index = _index
+    return index if version is not None and _index_version == version else None
+
+
+def warm_up():
+    """Builds the index at startup. DB errors are only logged as the tables could not be created yet."""
+    try:
+        get_index()
+    except DatabaseError as ex:
+        logger.warning(f'miRNA finder index could not be built at startup: {ex}')
+
+
+def find_mirna_codes(query: str, limit: int) -> List[str]:
+    """
+    Gets the miRNA identifiers starting with a string, ignoring case.
+    :param query: String to search.
+    :param limit: Maximum number of identifiers to return.
+    :return: Identifiers without duplicates, ranked in lexicographic order (exact match first).
+    """
+    return get_index().search(query, limit)
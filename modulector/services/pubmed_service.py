@@ -1,9 +1,17 @@
+import asyncio
+import hashlib
 import logging
 import sys
-from typing import Optional, Dict, Final, Set
+import threading
+import time
+from typing import Optional, Dict, Final, Set, Iterable, Tuple
 from xml.etree import ElementTree
+import httpx
 import requests
-from ModulectorBackend.settings import DEFAULT_FROM_EMAIL, NCBI_API_KEY, DEBUG
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from ModulectorBackend.settings import DEFAULT_FROM_EMAIL, NCBI_API_KEY, DEBUG, PUBMED_API_RATE_LIMIT, \
+    PUBMED_API_MAX_WORKERS, PUBMED_API_PAGE_TIMEOUT, PUBMED_CACHE_TIMEOUT, SERVER_WORKERS, METRICS_LOG_INTERVAL
 from modulector.models import Pubmed
 
 # Sets some logging configuration
@@ -25,6 +33,38 @@ def build_search_term(mirna: str, gene: str) -> str:
     return mirna + ' AND ' + gene if gene else mirna
 
 
+def search_pubmed_ids(term: str, timeout: Optional[float]) -> Set[int]:
+    """
+    Queries the NCBI API for a given term and parses the response.
+    :param term: Search term.
+    :param timeout: Timeout for the request.
+    :return: Set of pubmed ids.
+    :raises: Exception if the call to the NCBI API fails.
+    """
+    response = requests.get(SEARCH_URL.format(term, TOOL, DEFAULT_FROM_EMAIL), timeout=timeout)
+    return _parse_search_response(response.status_code, response.text)
+
+
+async def asearch_pubmed_ids(client: httpx.AsyncClient, term: str, timeout: Optional[float]) -> Set[int]:
+    """Async version of search_pubmed_ids() which doesn't block the thread while waiting for the NCBI API."""
+    response = await client.get(SEARCH_URL.format(term, TOOL, DEFAULT_FROM_EMAIL), timeout=timeout)
+    return _parse_search_response(response.status_code, response.text)
+
+
+def _parse_search_response(status_code: int, text: str) -> Set[int]:
+    """Gets the PubMed ids of an NCBI search response."""
+    if status_code != 200:
+        raise Exception('Response code from pubmed query was not 200, it was {}'.format(status_code))
+
+    pubmed_ids = set()
+    xml = ElementTree.fromstring(text)
+    for child in list(xml):
+        if child.tag == 'IdList':
+            for id_tag in list(child):
+                pubmed_ids.add(int(id_tag.text))
+    return pubmed_ids
+
+
 def query_parse_and_build_pumbeds(term: str, mirna: str, gene: str, timeout: Optional[int]) -> Set[str]:
     """
     Queries pubmed for a given term, parses the response and builds a list of pubmed ids.
@@ -35,29 +75,195 @@ def query_parse_and_build_pumbeds(term: str, mirna: str, gene: str, timeout: Opt
     :return: List of pubmed ids.
     """
     try:
-        response = requests.get(SEARCH_URL.format(term, TOOL, DEFAULT_FROM_EMAIL), timeout=timeout)
+        pubmed_ids = search_pubmed_ids(term, timeout)
 
-        if response.status_code == 200:
-            pubmed_ids = set()
-            xml = ElementTree.fromstring(response.text)
-            for child in list(xml):
-                if child.tag == 'IdList':
-                    for id_tag in list(child):
-                        pubmed_ids.add(int(id_tag.text))
-
-            query = Pubmed.objects.filter(mirna_code=mirna)
-            if gene:
-                query = query.filter(gene=gene)
-
-            pubmed_ids.update(query.values_list('pubmed_id', flat=True))
-            return pubmed_ids
-        else:
-            raise Exception('Response code from pubmed query was not 200, it was {}'.format(response.status_code))
+        query = Pubmed.objects.filter(mirna_code=mirna)
+        if gene:
+            query = query.filter(gene=gene)
+
+        pubmed_ids.update(query.values_list('pubmed_id', flat=True))
+        return pubmed_ids
     except Exception as ex:
         logger.error('query and parse failed')
         raise ex
 
 
+class RateLimiter:
+    """
+    Spaces out the calls made from any thread or event loop of the process to respect a maximum number of calls per
+    second.
+    """
+
+    def __init__(self, calls_per_second: float):
+        self.interval = 1 / calls_per_second
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self, deadline: float) -> bool:
+        """
+        Waits (without blocking the event loop) until a call can be made.
+        :param deadline: time.monotonic() value after which it's not worth waiting.
+        :return: True if the call can be made, False if the deadline would be exceeded.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if slot > deadline:
+                return False
+            self._next_slot = slot + self.interval
+        await asyncio.sleep(max(0.0, slot - now))
+        return True
+
+
+class PubmedMetrics:
+    """
+    Counters of the PubMed enrichment shared by all the requests served by the process. They're logged every
+    METRICS_LOG_INTERVAL seconds (when there are lookups).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._log_time = time.monotonic()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.upstream_time = 0.0
+        self.skipped = 0
+
+    def record(self, cache_hits: int = 0, cache_misses: int = 0, skipped: int = 0):
+        now = time.monotonic()
+        with self._lock:
+            self.cache_hits += cache_hits
+            self.cache_misses += cache_misses
+            self.skipped += skipped
+            must_log = 0 < METRICS_LOG_INTERVAL <= now - self._log_time
+            if must_log:
+                self._log_time = now
+        if must_log:
+            logger.info(f'PubMed stats: {self.as_dict()}')
+
+    def record_upstream_call(self, elapsed: float, failed: bool):
+        with self._lock:
+            self.upstream_calls += 1
+            self.upstream_time += elapsed
+            if failed:
+                self.upstream_errors += 1
+
+    def as_dict(self) -> Dict[str, float]:
+        """Gets the counters, the cache hit rate and the mean latency (in seconds) of the NCBI API."""
+        with self._lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'cache_hit_rate': self.cache_hits / lookups if lookups else 0.0,
+                'upstream_calls': self.upstream_calls,
+                'upstream_errors': self.upstream_errors,
+                'upstream_mean_latency': self.upstream_time / self.upstream_calls if self.upstream_calls else 0.0,
+                'skipped': self.skipped,
+            }
+
+
+metrics = PubmedMetrics()
+# The NCBI limit is for the API key, so it's split among all the server processes
+rate_limiter = RateLimiter(PUBMED_API_RATE_LIMIT / SERVER_WORKERS)
+
+
+def _get_cache_key(term: str) -> str:
+    """Generates a valid cache key for any search term."""
+    return 'pubmed:' + hashlib.sha1(term.encode('utf8')).hexdigest()
+
+
+async def _search_with_deadline(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, term: str,
+                                timeout: Optional[float], deadline: float) -> Optional[Set[int]]:
+    """Calls the NCBI API respecting the rate limit. Returns None if the term couldn't be resolved."""
+    async with semaphore:
+        if not await rate_limiter.acquire(deadline):
+            return None
+
+        start = time.monotonic()
+        try:
+            pubmed_ids = await asearch_pubmed_ids(client, term, timeout)
+        except Exception as ex:
+            metrics.record_upstream_call(time.monotonic() - start, failed=True)
+            logger.warning(f'Error getting PubMeds for term "{term}": {ex}')
+            return None
+
+    metrics.record_upstream_call(time.monotonic() - start, failed=False)
+    await cache.aset(_get_cache_key(term), list(pubmed_ids), PUBMED_CACHE_TIMEOUT)
+    return pubmed_ids
+
+
+async def aget_pubmed_ids_by_terms(
+        mirnas_and_genes: Iterable[Tuple[str, str]],
+        timeout: Optional[float]
+) -> Dict[Tuple[str, str], Set[int]]:
+    """
+    Gets the PubMed ids from the NCBI API of several miRNA-gene pairs. Cached terms are not requested, the rest
+    are requested concurrently (at most PUBMED_API_MAX_WORKERS at a time) from the event loop, respecting the NCBI
+    rate limit, so no thread waits for them. Terms which fail or can't be requested within PUBMED_API_PAGE_TIMEOUT
+    seconds are omitted from the result.
+    :param mirnas_and_genes: Pairs of miRNA and gene to search.
+    :param timeout: Timeout for every request.
+    :return: Dict with the PubMed ids by (miRNA, gene).
+    """
+    terms = {pair: build_search_term(*pair) for pair in set(mirnas_and_genes)}
+    cache_keys = {pair: _get_cache_key(term) for pair, term in terms.items()}
+    cached = await cache.aget_many(list(cache_keys.values()))
+
+    result: Dict[Tuple[str, str], Set[int]] = {}
+    pending_terms: Dict[Tuple[str, str], str] = {}
+    for pair, term in terms.items():
+        cached_ids = cached.get(cache_keys[pair])
+        if cached_ids is not None:
+            result[pair] = set(cached_ids)
+        else:
+            pending_terms[pair] = term
+
+    skipped = 0
+    if pending_terms:
+        deadline = time.monotonic() + PUBMED_API_PAGE_TIMEOUT
+        semaphore = asyncio.Semaphore(PUBMED_API_MAX_WORKERS)
+        limits = httpx.Limits(max_connections=PUBMED_API_MAX_WORKERS)
+        async with httpx.AsyncClient(limits=limits) as client:
+            pending = {
+                asyncio.create_task(_search_with_deadline(client, semaphore, term, timeout, deadline)): pair
+                for pair, term in pending_terms.items()
+            }
+            done, not_done = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()) + (timeout or 0)
+            )
+
+            # Requests that are still running after the deadline are cancelled before the client is closed
+            for task in not_done:
+                task.cancel()
+            await asyncio.gather(*not_done, return_exceptions=True)
+
+        skipped = len(not_done)
+        for task in done:
+            pubmed_ids = task.result()
+            if pubmed_ids is not None:
+                result[pending[task]] = pubmed_ids
+            else:
+                skipped += 1
+
+    metrics.record(cache_hits=len(terms) - len(pending_terms), cache_misses=len(pending_terms), skipped=skipped)
+    logger.debug(f'PubMeds retrieved for {len(terms)} terms ({len(pending_terms)} not cached, {skipped} skipped)')
+    return result
+
+
+def get_pubmed_ids_by_terms(
+        mirnas_and_genes: Iterable[Tuple[str, str]],
+        timeout: Optional[float]
+) -> Dict[Tuple[str, str], Set[int]]:
+    """
+    Sync version of aget_pubmed_ids_by_terms(). The requests run concurrently in an event loop, but the calling thread
+    is blocked until all of them finish, so async views must await aget_pubmed_ids_by_terms() instead.
+    """
+    return async_to_sync(aget_pubmed_ids_by_terms)(mirnas_and_genes, timeout)
+
+
 def get_pubmed_info(pubmed_id: str, cache: Dict[str, str]) -> Optional[str]:
     """
     Gets the pubmed info for a given pubmed id.
@@ -1,11 +1,51 @@
+import logging
+import sys
+import threading
 from collections import namedtuple
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from django.db import DatabaseError
+from ModulectorBackend.settings import DEBUG
+from modulector.services import cache_service
 from modulector.utils import link_builder
 
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
 function_dict = {
     'mirbase': link_builder.build_link_mirdb
 }
 
+_templates: Optional[Tuple[Tuple, ...]] = None
+_templates_version: Optional[int] = None
+_templates_lock = threading.Lock()
+
+
+def get_templates() -> Tuple[Tuple, ...]:
+    """
+    Gets the process-wide copy of the URL templates. It's loaded from the shared cache (or the DB) in case it wasn't
+    loaded yet or the URL templates dataset was reloaded.
+    """
+    global _templates, _templates_version
+    version = cache_service.get_dataset_version(cache_service.URL_TEMPLATES_DATASET)
+    templates = _templates
+    if templates is None or _templates_version != version:
+        with _templates_lock:
+            if _templates is None or _templates_version != version:
+                _templates = tuple(link_builder.get_templates())
+                _templates_version = version
+            templates = _templates
+    return templates
+
+
+def warm_up():
+    """Loads the URL templates at startup. DB errors are only logged as the table could not be created yet."""
+    try:
+        get_templates()
+    except DatabaseError as ex:
+        logger.warning(f'URL templates could not be loaded at startup: {ex}')
+
 
 def build_urls(mirna_id: str) -> List[Dict]:
     """
@@ -15,7 +55,7 @@ def build_urls(mirna_id: str) -> List[Dict]:
     """
     UrlItem = namedtuple("UrlItem", "source, url")
     urls = []
-    url_templates = link_builder.get_templates()
+    url_templates = get_templates()
     if mirna_id:
         for index, name, url in url_templates:
             url_string = function_dict.get(name)(mirna_id, url)
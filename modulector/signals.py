@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from modulector.models import UrlTemplate
+from modulector.services import cache_service
+
+
+@receiver([post_save, post_delete], sender=UrlTemplate)
+def url_templates_changed(**_kwargs):
+    """
+    Discards the cached URL templates in every process when one is edited (e.g. from the admin). Bulk operations
+    (QuerySet.update(), bulk_create(), etc.) don't send signals, so they must bump the dataset version themselves.
+    """
+    cache_service.bump_dataset_version(cache_service.URL_TEMPLATES_DATASET)
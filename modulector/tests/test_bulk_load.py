@@ -0,0 +1,71 @@
+import pandas as pd
+from django.test import TestCase
+from modulector.models import MirnaDrug
+from modulector.utils import bulk_load
+
+
+class BulkLoadTests(TestCase):
+    """ Testing of the COPY-based bulk load of DataFrames """
+
+    def testBulkLoad(self):
+        """Tests that COPY loads the DataFrame values (empty strings, quotes, booleans) as they are"""
+        data = pd.DataFrame({
+            'mature_mirna': ['hsa-test-1', 'hsa-test-2'],
+            'mirbase_accession_id': ['', 'MIMAT_TEST'],
+            'small_molecule': ['Molecule, "quoted"', 'Multi\nline'],
+            'fda_approved': [True, False],
+            'detection_method': ['Method', 'Method'],
+            'condition': ['Condition', 'Condition'],
+            'pubmed_id': [123, 456],
+            'reference': ['Reference', 'Reference'],
+            'support': ['Support', 'Support'],
+            'expression_pattern': ['up-regulated', 'down-regulated'],
+        })
+        self.assertEqual(bulk_load.copy_dataframe(MirnaDrug, data), 2)
+
+        drugs = list(MirnaDrug.objects.filter(mature_mirna__startswith='hsa-test-').order_by('mature_mirna').values(
+            *data.columns
+        ))
+        self.assertEqual(len(drugs), 2)
+        self.assertEqual(drugs[0]['mirbase_accession_id'], '')
+        self.assertEqual(drugs[0]['small_molecule'], 'Molecule, "quoted"')
+        self.assertEqual(drugs[1]['small_molecule'], 'Multi\nline')
+        self.assertEqual([drug['fda_approved'] for drug in drugs], [True, False])
+        self.assertEqual([int(drug['pubmed_id']) for drug in drugs], [123, 456])
+
+    def testIncrementalBulkLoad(self):
+        """Tests that the incremental load only applies the differences with the current data"""
+        MirnaDrug.objects.all().delete()
+        data = pd.DataFrame({
+            'mature_mirna': ['hsa-test-1', 'hsa-test-2', 'hsa-test-2'],
+            'mirbase_accession_id': ['MIMAT_TEST_1', 'MIMAT_TEST_2', 'MIMAT_TEST_2'],
+            'small_molecule': ['Molecule 1', 'Molecule 2', 'Molecule 2'],
+            'fda_approved': [True, False, False],
+            'detection_method': ['Method', 'Method', 'Method'],
+            'condition': ['Condition', 'Condition', 'Condition'],
+            'pubmed_id': [123, 456, 456],
+            'reference': ['Reference', 'Reference', 'Reference'],
+            'support': ['Support', 'Support', 'Support'],
+            'expression_pattern': ['up-regulated', 'down-regulated', 'down-regulated'],
+        })
+        result = bulk_load.sync_dataframe(MirnaDrug, data)
+        self.assertEqual((result.inserted, result.updated, result.deleted), (3, 0, 0))
+        unchanged_id = MirnaDrug.objects.get(mature_mirna='hsa-test-1').pk
+
+        # Same data, nothing to do
+        self.assertFalse(bulk_load.sync_dataframe(MirnaDrug, data).changed)
+
+        # Removes a duplicate and changes a row (without key, it's replaced)
+        data = data.iloc[:2].copy()
+        data.loc[1, 'small_molecule'] = 'Molecule 3'
+        result = bulk_load.sync_dataframe(MirnaDrug, data)
+        self.assertEqual((result.inserted, result.updated, result.deleted), (1, 0, 2))
+        self.assertEqual(MirnaDrug.objects.get(mature_mirna='hsa-test-1').pk, unchanged_id)
+        self.assertEqual(MirnaDrug.objects.get(mature_mirna='hsa-test-2').small_molecule, 'Molecule 3')
+
+        # With key, changed rows are updated in place
+        data.loc[1, 'small_molecule'] = 'Molecule 4'
+        result = bulk_load.sync_dataframe(MirnaDrug, data, key_fields=['mature_mirna'])
+        self.assertEqual((result.inserted, result.updated, result.deleted), (0, 1, 0))
+        self.assertEqual(list(MirnaDrug.objects.order_by('mature_mirna').values_list('small_molecule', flat=True)),
+                         ['Molecule 1', 'Molecule 4'])
@@ -0,0 +1,64 @@
+import threading
+from unittest import skipIf
+from unittest.mock import patch
+from django.db import connections
+from django.test import TestCase
+from ModulectorBackend.settings import DB_POOL_SIZE
+from modulector.db_pool import pool
+from modulector.db_pool.pool import get_pool
+
+
+@skipIf(DB_POOL_SIZE == 0, 'The connection pool is disabled')
+class DbPoolTests(TestCase):
+    """ Testing of the DB connection pool """
+
+    def testConnectionPool(self):
+        """Tests that the connections closed by a thread are reused by the others"""
+        backend_pids = []
+
+        def query():
+            conn = connections['default']
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                backend_pids.append(cursor.fetchone()[0])
+            conn.close()
+
+        for _ in range(2):
+            thread = threading.Thread(target=query)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(backend_pids[0], backend_pids[1])
+        stats = get_pool('default', connections['default'].settings_dict).get_stats()
+        self.assertGreaterEqual(stats['idle'], 1)
+        self.assertGreaterEqual(stats['checkouts'], 2)
+
+    def testPoolByDatabase(self):
+        """Tests that connections to another database are not taken from the pool of the current one"""
+        settings_dict = connections['default'].settings_dict
+        other_settings = {**settings_dict, 'NAME': f'{settings_dict["NAME"]}_other'}
+        self.assertIs(get_pool('default', settings_dict), get_pool('default', dict(settings_dict)))
+        self.assertIsNot(get_pool('default', settings_dict), get_pool('default', other_settings))
+
+    def testPoolStatsLog(self):
+        """Tests that the stats of the pools are logged every METRICS_LOG_INTERVAL seconds"""
+        def query():
+            conn = connections['default']
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.close()
+
+        with patch.multiple(pool, METRICS_LOG_INTERVAL=60, _log_time=float('-inf')):
+            with self.assertLogs(pool.logger, 'INFO') as logs:
+                thread = threading.Thread(target=query)
+                thread.start()
+                thread.join()
+
+            # It's not logged again until the interval elapses
+            with self.assertNoLogs(pool.logger, 'INFO'):
+                thread = threading.Thread(target=query)
+                thread.start()
+                thread.join()
+
+        settings_dict = connections['default'].settings_dict
+        self.assertIn(f"'default/{settings_dict['NAME']}': {{'size'", logs.output[0])
@@ -0,0 +1,108 @@
+import tempfile
+from django.db import connection, models
+from django.test import TestCase
+from django.utils import timezone
+from modulector.models import Mirna, MirnaSource, MirnaXGene, MirTarBaseInteraction
+from modulector.processors import mirdip_processor, mirtarbase_processor
+from modulector.utils import table_swap
+
+
+class SwapTestItem(models.Model):
+    """Table created only by the tests. Django creates its ID as an identity column (as in fresh installs)"""
+    name = models.CharField(max_length=20)
+
+    class Meta:
+        app_label = 'modulector'
+        managed = False
+
+
+class InteractionsImportTests(TestCase):
+    """ Testing of the zero-downtime import of the interactions (see table_swap.import_with_swap()) """
+
+    @staticmethod
+    def __create_source(name: str) -> MirnaSource:
+        source = MirnaSource.objects.filter(name=name).first()
+        if source is None:
+            source = MirnaSource.objects.create(name=name, site_url='', min_score=0, max_score=1,
+                                                synchronization_date=timezone.now())
+        return source
+
+    def testMirdipImport(self):
+        """Tests that the mirDIP import replaces only the mirDIP interactions and can be rolled back"""
+        mirdip = self.__create_source('mirdip')
+        other_source = self.__create_source('test-source')
+        mirna = Mirna.objects.create(mirna_code='hsa-test-1')
+        other = MirnaXGene.objects.create(mirna=mirna, gene='TESTGENE1', score=0.5, mirna_source=other_source)
+        previous_mirdip_count = MirnaXGene.objects.filter(mirna_source=mirdip).count()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as file:
+            file.write('TESTGENE2,hsa-test-1,3,0.9,TargetScan|miRDB|MirTarget,H\n')
+            file.write('TESTGENE3,hsa-test-2,1,0.1,TargetScan,L\n')
+            file.flush()
+            rows = mirdip_processor.process(file.name)
+
+        self.assertEqual(rows, 2)
+        self.assertEqual(
+            sorted(MirnaXGene.objects.filter(mirna_source=mirdip).values_list('mirna__mirna_code', 'gene')),
+            [('hsa-test-1', 'TESTGENE2'), ('hsa-test-2', 'TESTGENE3')]
+        )
+        # The interactions of the other sources are kept with their IDs
+        self.assertEqual(MirnaXGene.objects.get(mirna_source=other_source), other)
+
+        mirdip_processor.rollback()
+        self.assertEqual(MirnaXGene.objects.filter(mirna_source=mirdip).count(), previous_mirdip_count)
+        self.assertTrue(MirnaXGene.objects.filter(pk=other.pk).exists())
+
+    def testMirtarbaseImport(self):
+        """Tests the miRTarBase import into a shadow table and its swap and rollback"""
+        previous_count = MirTarBaseInteraction.objects.count()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as file:
+            file.write('miRTarBase ID,miRNA,Species (miRNA),Target Gene,Target Gene (Entrez ID),Species (Target Gene),'
+                       'Experiments,Support Type,References (PMID)\n')
+            file.write('MIRT_TEST,hsa-test-1,Homo sapiens,TESTGENE1,1234.0,Homo sapiens,'
+                       'Luciferase reporter assay//Western blot,Functional MTI,17179747.0\n')
+            file.flush()
+            rows = mirtarbase_processor.process(file.name)
+
+        self.assertEqual(rows, 1)
+        interaction = MirTarBaseInteraction.objects.get()
+        self.assertEqual(interaction.mirtarbase_id, 'MIRT_TEST')
+        self.assertEqual(interaction.experiments, ['Luciferase reporter assay', 'Western blot'])
+        self.assertEqual((interaction.target_gene_entrez_id, interaction.pmid), ('1234', '17179747'))
+
+        # New rows get IDs in the swapped table
+        MirTarBaseInteraction.objects.create(mirtarbase_id='MIRT_TEST_2', mirna='hsa-test-2', gene='TESTGENE2',
+                                             experiments=['qRT-PCR'], support_type='Functional MTI', pmid='1')
+        self.assertEqual(MirTarBaseInteraction.objects.count(), 2)
+
+        mirtarbase_processor.rollback()
+        self.assertEqual(MirTarBaseInteraction.objects.count(), previous_count)
+        self.assertFalse(MirTarBaseInteraction.objects.filter(mirtarbase_id__startswith='MIRT_TEST').exists())
+
+        table_swap.drop_old_table(MirTarBaseInteraction)
+        with self.assertRaises(ValueError):
+            mirtarbase_processor.rollback()
+
+    def testIdentityColumnSwap(self):
+        """Tests that rows copied from the live table with their IDs don't collide with the new ones"""
+        with connection.schema_editor() as editor:
+            editor.create_model(SwapTestItem)
+        kept = SwapTestItem.objects.create(name='kept')
+        discarded = SwapTestItem.objects.create(name='discarded')
+
+        def load(table: str) -> int:
+            quote_name = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    INSERT INTO {quote_name(table)} (id, name)
+                    SELECT id, name FROM {quote_name(SwapTestItem._meta.db_table)} WHERE name = 'kept'
+                """)
+                cursor.execute(f"INSERT INTO {quote_name(table)} (name) VALUES ('new_1'), ('new_2')")
+            return 3
+
+        self.assertEqual(table_swap.import_with_swap(SwapTestItem, load), 3)
+        self.assertEqual(
+            list(SwapTestItem.objects.order_by('id').values_list('id', 'name')),
+            [(kept.pk, 'kept'), (discarded.pk + 1, 'new_1'), (discarded.pk + 2, 'new_2')]
+        )
+        self.assertEqual(SwapTestItem.objects.create(name='after_swap').pk, discarded.pk + 3)
@@ -1,5 +1,9 @@
 import json
-from django.test import Client, TestCase
+from unittest.mock import patch
+from django.test import AsyncClient, Client, TestCase
+from modulector.services import methylation_service
+from modulector.utils.prefix_index import CompactPrefixIndex
+from modulector.views import STREAMING_THRESHOLD
 
 client = Client()
 
@@ -80,6 +84,38 @@ class MethylationTests(TestCase):
         self.assertTrue(len(data) == 1)
         self.assertIsInstance(list(data)[0], str)
 
+    def testMethylationDetails4(self):
+        """ Tests the batch details of a list of methylation sites """
+        data_body = json.dumps({"methylation_sites": ["cg22461615", "thisIsNotAMethylationSite", "cg22461615"]})
+        with self.assertNumQueries(1):
+            response = client.post('/methylation/', data=data_body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(list(data.keys()), ["cg22461615", "thisIsNotAMethylationSite"])
+        self.assertIsNone(data["thisIsNotAMethylationSite"])
+        self.assertEqual(data["cg22461615"], client.get('/methylation/', {'methylation_site': 'cg22461615'}).data)
+
+    def testMethylationDetails5(self):
+        """ Tests the batch details with an invalid body """
+        response = client.post('/methylation/', data=json.dumps({"methylation_sites": "cg22461615"}),
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue("detail" in response.data)
+
+        response = client.post('/methylation/', data=json.dumps({"methylation": ["cg22461615"]}),
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue("detail" in response.data)
+
+    async def testMethylationDetails6(self):
+        """ Tests that the details are served by the async view from the event loop """
+        response = await AsyncClient().get('/methylation/', {'methylation_site': 'cg22461615'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'cg22461615')
+
+        response = await AsyncClient().get('/methylation/', {'methylation_site': 'thisIsNotAMethylationSite'})
+        self.assertEqual(response.status_code, 400)
+
     """ Testing /methylation-sites-finder/ endpoint """
 
     def testMethylationSitesFinder1(self):
@@ -107,6 +143,25 @@ class MethylationTests(TestCase):
         self.assertIsInstance(data, list)
         self.assertTrue(len(data) == 0)
 
+    def testMethylationSitesFinder4(self):
+        """ Tests that the search is case-insensitive and results are sorted """
+        response = client.get('/methylation-sites-finder/', {'query': 'CG25', 'limit': 7})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertTrue(len(data) == 7)
+        self.assertTrue(all(name.startswith('cg25') for name in data))
+        self.assertEqual(data, sorted(data))
+
+    def testCompactPrefixIndex1(self):
+        """ Tests the compact prefix index ranking, limit and non-ASCII values """
+        index = CompactPrefixIndex(['cg25908985', 'cg25', 'cg00000029', 'cg25908985', 'ch.1.123', 'cgé', '', None])
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.search('CG25', 10), ['cg25', 'cg25908985'])
+        self.assertEqual(index.search('cg', 1), ['cg00000029'])
+        self.assertEqual(index.search('CH.', 10), ['ch.1.123'])
+        self.assertEqual(index.search('cgé', 10), [])
+        self.assertEqual(index.search('rs', 10), [])
+
     """ Testing /methylation-sites/ endpoint """
 
     def testMethylationSites1(self):
@@ -153,6 +208,50 @@ class MethylationTests(TestCase):
         data = response.data
         self.assertTrue("detail" in data)
 
+    def testMethylationSites4(self):
+        """ Tests the translation counters and that big requests are streamed """
+        data_body = json.dumps({"methylation_sites": ["cg22461615_TC11", "cg25908985", "invalid_data"]})
+        response = client.post('/methylation-sites/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Matched-Sites'], '2')
+        self.assertEqual(response['X-Unmatched-Sites'], '1')
+
+        methylation_sites = [f"name_{i}" for i in range(STREAMING_THRESHOLD)] + ["cg22461615_TC11"]
+        data_body = json.dumps({"methylation_sites": methylation_sites})
+        response = client.post('/methylation-sites/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response))
+        self.assertEqual(list(data.keys()), methylation_sites)
+        self.assertEqual(data["name_0"], [])
+        self.assertEqual(data["cg22461615_TC11"], ["cg22461615"])
+
+    def testMethylationSites5(self):
+        """ Tests that the translation counters are sent in the body, also when the response is streamed """
+        data_body = json.dumps({"methylation_sites": ["cg22461615_TC11", "invalid_data"], "include_stats": True})
+        response = client.post('/methylation-sites/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["methylation_sites"]["cg22461615_TC11"], ["cg22461615"])
+        self.assertEqual(response.data["stats"], {"matched": 1, "unmatched": 1, "ambiguous": 0})
+
+        methylation_sites = [f"name_{i}" for i in range(STREAMING_THRESHOLD)] + ["cg22461615_TC11"]
+        data_body = json.dumps({"methylation_sites": methylation_sites, "include_stats": True})
+        response = client.post('/methylation-sites/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response))
+        self.assertEqual(list(data["methylation_sites"].keys()), methylation_sites)
+        self.assertEqual(data["stats"], {"matched": 1, "unmatched": STREAMING_THRESHOLD, "ambiguous": 0})
+
+        data_body = json.dumps({"methylation_sites": ["cg22461615_TC11"], "include_stats": "yes"})
+        response = client.post('/methylation-sites/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
     """ Testing /methylation-sites-genes/ endpoint """
 
     def testMethylationSitesToGenes1(self):
@@ -188,3 +287,28 @@ class MethylationTests(TestCase):
         self.assertEqual(response.status_code, 400)
         data = response.data
         self.assertTrue("detail" in data)
+
+    def testMethylationSitesToGenes4(self):
+        """ Tests that big requests are streamed and return the same genes """
+        methylation_sites = [f"name_{i}" for i in range(STREAMING_THRESHOLD)] + ["cg17771854_BC11", "cg22461615"]
+        data_body = json.dumps({"methylation_sites": methylation_sites})
+        response = client.post('/methylation-sites-genes/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response))
+        self.assertEqual(list(data.keys()), ["cg17771854_BC11", "cg22461615"])
+        self.assertEqual(data["cg17771854_BC11"], ["IPO13"])
+        self.assertEqual(data["cg22461615"], ["THAP9", "THAP9-AS1", "SEC31A"])
+
+    def testMethylationSitesToGenes5(self):
+        """ Tests that sites split in shards queried in parallel return the same genes in the input order """
+        methylation_sites = ["name_007", "cg22461615", "cg17771854_BC11", "cg22461615_TC11"]
+        data_body = json.dumps({"methylation_sites": methylation_sites})
+        response = client.post('/methylation-sites-genes/', data=data_body, content_type='application/json')
+        with patch.object(methylation_service, 'BULK_QUERY_BATCH_SIZE', 1):
+            sharded_response = client.post('/methylation-sites-genes/', data=data_body,
+                                           content_type='application/json')
+        self.assertEqual(sharded_response.status_code, 200)
+        self.assertEqual(list(sharded_response.data.items()), list(response.data.items()))
+        self.assertEqual(list(sharded_response.data.keys())[:2], ["cg22461615", "cg17771854_BC11"])
@@ -1,12 +1,39 @@
+import io
 import json
-from django.test import Client, TestCase
+import tempfile
+from unittest.mock import patch
+import numpy as np
+from django.db import connection
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from modulector.serializers import get_accession_from_mirna, get_mirna_from_accession, get_mirna_aliases
+from modulector.models import Mirna, MirbaseIdMirna, UrlTemplate
+from modulector.processors import sequence_processor
+from modulector.services import mirna_alias_service, cache_service, interactions_service, \
+    interactions_snapshot_service, gene_alias_service, url_service
+from modulector.services.gene_alias_service import GeneSynonymIndex
+from modulector.services.mirna_alias_service import MirnaAliasIndex
+from modulector.utils.prefix_index import PrefixIndex
+from modulector.views import STREAMING_THRESHOLD
 
 client = Client()
 
 
+# The reference data generated during the tests (in rolled back transactions) must not reach the server cache
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'modulector-tests'}
+})
 class MiRNATests(TestCase):
     """ Testing of miRNA endpoints """
 
+    def setUp(self):
+        caches['default'].clear()
+        cache_service._versions.clear()
+
+    def tearDown(self):
+        cache_service._versions.clear()
+
     def __check_pagination(self, response):
         """check that the response is paginated"""
         self.assertTrue('count' in response.data)
@@ -30,6 +57,31 @@ class MiRNATests(TestCase):
         self.assertIsNone(response.data['next'])
         self.assertIsNone(response.data['previous'])
 
+    def testLoadSequences1(self):
+        """Tests that the sequences are updated in the miRNAs of every accession ID and unknown ones are skipped"""
+        mirna_codes = get_mirna_from_accession('MIMAT0000062')
+        self.assertTrue(len(mirna_codes) > 0)
+        updated, matched, skipped = sequence_processor.load_sequences([
+            ('MIMAT0000062', 'ACGUACGU'), ('MIMAT_INVALID', 'ACGU'), ('MIMAT0000062', 'UGCAUGCA')
+        ])
+        self.assertEqual(matched, 1)
+        self.assertEqual(skipped, 1)
+        self.assertEqual(updated, Mirna.objects.filter(mirna_code__in=mirna_codes).count())
+        # The last sequence of the accession ID wins
+        for sequence in Mirna.objects.filter(mirna_code__in=mirna_codes).values_list('mirna_sequence', flat=True):
+            self.assertEqual(sequence, 'UGCAUGCA')
+
+    def testLoadSequences2(self):
+        """Tests that accession IDs whose miRNAs are updated by a later accession ID are not counted as skipped"""
+        Mirna.objects.create(mirna_code='hsa-test-seq')
+        MirbaseIdMirna.objects.create(mirbase_accession_id='MIMAT_TEST_1', mature_mirna='hsa-test-seq')
+        MirbaseIdMirna.objects.create(mirbase_accession_id='MIMAT_TEST_2', mature_mirna='hsa-test-seq')
+        updated, matched, skipped = sequence_processor.load_sequences([
+            ('MIMAT_TEST_1', 'ACGU'), ('MIMAT_TEST_2', 'UGCA'), ('MIMAT_INVALID', 'ACGU')
+        ])
+        self.assertEqual((updated, matched, skipped), (1, 1, 1))
+        self.assertEqual(Mirna.objects.get(mirna_code='hsa-test-seq').mirna_sequence, 'UGCA')
+
     """ Testing /mirna/ endpoint """
 
     def testMirnaList1(self):
@@ -154,6 +206,207 @@ class MiRNATests(TestCase):
         egfr_response = client.get('/mirna-target-interactions/', {'gene': 'EGFR'})
         self.assertEqual(response.data['count'], egfr_response.data['count'])
 
+    def testMirnaTargetInteractions7(self):
+        """Tests that the number of queries doesn't depend on the page size"""
+        mirna_alias_service.get_index()
+        queries_count = []
+        for page_size in (1, 50):
+            with patch('modulector.serializers.USE_PUBMED_API', False), CaptureQueriesContext(connection) as queries:
+                response = client.get('/mirna-target-interactions/', {
+                    'mirna': 'hsa-miR-891a-5p',
+                    'include_pubmeds': 'true',
+                    'page_size': page_size
+                })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), page_size)
+            queries_count.append(len(queries))
+        self.assertEqual(queries_count[0], queries_count[1])
+
+    def testMirnaTargetInteractions8(self):
+        """Tests that cursor pagination returns the same interactions as page pagination without counting them"""
+        params = {'mirna': 'hsa-miR-891a-5p', 'ordering': '-score', 'page_size': 1000}
+        expected_ids = [interaction['id'] for interaction in
+                        client.get('/mirna-target-interactions/', params).data['results']]
+
+        ids = []
+        scores = []
+        response = client.get('/mirna-target-interactions/', {**params, 'page_size': 7, 'pagination': 'cursor'})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(response.data['count'])
+            self.assertIsNone(response.data['previous'])
+            ids.extend(interaction['id'] for interaction in response.data['results'])
+            scores.extend(float(interaction['score']) for interaction in response.data['results'])
+            next_url = response.data['next']
+            if next_url is None:
+                break
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(next_url)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        self.assertCountEqual(ids, expected_ids)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def testMirnaTargetInteractions9(self):
+        """Tests cursor pagination with an invalid cursor"""
+        response = client.get('/mirna-target-interactions/', {
+            'mirna': 'hsa-miR-891a-5p',
+            'pagination': 'cursor',
+            'cursor': 'invalid'
+        })
+        self.assertEqual(response.status_code, 404)
+
+    def testMirnaTargetInteractions10(self):
+        """Tests the NDJSON and CSV export of all the interactions"""
+        params = {'mirna': 'hsa-miR-891a-5p', 'page_size': 1000}
+        expected = client.get('/mirna-target-interactions/', params).data['results']
+
+        response = client.get('/mirna-target-interactions/', {**params, 'export': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response).decode().splitlines()]
+        self.assertEqual(len(rows), len(expected))
+        for row, interaction in zip(rows, expected):
+            for field in ('id', 'mirna', 'gene', 'score', 'source_name', 'sources', 'score_class'):
+                self.assertEqual(row[field], interaction[field])
+
+        response = client.get('/mirna-target-interactions/', {**params, 'export': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response).decode().splitlines()
+        self.assertEqual(lines[0], 'id,mirna,gene,score,source_name,sources,score_class')
+        self.assertEqual(len(lines), len(expected) + 1)
+
+        response = client.get('/mirna-target-interactions/', {**params, 'export': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    """ Testing /mirna-target-interactions-batch/ endpoint """
+
+    def testMirnaTargetInteractionsBatch1(self):
+        """Tests that the batch returns the same interactions as the paginated endpoint, grouped by input miRNA"""
+        data_body = json.dumps({'mirnas': ['hsa-miR-891a-5p', 'goku_capo'], 'genes': ['EGFR', 'ERBB1']})
+        response = client.post('/mirna-target-interactions-batch/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response))
+        self.assertEqual(list(data.keys()), ['hsa-miR-891a-5p', 'goku_capo'])
+        self.assertEqual(data['goku_capo'], [])
+
+        expected = client.get('/mirna-target-interactions/', {'mirna': 'hsa-miR-891a-5p', 'gene': 'EGFR'})
+        self.assertCountEqual([interaction['id'] for interaction in data['hsa-miR-891a-5p']],
+                              [interaction['id'] for interaction in expected.data['results']])
+        for interaction in data['hsa-miR-891a-5p']:
+            self.assertEqual(interaction['input_genes'], ['EGFR', 'ERBB1'])
+
+    def testMirnaTargetInteractionsBatch2(self):
+        """Tests the score threshold and the grouping by gene when no miRNAs are provided"""
+        data_body = json.dumps({'genes': ['EGFR'], 'score': 0.05})
+        response = client.post('/mirna-target-interactions-batch/', data=data_body,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(b''.join(response))
+        self.assertEqual(list(data.keys()), ['EGFR'])
+        scores = [float(interaction['score']) for interaction in data['EGFR']]
+        self.assertTrue(all(score >= 0.05 for score in scores))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def testMirnaTargetInteractionsBatch3(self):
+        """Tests invalid bodies"""
+        for body in ({}, {'mirnas': 'hsa-miR-891a-5p'}, {'mirnas': ['hsa-miR-891a-5p'], 'score': 2},
+                     {'genes': ['EGFR'], 'score': 'high'}, {'genes': ['EGFR'], 'limit': 0},
+                     {'genes': ['EGFR'], 'limit': True}):
+            response = client.post('/mirna-target-interactions-batch/', data=json.dumps(body),
+                                   content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertTrue('detail' in response.data)
+
+    def testMirnaTargetInteractionsBatch4(self):
+        """Tests that the limit returns the top interactions of every input"""
+        for body in ({'mirnas': ['hsa-miR-891a-5p', 'MIMAT0004979'], 'score': 0.05}, {'genes': ['EGFR', 'ERBB1']}):
+            data = json.loads(b''.join(client.post('/mirna-target-interactions-batch/', data=json.dumps(body),
+                                                   content_type='application/json')))
+            limited = json.loads(b''.join(client.post('/mirna-target-interactions-batch/',
+                                                      data=json.dumps({**body, 'limit': 5}),
+                                                      content_type='application/json')))
+            self.assertEqual(list(limited.keys()), list(data.keys()))
+            for identifier, interactions in data.items():
+                self.assertEqual(limited[identifier], interactions[:5])
+
+    """ Testing /mirna-gene-score-matrix/ endpoint """
+
+    def testMirnaGeneScoreMatrix1(self):
+        """Tests the matrix against the interactions endpoint"""
+        mirnas = ['hsa-miR-891a-5p', 'goku_capo']
+        genes = ['EGFR', 'ERBB1', 'APPBP2']
+        response = client.post('/mirna-gene-score-matrix/', data=json.dumps({'mirnas': mirnas, 'genes': genes}),
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        content = b''.join(response)
+        self.assertEqual(int(response['Content-Length']), len(content))
+        data = np.load(io.BytesIO(content))
+        scores = data['scores']
+        self.assertEqual(scores.shape, (2, 3))
+        self.assertEqual(scores.dtype, np.float32)
+        self.assertEqual(list(data['mirnas']), mirnas)
+        self.assertEqual(list(data['genes']), genes)
+
+        # Unknown miRNAs have no interactions and aliases of the same gene share the scores
+        self.assertTrue(np.isnan(scores[1]).all())
+        np.testing.assert_array_equal(scores[:, 0], scores[:, 1])
+
+        interaction = client.get('/mirna-target-interactions/', {'mirna': mirnas[0], 'gene': 'EGFR'}).data
+        self.assertAlmostEqual(float(scores[0, 0]), float(interaction['results'][0]['score']), places=5)
+
+    def testMirnaGeneScoreMatrix2(self):
+        """Tests invalid bodies"""
+        for body in ({}, {'mirnas': ['hsa-miR-891a-5p']}, {'mirnas': 'hsa-miR-891a-5p', 'genes': ['EGFR']},
+                     {'mirnas': ['hsa-miR-891a-5p'], 'genes': [1]}):
+            response = client.post('/mirna-gene-score-matrix/', data=json.dumps(body),
+                                   content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertTrue('detail' in response.data)
+
+    def testInteractionsSnapshot1(self):
+        """Tests that the batch interactions and the score matrix are the same reading from a snapshot"""
+        mirnas = ['hsa-miR-891a-5p', 'MIMAT0004979', 'goku_capo']
+        genes = ['EGFR', 'ERBB1', 'APPBP2', 'goku_capo']
+
+        def get_results():
+            return (
+                [list(interactions_service.get_interactions_by_input(mirnas, genes, score)) for score in (None, 0.05)],
+                list(interactions_service.get_interactions_by_input(None, ['APPBP2'], 0.5)),
+                interactions_service.get_score_matrix(mirnas, genes)
+            )
+
+        expected_interactions, expected_genes_interactions, expected_matrix = get_results()
+
+        # Exports only the requested miRNAs (and some other) as exporting all the interactions takes too long
+        mirna_codes = {alias for mirna in mirnas for alias in get_mirna_aliases(mirna)} | {'hsa-miR-122-5p'}
+        exported_mirnas = list(
+            Mirna.objects.filter(mirna_code__in=mirna_codes).order_by('mirna_code').values_list('id', 'mirna_code')
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            with patch.object(interactions_snapshot_service, 'Mirna') as mirna_model:
+                mirna_model.objects.order_by.return_value.values_list.return_value = exported_mirnas
+                interactions_snapshot_service.export_snapshot(directory, partitions=3)
+
+            with patch.multiple(interactions_snapshot_service, INTERACTIONS_SNAPSHOT_READS=True,
+                                INTERACTIONS_SNAPSHOT_DIR=directory, _snapshot=None, _snapshot_name=None,
+                                _snapshot_check_time=float('-inf')):
+                self.assertIsNotNone(interactions_snapshot_service.get_snapshot())
+                interactions, genes_interactions, matrix = get_results()
+
+        self.assertEqual(interactions, expected_interactions)
+        # Only the interactions of the exported miRNAs are in the snapshot
+        self.assertEqual(
+            genes_interactions[0][1],
+            [interaction for interaction in expected_genes_interactions[0][1]
+             if interaction['mirna'] in mirna_codes]
+        )
+        np.testing.assert_array_equal(matrix, expected_matrix)
+
     """ Testing /mirna-target-validation/ endpoint """
 
     def testMirnaTargetValidation1(self) -> None:
@@ -224,6 +477,15 @@ class MiRNATests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.__check_pagination(response)
 
+    def testMirnaTargetValidation7(self) -> None:
+        """Tests the NDJSON export of all the validations"""
+        params = {'mirna': 'hsa-miR-122-5p', 'page_size': 1000}
+        expected = client.get('/mirna-target-validation/', params).data['results']
+        response = client.get('/mirna-target-validation/', {**params, 'export': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response).decode().splitlines()]
+        self.assertEqual(rows, [dict(validation) for validation in expected])
+
     """ Testing /mirna-aliases/ endpoint """
 
     def testMirnaAliases1(self):
@@ -293,6 +555,62 @@ class MiRNATests(TestCase):
         data = response.data
         self.assertTrue("detail" in data)
 
+    def testMirnaCodes4(self):
+        """ Tests that big requests are streamed and keep the mapping of every input """
+        mirna_codes = [f"name_{i}" for i in range(STREAMING_THRESHOLD)] + ["MIMAT0000066", "hsa-let-7e-5p"]
+        data = json.dumps({"mirna_codes": mirna_codes})
+        response = client.post('/mirna-codes/', data=data,
+                               content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response))
+        self.assertEqual(list(data.keys()), mirna_codes)
+        self.assertIsNone(data["name_0"])
+        self.assertEqual(data["MIMAT0000066"], "MIMAT0000066")
+        self.assertEqual(data["hsa-let-7e-5p"], "MIMAT0000066")
+
+    """ Testing /gene-symbols/ endpoint """
+
+    def testGeneSymbols1(self):
+        """ Tests that genes are normalized to their gene symbols without querying the DB """
+        gene_alias_service.get_index()
+        data = json.dumps({"genes": ["EGFR", "name_01", "EGFR"]})
+        with self.assertNumQueries(0):
+            response = client.post('/gene-symbols/', data=data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"EGFR": "EGFR", "name_01": None})
+
+        data = json.dumps({"genes": ["EGFR", "name_01"], "include_aliases": True})
+        response = client.post('/gene-symbols/', data=data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["EGFR"]["gene_symbol"], "EGFR")
+        self.assertEqual(response.data["EGFR"]["aliases"], gene_alias_service.get_gene_aliases("EGFR"))
+        self.assertEqual(response.data["name_01"], {"gene_symbol": None, "aliases": []})
+
+    def testGeneSymbols2(self):
+        """ Tests with invalid bodies """
+        for body in ({"gene": ["EGFR"]}, {"genes": "EGFR"}, {"genes": [1]},
+                     {"genes": ["EGFR"], "include_aliases": "true"}):
+            response = client.post('/gene-symbols/', data=json.dumps(body), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertTrue("detail" in response.data)
+
+    def testGeneSynonymIndex1(self):
+        """Tests that the index keeps the first match and all the aliases of every gene symbol"""
+        index = GeneSynonymIndex([
+            ('EGFR', 'ERBB1'),
+            ('EGFR', 'HER1'),
+            ('ERBB1', 'OTHER'),
+            ('EGFR', 'ERBB1'),
+        ])
+        self.assertEqual(index.get_gene_symbol('HER1'), 'EGFR')
+        self.assertEqual(index.get_gene_symbol('ERBB1'), 'EGFR')
+        self.assertEqual(index.get_gene_symbol('OTHER'), 'ERBB1')
+        self.assertIsNone(index.get_gene_symbol('name_01'))
+        self.assertEqual(index.get_aliases('HER1'), ['ERBB1', 'HER1', 'EGFR'])
+        self.assertEqual(index.get_aliases('OTHER'), ['OTHER', 'ERBB1'])
+        self.assertEqual(index.get_aliases('name_01'), [])
+
     """ Testing /mirna-codes-finder/ endpoint """
 
     def testMirnaCodesFinder1(self):
@@ -319,3 +637,92 @@ class MiRNATests(TestCase):
         data = response.data
         self.assertIsInstance(data, list)
         self.assertTrue(len(data) == 0)
+
+    def testMirnaCodesFinder4(self):
+        """ Tests that the finder index is kept in memory until the miRBase dataset is reloaded """
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_service.bump_dataset_version(cache_service.MIRBASE_DATASET)
+        response = client.get('/mirna-codes-finder/', {'query': 'hsa-let', 'limit': 5})
+        with self.assertNumQueries(0):
+            cached_response = client.get('/mirna-codes-finder/', {'query': 'hsa-let', 'limit': 5})
+        self.assertEqual(response.data, cached_response.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_service.bump_dataset_version(cache_service.MIRBASE_DATASET)
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/mirna-codes-finder/', {'query': 'hsa-let', 'limit': 5})
+        self.assertGreater(len(queries), 0)
+
+    def testMirnaCodesFinder5(self):
+        """ Tests that results are case-insensitive, ranked and without duplicates """
+        response = client.get('/mirna-codes-finder/', {'query': 'HSA-LET-7A', 'limit': 20})
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertTrue(len(data) > 0)
+        self.assertEqual(len(data), len(set(data)))
+        self.assertTrue(all(code.upper().startswith('HSA-LET-7A') for code in data))
+        self.assertEqual(data, sorted(data, key=lambda code: (code.upper(), code)))
+
+    """ Testing miRNA alias index """
+
+    def testMirnaAliasIndex1(self):
+        """Tests that the index keeps the first match and the mature miRNAs of every accession ID"""
+        index = MirnaAliasIndex([
+            ('MIMAT0000001', 'hsa-miR-1-5p', ''),
+            ('MIMAT0000001', 'hsa-miR-1-5p', 'hsa-miR-1*'),
+            ('MIMAT0000002', 'hsa-miR-2-3p', 'hsa-miR-1*'),
+            ('MIMAT0000002', 'hsa-miR-2b-3p', None),
+        ])
+        self.assertEqual(index.get_accession('hsa-miR-1*'), 'MIMAT0000001')
+        self.assertEqual(index.get_accession('hsa-miR-2b-3p'), 'MIMAT0000002')
+        self.assertEqual(index.get_accession('MIMAT0000002'), 'MIMAT0000002')
+        self.assertIsNone(index.get_accession('name_01'))
+        self.assertEqual(index.get_mature_mirnas('MIMAT0000001'), ['hsa-miR-1-5p'])
+        self.assertEqual(index.get_mature_mirnas('MIMAT0000002'), ['hsa-miR-2-3p', 'hsa-miR-2b-3p'])
+        self.assertEqual(index.get_mature_mirnas('hsa-miR-2-3p'), [])
+
+    def testMirnaAliasIndex2(self):
+        """Tests that aliases are resolved without querying the DB once the index is loaded"""
+        mirna_alias_service.invalidate()
+        mirna_alias_service.get_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_accession_from_mirna('hsa-let-7e-5p'), 'MIMAT0000066')
+            self.assertEqual(get_accession_from_mirna('MIMAT0000066'), 'MIMAT0000066')
+            self.assertIsNone(get_accession_from_mirna('name_01'))
+            self.assertTrue('hsa-let-7e-5p' in get_mirna_from_accession('MIMAT0000066'))
+
+    def testPrefixIndex1(self):
+        """ Tests the prefix index ranking and limit """
+        index = PrefixIndex(['hsa-miR-21-5p', 'hsa-miR-210', 'hsa-miR-21', 'MIMAT0000076', 'hsa-miR-21', '', None])
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.search('HSA-MIR-21', 10), ['hsa-miR-21', 'hsa-miR-21-5p', 'hsa-miR-210'])
+        self.assertEqual(index.search('hsa-mir-21', 2), ['hsa-miR-21', 'hsa-miR-21-5p'])
+        self.assertEqual(index.search('mimat', 10), ['MIMAT0000076'])
+        self.assertEqual(index.search('xyz', 10), [])
+        self.assertEqual(len(index.search('', 10)), 4)
+
+    def testUrlTemplates1(self):
+        """ Tests that the URL templates are kept in memory until the URL templates dataset is reloaded """
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_service.bump_dataset_version(cache_service.URL_TEMPLATES_DATASET)
+        urls = url_service.build_urls('MIMAT0000062')
+        with self.assertNumQueries(0):
+            self.assertEqual(url_service.build_urls('MIMAT0000062'), urls)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cache_service.bump_dataset_version(cache_service.URL_TEMPLATES_DATASET)
+        with CaptureQueriesContext(connection) as queries:
+            url_service.get_templates()
+        self.assertGreater(len(queries), 0)
+
+    def testUrlTemplates2(self):
+        """ Tests that editing a URL template discards the cached ones """
+        url_service.get_templates()
+        # The templates version is changed once the edition is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            template = UrlTemplate.objects.create(name='mirbase', url='https://example.org/VALUE')
+        self.assertIn((template.pk, 'mirbase', 'https://example.org/VALUE'), url_service.get_templates())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            template.delete()
+        self.assertNotIn(template.pk, [index for index, _, _ in url_service.get_templates()])
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from unittest.mock import patch
+from asgiref.sync import async_to_sync
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase
+from modulector.services import pubmed_service
+from modulector.services.pubmed_service import PubmedMetrics, RateLimiter
+
+
+class PubmedTests(TestCase):
+    """ Testing of the concurrent retrieval of PubMeds from the NCBI API (with mocked requests) """
+
+    def setUp(self):
+        self.cache = LocMemCache('pubmed-tests', {})
+        self.cache.clear()
+        self.metrics = PubmedMetrics()
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    def __get_pubmeds(self, pairs, search, timeout=1, **settings):
+        """Calls get_pubmed_ids_by_terms() with a fake NCBI search, an empty cache and no rate limit."""
+        async def fake_search(_client, term, _timeout):
+            self.calls.append(term)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            try:
+                return await search(term)
+            finally:
+                self.running -= 1
+
+        with patch.multiple(pubmed_service, asearch_pubmed_ids=fake_search, cache=self.cache, metrics=self.metrics,
+                            rate_limiter=RateLimiter(10000), **settings):
+            return pubmed_service.get_pubmed_ids_by_terms(pairs, timeout=timeout)
+
+    @staticmethod
+    async def __search(term: str):
+        await asyncio.sleep(0.01)
+        return {len(term)}
+
+    def testConcurrencyCap(self):
+        """Tests that at most PUBMED_API_MAX_WORKERS requests are made at the same time"""
+        pairs = {(f'hsa-miR-{i}', 'GENE') for i in range(10)}
+        result = self.__get_pubmeds(pairs, self.__search, PUBMED_API_MAX_WORKERS=3)
+
+        self.assertEqual(result, {pair: {len(f'{pair[0]} AND GENE')} for pair in pairs})
+        self.assertEqual(len(self.calls), 10)
+        self.assertEqual(self.max_running, 3)
+
+    def testCacheHit(self):
+        """Tests that cached terms are not requested"""
+        self.cache.set(pubmed_service._get_cache_key('hsa-miR-1 AND GENE'), [1, 2])
+        result = self.__get_pubmeds([('hsa-miR-1', 'GENE'), ('hsa-miR-2', 'GENE')], self.__search)
+
+        self.assertEqual(result, {('hsa-miR-1', 'GENE'): {1, 2}, ('hsa-miR-2', 'GENE'): {18}})
+        self.assertEqual(self.calls, ['hsa-miR-2 AND GENE'])
+
+        # The requested term is cached too
+        result = self.__get_pubmeds([('hsa-miR-2', 'GENE')], self.__search)
+        self.assertEqual(result, {('hsa-miR-2', 'GENE'): {18}})
+        self.assertEqual(len(self.calls), 1)
+
+        stats = self.metrics.as_dict()
+        self.assertEqual((stats['cache_hits'], stats['cache_misses'], stats['upstream_calls']), (2, 1, 1))
+
+    def testErrorDegrade(self):
+        """Tests that a term which fails is omitted without failing the others"""
+        async def search(term: str):
+            if term.startswith('hsa-miR-1 '):
+                raise Exception('Response code from pubmed query was not 200, it was 429')
+            return await self.__search(term)
+
+        result = self.__get_pubmeds([('hsa-miR-1', 'GENE'), ('hsa-miR-2', 'GENE')], search)
+
+        self.assertEqual(result, {('hsa-miR-2', 'GENE'): {18}})
+        self.assertIsNone(self.cache.get(pubmed_service._get_cache_key('hsa-miR-1 AND GENE')))
+        stats = self.metrics.as_dict()
+        self.assertEqual((stats['upstream_errors'], stats['skipped']), (1, 1))
+
+    def testDeadlineDegrade(self):
+        """Tests that terms not resolved within PUBMED_API_PAGE_TIMEOUT seconds are omitted"""
+        async def search(term: str):
+            await asyncio.sleep(5 if term.startswith('hsa-miR-1 ') else 0.01)
+            return {len(term)}
+
+        start = time.monotonic()
+        result = self.__get_pubmeds([('hsa-miR-1', 'GENE'), ('hsa-miR-2', 'GENE')], search, timeout=0.1,
+                                    PUBMED_API_PAGE_TIMEOUT=0.1)
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(result, {('hsa-miR-2', 'GENE'): {18}})
+        self.assertEqual(self.metrics.as_dict()['skipped'], 1)
+
+    def testMetricsLog(self):
+        """Tests that the PubMed stats are logged every METRICS_LOG_INTERVAL seconds"""
+        with patch.object(pubmed_service, 'METRICS_LOG_INTERVAL', 60):
+            with self.assertNoLogs(pubmed_service.logger, 'INFO'):
+                self.metrics.record(cache_hits=1)
+
+            self.metrics._log_time -= 60
+            with self.assertLogs(pubmed_service.logger, 'INFO') as logs:
+                self.metrics.record(cache_misses=1)
+        self.assertIn("'cache_hit_rate': 0.5", logs.output[0])
+
+    def testRateLimiter(self):
+        """Tests that the calls are spaced out and that the deadline is respected"""
+        limiter = RateLimiter(20)
+
+        async def acquire_all():
+            deadline = time.monotonic() + 10
+            return [await limiter.acquire(deadline) for _ in range(3)]
+
+        start = time.monotonic()
+        self.assertEqual(async_to_sync(acquire_all)(), [True, True, True])
+        self.assertGreaterEqual(time.monotonic() - start, 2 * limiter.interval)
+
+        # The next slot is after the deadline, so it must not wait
+        start = time.monotonic()
+        self.assertFalse(async_to_sync(limiter.acquire)(time.monotonic()))
+        self.assertLess(time.monotonic() - start, limiter.interval)
@@ -0,0 +1,33 @@
+import asyncio
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines ('async def get(...)'), so they run in the event loop of the ASGI server
+    instead of in a thread. DRF's dispatch() is synchronous, so it's reimplemented here awaiting the handler. The
+    initial checks (authentication, permissions and throttling) run synchronously, so they must not query the DB
+    (none of them is configured). Sync code that uses the ORM must be called with sync_to_async().
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            method = request.method.lower()
+            handler = getattr(self, method, self.http_method_not_allowed) if method in self.http_method_names \
+                else self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # OPTIONS and the not allowed methods are handled by the sync methods of APIView
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
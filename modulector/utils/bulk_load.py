@@ -0,0 +1,212 @@
+import io
+from typing import Final, List, Optional, Sequence, Type
+import pandas as pd
+from django.db import connection, models, transaction
+
+# Number of rows sent in every COPY. Limits the size of the in-memory buffer
+COPY_CHUNK_SIZE: Final[int] = 100000
+
+# Temporary table where the new rows are loaded to compute the differences with the current ones
+STAGING_TABLE: Final[str] = 'bulk_load_staging'
+
+
+def get_columns(model: Type[models.Model], df: pd.DataFrame) -> str:
+    """Gets the list of table columns of the DataFrame fields for a SQL statement."""
+    return ', '.join(connection.ops.quote_name(model._meta.get_field(field).column) for field in df.columns)
+
+
+def _get_copy_query(model: Type[models.Model], df: pd.DataFrame, table: str) -> str:
+    """
+    Generates the COPY statement in CSV format. Empty strings of non-nullable text fields are not loaded as NULL
+    (COPY can't distinguish them in CSV unless they're quoted).
+    """
+    quote_name = connection.ops.quote_name
+    not_null_columns = [
+        quote_name(field.column) for field in (model._meta.get_field(name) for name in df.columns)
+        if not field.null and isinstance(field, (models.CharField, models.TextField))
+    ]
+    options = 'FORMAT csv' + (f", FORCE_NOT_NULL ({', '.join(not_null_columns)})" if not_null_columns else '')
+    return f'COPY {quote_name(table)} ({get_columns(model, df)}) FROM STDIN WITH ({options})'
+
+
+def copy_dataframe(model: Type[models.Model], df: pd.DataFrame, table: str | None = None) -> int:
+    """
+    Loads a DataFrame into the table of a model with COPY FROM STDIN. Rows are written in chunks to an in-memory CSV
+    buffer, so no SQL (nor model instances) are generated for them.
+    :param model: Model of the table. The DataFrame columns must be names of its fields (NaN/None are loaded as NULL).
+    :param df: Rows to load.
+    :param table: Table to load the rows into. By default, the model table.
+    :return: Number of loaded rows.
+    """
+    query = _get_copy_query(model, df, table or model._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(df), COPY_CHUNK_SIZE):
+            buffer = io.StringIO()
+            df.iloc[start:start + COPY_CHUNK_SIZE].to_csv(buffer, header=False, index=False)
+            buffer.seek(0)
+            cursor.copy_expert(query, buffer)
+    return len(df)
+
+
+def truncate(model: Type[models.Model]):
+    """Removes all the rows of the table of a model."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'TRUNCATE TABLE {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def replace_table_data(model: Type[models.Model], df: pd.DataFrame) -> int:
+    """
+    Replaces all the rows of the table of a model with the rows of a DataFrame. Must be called inside a transaction
+    so readers see the old data until the new one is committed.
+    :return: Number of loaded rows.
+    """
+    truncate(model)
+    return copy_dataframe(model, df)
+
+
+class SyncResult:
+    """Number of rows inserted, updated and deleted in a table to make it equal to the new data."""
+
+    def __init__(self, inserted: int, updated: int, deleted: int):
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+
+    @property
+    def changed(self) -> bool:
+        return self.inserted > 0 or self.updated > 0 or self.deleted > 0
+
+    def __str__(self) -> str:
+        return f'{self.inserted} inserted, {self.updated} updated and {self.deleted} deleted rows'
+
+
+def _row_hash(alias: str, columns: List[str]) -> str:
+    """SQL expression with the hash of the values of some columns of a row."""
+    return f"md5(ROW({', '.join(f'{alias}.{column}' for column in columns)})::text)"
+
+
+def _sync_by_key(cursor, table: str, columns: List[str], key_columns: List[str]) -> SyncResult:
+    """Applies the differences between the staging table and a table matching rows by their key columns."""
+    value_columns = [column for column in columns if column not in key_columns]
+    key_match = ' AND '.join(f't.{column} = s.{column}' for column in key_columns)
+
+    cursor.execute(f"""
+        DELETE FROM {table} t
+        WHERE NOT EXISTS (SELECT 1 FROM {STAGING_TABLE} s WHERE {key_match})
+    """)
+    deleted = cursor.rowcount
+
+    updated = 0
+    if value_columns:
+        cursor.execute(f"""
+            UPDATE {table} t
+            SET {', '.join(f'{column} = s.{column}' for column in value_columns)}
+            FROM {STAGING_TABLE} s
+            WHERE {key_match} AND {_row_hash('t', value_columns)} <> {_row_hash('s', value_columns)}
+        """)
+        updated = cursor.rowcount
+
+    cursor.execute(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(f's.{column}' for column in columns)}
+        FROM {STAGING_TABLE} s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {key_match})
+        ORDER BY s.staging_position
+    """)
+    return SyncResult(inserted=cursor.rowcount, updated=updated, deleted=deleted)
+
+
+def _sync_by_row(cursor, table: str, pk_column: str, columns: List[str]) -> SyncResult:
+    """
+    Applies the differences between the staging table and a table without a key. Rows are compared by the hash of
+    all their values, taking into account the number of times each one appears: surplus copies are deleted (the
+    newest ones) and missing copies are inserted.
+    """
+    cursor.execute(f"""
+        WITH new_rows AS (
+            SELECT {_row_hash('s', columns)} AS hash, count(*) AS copies FROM {STAGING_TABLE} s GROUP BY 1
+        )
+        DELETE FROM {table} WHERE {pk_column} IN (
+            SELECT c.{pk_column}
+            FROM (
+                SELECT t.{pk_column}, {_row_hash('t', columns)} AS hash,
+                    row_number() OVER (PARTITION BY {_row_hash('t', columns)} ORDER BY t.{pk_column}) AS copy
+                FROM {table} t
+            ) c
+            LEFT JOIN new_rows n ON n.hash = c.hash
+            WHERE c.copy > coalesce(n.copies, 0)
+        )
+    """)
+    deleted = cursor.rowcount
+
+    cursor.execute(f"""
+        WITH current_rows AS (
+            SELECT {_row_hash('t', columns)} AS hash, count(*) AS copies FROM {table} t GROUP BY 1
+        )
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(f'n.{column}' for column in columns)}
+        FROM (
+            SELECT s.*, {_row_hash('s', columns)} AS hash,
+                row_number() OVER (PARTITION BY {_row_hash('s', columns)} ORDER BY s.staging_position) AS copy
+            FROM {STAGING_TABLE} s
+        ) n
+        LEFT JOIN current_rows c ON c.hash = n.hash
+        WHERE n.copy > coalesce(c.copies, 0)
+        ORDER BY n.staging_position
+    """)
+    return SyncResult(inserted=cursor.rowcount, updated=0, deleted=deleted)
+
+
+def sync_dataframe(model: Type[models.Model], df: pd.DataFrame,
+                   key_fields: Optional[Sequence[str]] = None) -> SyncResult:
+    """
+    Makes the table of a model equal to a DataFrame applying only the differences, in a single transaction, instead
+    of truncating and reloading it. Rows are loaded with COPY into a temporary table and compared there by the hash
+    of their values. Unchanged rows keep their IDs and new rows are inserted in the DataFrame order.
+    :param model: Model of the table. The DataFrame columns must be names of its fields. Other fields are not
+    modified.
+    :param df: New rows.
+    :param key_fields: Fields which identify a row. Rows with the same key and different values are updated (if the
+    key is repeated in the DataFrame, the last row is used). If None, rows are identified by all their values (so
+    they're only inserted or deleted), allowing duplicates.
+    :return: Number of inserted, updated and deleted rows.
+    """
+    if key_fields:
+        df = df.drop_duplicates(subset=list(key_fields), keep='last')
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    columns = [quote_name(model._meta.get_field(field).column) for field in df.columns]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE {STAGING_TABLE} ON COMMIT DROP AS
+            SELECT {', '.join(columns)} FROM {table} WITH NO DATA
+        """)
+        # Keeps the DataFrame order
+        cursor.execute(f'ALTER TABLE {STAGING_TABLE} ADD COLUMN staging_position bigserial')
+        copy_dataframe(model, df, table=STAGING_TABLE)
+        cursor.execute(f'ANALYZE {STAGING_TABLE}')
+
+        if key_fields:
+            key_columns = [quote_name(model._meta.get_field(field).column) for field in key_fields]
+            result = _sync_by_key(cursor, table, columns, key_columns)
+        else:
+            result = _sync_by_row(cursor, table, quote_name(model._meta.pk.column), columns)
+
+        cursor.execute(f'DROP TABLE {STAGING_TABLE}')
+    return result
+
+
+def refresh_table(model: Type[models.Model], df: pd.DataFrame, incremental: bool,
+                  key_fields: Optional[Sequence[str]] = None) -> SyncResult:
+    """
+    Replaces the data of the table of a model, truncating it or applying only the differences (see
+    sync_dataframe()). Must be called inside a transaction.
+    :return: Number of inserted, updated and deleted rows.
+    """
+    if incremental:
+        return sync_dataframe(model, df, key_fields)
+
+    deleted = model.objects.count()
+    return SyncResult(inserted=replace_table_data(model, df), updated=0, deleted=deleted)
@@ -0,0 +1,123 @@
+import logging
+import sys
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterator, Optional, Sequence, Tuple, TypeVar
+from django.db import close_old_connections
+from ModulectorBackend.settings import DEBUG, EXECUTOR_WORKERS, EXECUTOR_QUEUE_SIZE, EXECUTOR_REQUEST_CONCURRENCY
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Pool for DB-bound work (the GIL is released while waiting for the DB)
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Shards submitted and not finished yet. When they reach EXECUTOR_QUEUE_SIZE, the requests run their shards in their
+# own thread instead of queueing more work (backpressure)
+_slots = threading.BoundedSemaphore(EXECUTOR_QUEUE_SIZE)
+
+
+def _get_pool() -> Optional[ThreadPoolExecutor]:
+    """Gets the thread pool, which is created on first use. None if it's disabled."""
+    global _thread_pool
+    if _thread_pool is None and EXECUTOR_WORKERS > 1:
+        with _pool_lock:
+            if _thread_pool is None:
+                _thread_pool = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix='modulector')
+    return _thread_pool
+
+
+def _discard_pool():
+    """Stops using a broken pool. A new one is created for the next shards."""
+    global _thread_pool
+    with _pool_lock:
+        pool, _thread_pool = _thread_pool, None
+    if pool is not None:
+        logger.error('The thread pool is broken and was discarded')
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_task(func: Callable[[Sequence[T]], R], shard: Sequence[T]) -> R:
+    """
+    Runs a shard in a pool worker. Every worker keeps its own DB connection, which is closed after the task if it
+    exceeded its maximum age (as Django does at the end of a request).
+    """
+    try:
+        return func(shard)
+    finally:
+        close_old_connections()
+
+
+def _run_inline(func: Callable[[Sequence[T]], R], shard: Sequence[T]) -> Future:
+    """Runs a shard in the current thread wrapping its result (or exception) in a finished Future."""
+    future = Future()
+    try:
+        future.set_result(func(shard))
+    except Exception as ex:
+        future.set_exception(ex)
+    return future
+
+
+def _submit(func: Callable[[Sequence[T]], R], shard: Sequence[T]) -> Future:
+    """Submits a shard to the pool if it has a free slot, otherwise runs it in the current thread."""
+    pool = _get_pool()
+    if pool is None or not _slots.acquire(blocking=False):
+        return _run_inline(func, shard)
+
+    try:
+        future = pool.submit(_run_task, func, shard)
+    except (BrokenExecutor, RuntimeError):
+        _slots.release()
+        _discard_pool()
+        return _run_inline(func, shard)
+
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _get_result(func: Callable[[Sequence[T]], R], shard: Sequence[T], future: Future) -> R:
+    """Waits for the result of a shard. If the pool broke while processing it, it's processed again inline."""
+    try:
+        return future.result()
+    except BrokenExecutor:
+        _discard_pool()
+        return func(shard)
+
+
+def map_shards(func: Callable[[Sequence[T]], R], items: Sequence[T], shard_size: int) -> Iterator[R]:
+    """
+    Applies a DB-bound function to consecutive shards of a list in parallel in the thread pool. At most
+    EXECUTOR_REQUEST_CONCURRENCY shards of the call are running at a time, so a big request doesn't take up all the
+    workers, and the results are yielded as soon as they're ready in the order of the shards. Lists of a single
+    shard are processed in the current thread.
+    :param func: Function which processes a shard.
+    :param items: Items to process.
+    :param shard_size: Maximum number of items of every shard.
+    :return: Iterator with the result of every shard.
+    """
+    if len(items) <= shard_size:
+        yield func(items)
+        return
+
+    pending: Deque[Tuple[Sequence[T], Future]] = deque()
+    try:
+        for start in range(0, len(items), shard_size):
+            if len(pending) >= EXECUTOR_REQUEST_CONCURRENCY:
+                yield _get_result(func, *pending.popleft())
+
+            shard = items[start:start + shard_size]
+            pending.append((shard, _submit(func, shard)))
+
+        while pending:
+            yield _get_result(func, *pending.popleft())
+    finally:
+        # The consumer stopped early (e.g. the client closed a streamed response) or a shard failed
+        for _, future in pending:
+            future.cancel()
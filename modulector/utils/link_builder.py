@@ -1,4 +1,5 @@
 from modulector.models import UrlTemplate
+from modulector.services import cache_service
 
 
 def build_link_mirdb(mirna_id, template):
@@ -6,7 +7,11 @@ def build_link_mirdb(mirna_id, template):
 
 
 def get_templates():
-    return UrlTemplate.objects.all().values_list()
+    return cache_service.get_or_set(
+        cache_service.URL_TEMPLATES_NAMESPACE,
+        'all',
+        lambda: list(UrlTemplate.objects.all().values_list())
+    )
 
 
 def build_pubmed_url(pubmed_id) -> str:
@@ -0,0 +1,102 @@
+import bisect
+from array import array
+from typing import Iterable, List, Tuple
+
+
+class PrefixIndex:
+    """
+    Read-only, case-insensitive prefix index over a set of identifiers. Identifiers are stored once in a sorted
+    tuple of their uppercased form (with the original value as tie-breaker) so every search is a binary search plus a
+    contiguous slice. Results are ranked in case-insensitive lexicographic order, so an exact match always comes first
+    followed by the shortest completions.
+    """
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, values: Iterable[str]):
+        """
+        Builds the index.
+        :param values: Identifiers to index. Duplicates and empty values are discarded.
+        """
+        entries: List[Tuple[str, str]] = sorted({(value.upper(), value) for value in values if value})
+        self._keys: Tuple[str, ...] = tuple(key for key, _ in entries)
+        self._values: Tuple[str, ...] = tuple(value for _, value in entries)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, prefix: str, limit: int) -> List[str]:
+        """
+        Gets the identifiers starting with a prefix, ignoring case.
+        :param prefix: Prefix to search.
+        :param limit: Maximum number of identifiers to return.
+        :return: Matching identifiers in ranking order.
+        """
+        key_prefix = prefix.upper()
+        start = bisect.bisect_left(self._keys, key_prefix)
+        res: List[str] = []
+        for position in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[position].startswith(key_prefix):
+                break
+            res.append(self._values[position])
+        return res
+
+
+class _BlobStrings:
+    """Sequence view over strings stored back to back in a bytes object, used to bisect without decoding them."""
+    __slots__ = ('_blob', '_offsets')
+
+    def __init__(self, blob: bytes, offsets: array):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position: int) -> bytes:
+        return self._blob[self._offsets[position]:self._offsets[position + 1]]
+
+
+class CompactPrefixIndex:
+    """
+    Same as PrefixIndex, but intended for millions of ASCII identifiers. Instead of one str object per identifier
+    (~50 bytes of overhead each), uppercased keys and original values are stored back to back in two bytes objects
+    that share an array of offsets (4 bytes per identifier). Memory usage is about 2 * length + 4 bytes per
+    identifier. Non-ASCII identifiers are discarded.
+    """
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, values: Iterable[str]):
+        """
+        Builds the index.
+        :param values: Identifiers to index. Duplicates, empty and non-ASCII values are discarded.
+        """
+        entries: List[Tuple[str, str]] = sorted(
+            {(value.upper(), value) for value in values if value and value.isascii()}
+        )
+        offsets = array('I', [0])
+        for key, _ in entries:
+            offsets.append(offsets[-1] + len(key))
+        self._keys = _BlobStrings(''.join(key for key, _ in entries).encode('ascii'), offsets)
+        self._values = _BlobStrings(''.join(value for _, value in entries).encode('ascii'), offsets)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, prefix: str, limit: int) -> List[str]:
+        """
+        Gets the identifiers starting with a prefix, ignoring case.
+        :param prefix: Prefix to search.
+        :param limit: Maximum number of identifiers to return.
+        :return: Matching identifiers in ranking order.
+        """
+        if not prefix.isascii():
+            return []
+
+        key_prefix = prefix.upper().encode('ascii')
+        start = bisect.bisect_left(self._keys, key_prefix)
+        res: List[str] = []
+        for position in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[position].startswith(key_prefix):
+                break
+            res.append(self._values[position].decode('ascii'))
+        return res
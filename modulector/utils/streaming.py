@@ -0,0 +1,139 @@
+import csv
+import io
+import itertools
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+# Number of entries serialized together in every chunk sent to the client
+STREAMING_CHUNK_SIZE = 1000
+
+# Number of bytes of every chunk sent to the client when streaming binary content
+BINARY_CHUNK_SIZE = 1024 * 1024
+
+
+def iter_json_object(entries: Iterable[Tuple[Any, Any]]) -> Iterator[str]:
+    """
+    Serializes a sequence of key-value pairs as a JSON object, chunk by chunk, without building the entire dict in
+    memory.
+    :param entries: Pairs to serialize. Keys are converted to str as json.dumps does for dicts.
+    :return: Iterator of JSON chunks.
+    """
+    yield '{'
+    chunk = []
+    first = True
+    for key, value in entries:
+        chunk.append(('' if first else ',') + json.dumps(str(key)) + ':' + json.dumps(value))
+        first = False
+        if len(chunk) == STREAMING_CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield '}'
+
+
+def iter_json_object_with_trailer(key: str, entries: Iterable[Tuple[Any, Any]],
+                                  get_trailer: Callable[[], Dict[str, Any]]) -> Iterator[str]:
+    """
+    Serializes a sequence of key-value pairs as a JSON object (see iter_json_object()) under a key of a wrapper
+    object, followed by the entries returned by get_trailer() once all the pairs were serialized. This allows sending
+    values computed while the pairs are generated (e.g. stats), which can't be sent in headers.
+    :param key: Key of the object in the wrapper.
+    :param entries: Pairs to serialize.
+    :param get_trailer: Function which returns the entries to add after the object.
+    :return: Iterator of JSON chunks.
+    """
+    yield '{' + json.dumps(key) + ':'
+    yield from iter_json_object(entries)
+    yield ''.join(',' + json.dumps(trailer_key) + ':' + json.dumps(value)
+                  for trailer_key, value in get_trailer().items())
+    yield '}'
+
+
+async def aiter_chunks(chunks: Iterator[str]) -> AsyncIterator[str]:
+    """
+    Exposes a sync iterator of chunks as an async one. Under ASGI Django consumes sync iterators entirely before
+    sending them, so this is needed to really stream the content. Chunks are generated in the thread shared by sync
+    views to use the same DB connection.
+    :param chunks: Sync iterator to consume.
+    :return: Async iterator of chunks.
+    """
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+async def aiter_buffer(buffer: io.BytesIO) -> AsyncIterator[bytes]:
+    """
+    Sends the content of an in-memory file in chunks of BINARY_CHUNK_SIZE bytes, so the entire content is never
+    copied (as HttpResponse does).
+    :param buffer: File to send.
+    :return: Async iterator of chunks.
+    """
+    view = buffer.getbuffer()
+    try:
+        for start in range(0, len(view), BINARY_CHUNK_SIZE):
+            yield bytes(view[start:start + BINARY_CHUNK_SIZE])
+    finally:
+        view.release()
+
+
+def streaming_response(chunks: Iterator[str], content_type: str) -> StreamingHttpResponse:
+    """Generates a StreamingHttpResponse which sends the chunks as they are generated."""
+    return StreamingHttpResponse(aiter_chunks(chunks), content_type=content_type)
+
+
+def json_object_streaming_response(entries: Iterable[Tuple[Any, Any]]) -> StreamingHttpResponse:
+    """Generates a StreamingHttpResponse which sends the key-value pairs as a JSON object."""
+    return streaming_response(iter_json_object(entries), content_type='application/json')
+
+
+def iter_ndjson(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """
+    Serializes rows as newline-delimited JSON objects, STREAMING_CHUNK_SIZE rows per chunk.
+    :param columns: Keys of every object.
+    :param rows: Rows with a value for every column. Values must be JSON serializable.
+    :return: Iterator of NDJSON chunks.
+    """
+    for chunk in _iter_row_chunks(rows):
+        yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in chunk)
+
+
+def iter_csv(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """
+    Serializes rows as CSV with a header line, STREAMING_CHUNK_SIZE rows per chunk. List values are joined with '|'.
+    :param columns: Header of the CSV.
+    :param rows: Rows with a value for every column.
+    :return: Iterator of CSV chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _iter_row_chunks(rows):
+        writer.writerows(
+            ['|'.join(value) if isinstance(value, list) else value for value in row] for row in chunk
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Sends the header in case there are no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _iter_row_chunks(rows: Iterable[Sequence[Any]]) -> Iterator[List[Sequence[Any]]]:
+    """Groups rows in lists of STREAMING_CHUNK_SIZE elements."""
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, STREAMING_CHUNK_SIZE)):
+        yield chunk
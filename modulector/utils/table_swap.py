@@ -0,0 +1,263 @@
+import hashlib
+import logging
+import re
+import sys
+import time
+from typing import Callable, Final, List, Tuple, Type
+from django.db import OperationalError, connection, models, transaction
+from ModulectorBackend.settings import DEBUG, TABLE_SWAP_LOCK_TIMEOUT, TABLE_SWAP_RETRIES
+
+# Sets some logging configuration
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.setLevel(logging.DEBUG if DEBUG else logging.INFO)
+
+# Suffixes of the table where the new data is loaded and the table which keeps the previous data after the swap
+SHADOW_SUFFIX: Final[str] = '_shadow'
+OLD_SUFFIX: Final[str] = '_old'
+
+# PostgreSQL error code raised when a lock can't be acquired within lock_timeout
+LOCK_NOT_AVAILABLE: Final[str] = '55P03'
+
+# Seconds to wait between attempts to acquire the lock of the live table
+RETRY_DELAY: Final[float] = 1.0
+
+# Name of the index and the ON clause in the definitions returned by pg_get_indexdef()
+INDEX_DEF_REGEX = re.compile(r'INDEX \S+ ON (ONLY )?\S+ ')
+
+
+def get_shadow_table(model: Type[models.Model]) -> str:
+    return model._meta.db_table + SHADOW_SUFFIX
+
+
+def get_old_table(model: Type[models.Model]) -> str:
+    return model._meta.db_table + OLD_SUFFIX
+
+
+def _get_alias(index: str, prefix: str = 'swap') -> str:
+    """
+    Name of an index of the live table in the shadow/old tables. Index names must be unique in the schema, so both
+    tables can't use the original ones.
+    """
+    return f"{prefix}_{hashlib.md5(index.encode('utf8')).hexdigest()}"
+
+
+def _get_indexes(cursor, table: str) -> List[str]:
+    """Names of all the indexes of a table (including the ones of primary key and unique constraints)."""
+    cursor.execute("""
+        SELECT i.relname FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+        ORDER BY i.relname
+    """, [table])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _table_exists(cursor, table: str) -> bool:
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [table])
+    return cursor.fetchone()[0]
+
+
+def create_shadow_table(model: Type[models.Model]) -> str:
+    """
+    Creates an empty copy of the table of a model (columns, defaults, identity and check constraints) where the new
+    data is loaded without affecting the live table. Identity columns get their own sequences, which continue from the
+    ones of the live table so the rows copied from it keep unique IDs. Indexes, primary key, unique and foreign key
+    constraints are created later by build_shadow_indexes() so rows are loaded faster. A previous shadow table is
+    discarded.
+    :return: Name of the shadow table.
+    """
+    quote_name = connection.ops.quote_name
+    table = model._meta.db_table
+    shadow_table = get_shadow_table(model)
+    with connection.cursor() as cursor:
+        # Foreign keys of other tables would keep referencing the previous table after the swap
+        cursor.execute("""
+            SELECT conrelid::regclass::text FROM pg_constraint
+            WHERE confrelid = %s::regclass AND conrelid <> confrelid AND contype = 'f'
+        """, [table])
+        referencing_tables = [row[0] for row in cursor.fetchall()]
+        if referencing_tables:
+            raise ValueError(f"{table} can't be swapped as it's referenced by {', '.join(referencing_tables)}")
+
+        cursor.execute(f'DROP TABLE IF EXISTS {quote_name(shadow_table)}')
+        cursor.execute(f"""
+            CREATE TABLE {quote_name(shadow_table)} (
+                LIKE {quote_name(table)}
+                INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING STORAGE
+            )
+        """)
+
+        # Serial columns share the sequence of the live table, but identity ones start again from 1
+        cursor.execute("""
+            SELECT attname, pg_get_serial_sequence(%s, attname) FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attidentity <> '' AND NOT attisdropped
+        """, [table, table])
+        for column, sequence in cursor.fetchall():
+            cursor.execute(f'SELECT setval(pg_get_serial_sequence(%s, %s), last_value, is_called) FROM {sequence}',
+                           [shadow_table, column])
+    return shadow_table
+
+
+def build_shadow_indexes(model: Type[models.Model]):
+    """
+    Creates in the shadow table the indexes, primary key, unique and foreign key constraints of the live table and
+    updates its statistics, so it's ready to serve queries as soon as it's swapped. Indexes are built without
+    CONCURRENTLY as no one else uses the shadow table.
+    """
+    quote_name = connection.ops.quote_name
+    table = model._meta.db_table
+    shadow_table = quote_name(get_shadow_table(model))
+    with connection.cursor() as cursor:
+        # Constraints with an index are created with the alias as name, foreign keys keep their names
+        cursor.execute("""
+            SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'x', 'f')
+            ORDER BY contype DESC, conname
+        """, [table])
+        for name, constraint_type, definition in cursor.fetchall():
+            constraint_name = name if constraint_type == 'f' else _get_alias(name)
+            logger.debug(f'Creating constraint {name} in {shadow_table}')
+            cursor.execute(f'ALTER TABLE {shadow_table} ADD CONSTRAINT {quote_name(constraint_name)} {definition}')
+
+        cursor.execute("""
+            SELECT i.relname, pg_get_indexdef(x.indexrelid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = %s::regclass AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+            )
+            ORDER BY i.relname
+        """, [table])
+        for name, definition in cursor.fetchall():
+            logger.debug(f'Creating index {name} in {shadow_table}')
+            cursor.execute(INDEX_DEF_REGEX.sub(f'INDEX {quote_name(_get_alias(name))} ON {shadow_table} ',
+                                               definition, count=1))
+
+        cursor.execute(f'ANALYZE {shadow_table}')
+
+
+def _exchange(cursor, table: str, other_table: str):
+    """
+    Exchanges the names of the live table of a model and another table built from it (shadow or old), including the
+    names of their indexes. Must be called inside a transaction.
+    """
+    quote_name = connection.ops.quote_name
+    indexes = _get_indexes(cursor, table)
+    expected_indexes = sorted(_get_alias(index) for index in indexes)
+    if sorted(_get_indexes(cursor, other_table)) != expected_indexes:
+        raise ValueError(f'The indexes of {other_table} are not the same as the ones of {table}')
+
+    # Sequence of a serial primary key. It's shared by both tables and must be owned by the live one, otherwise it'd
+    # be dropped with the old table. Identity columns have their own sequences
+    cursor.execute("""
+        SELECT a.attname, pg_get_serial_sequence(%s, a.attname), a.attidentity = ''
+        FROM pg_index x JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = ANY(x.indkey)
+        WHERE x.indrelid = %s::regclass AND x.indisprimary
+    """, [table, table])
+    serial_columns: List[Tuple[str, str]] = [(column, sequence) for column, sequence, is_serial in cursor.fetchall()
+                                             if sequence is not None and is_serial]
+
+    temporary_table = quote_name(f'{table}_swap')
+    cursor.execute(f'ALTER TABLE {quote_name(table)} RENAME TO {temporary_table}')
+    cursor.execute(f'ALTER TABLE {quote_name(other_table)} RENAME TO {quote_name(table)}')
+    cursor.execute(f'ALTER TABLE {temporary_table} RENAME TO {quote_name(other_table)}')
+
+    # Renaming an index also renames its constraint
+    for index in indexes:
+        alias = quote_name(_get_alias(index))
+        temporary_index = quote_name(_get_alias(index, prefix='swaptmp'))
+        cursor.execute(f'ALTER INDEX {quote_name(index)} RENAME TO {temporary_index}')
+        cursor.execute(f'ALTER INDEX {alias} RENAME TO {quote_name(index)}')
+        cursor.execute(f'ALTER INDEX {temporary_index} RENAME TO {alias}')
+
+    for column, sequence in serial_columns:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote_name(table)}.{quote_name(column)}')
+
+
+def _run_with_lock_retries(operation: Callable[[], None]):
+    """
+    Runs a DDL operation on a live table in a transaction which waits at most TABLE_SWAP_LOCK_TIMEOUT milliseconds
+    for the table lock. Waiting longer would also block all the queries that arrive after it, so on timeout the
+    transaction is rolled back and retried up to TABLE_SWAP_RETRIES times.
+    """
+    for attempt in range(TABLE_SWAP_RETRIES + 1):
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"SET LOCAL lock_timeout = '{TABLE_SWAP_LOCK_TIMEOUT}ms'")
+                operation()
+            return
+        except OperationalError as e:
+            if getattr(e.__cause__, 'pgcode', None) != LOCK_NOT_AVAILABLE or attempt == TABLE_SWAP_RETRIES:
+                raise
+            logger.warning(f'Timeout waiting for the table lock (attempt {attempt + 1}), retrying...')
+            time.sleep(RETRY_DELAY)
+
+
+def swap_shadow_table(model: Type[models.Model]):
+    """
+    Makes the shadow table of a model the live one with a rename, which only holds the table lock for a moment. The
+    previous live table is kept as the old table (replacing the previous one) so the swap can be reverted with
+    rollback_swap().
+    """
+    quote_name = connection.ops.quote_name
+    table = model._meta.db_table
+    shadow_table = get_shadow_table(model)
+    old_table = get_old_table(model)
+
+    def swap():
+        with connection.cursor() as cursor:
+            if not _table_exists(cursor, shadow_table):
+                raise ValueError(f'There is no shadow table for {table}')
+            cursor.execute(f'DROP TABLE IF EXISTS {quote_name(old_table)}')
+            _exchange(cursor, table, shadow_table)
+            cursor.execute(f'ALTER TABLE {quote_name(shadow_table)} RENAME TO {quote_name(old_table)}')
+
+    _run_with_lock_retries(swap)
+    logger.info(f'Table {table} swapped, previous data kept in {old_table}')
+
+
+def rollback_swap(model: Type[models.Model]):
+    """Restores the data of the table of a model previous to the last swap. The discarded data becomes the old one."""
+    table = model._meta.db_table
+    old_table = get_old_table(model)
+
+    def rollback():
+        with connection.cursor() as cursor:
+            if not _table_exists(cursor, old_table):
+                raise ValueError(f'There is no previous data to restore for {table}')
+            _exchange(cursor, table, old_table)
+
+    _run_with_lock_retries(rollback)
+    logger.info(f'Table {table} restored from {old_table}')
+
+
+def drop_old_table(model: Type[models.Model]):
+    """Removes the data previous to the last swap, after which it can't be reverted."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(get_old_table(model))}')
+
+
+def import_with_swap(model: Type[models.Model], load: Callable[[str], int]) -> int:
+    """
+    Replaces all the data of the table of a model without blocking the queries on it: the rows are loaded into a
+    shadow table, where the indexes are built, and then it's swapped with the live table. If the load fails, the live
+    table is not modified.
+    :param model: Model of the table.
+    :param load: Function which loads the rows into the table received as parameter (e.g. with
+    bulk_load.copy_dataframe()) and returns their number.
+    :return: Number of loaded rows.
+    """
+    table = model._meta.db_table
+    start = time.perf_counter()
+    shadow_table = create_shadow_table(model)
+    try:
+        logger.info(f'Loading data into {shadow_table}')
+        rows = load(shadow_table)
+        logger.info(f'{rows} rows loaded in {time.perf_counter() - start:.2f} seconds. Building indexes...')
+        build_shadow_indexes(model)
+    except Exception:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {connection.ops.quote_name(shadow_table)}')
+        raise
+
+    swap_shadow_table(model)
+    logger.info(f'{table} imported in {time.perf_counter() - start:.2f} seconds')
+    return rows
@@ -1,28 +1,28 @@
+import io
 import re
-from typing import Final
+from typing import Final, List
 
+import numpy as np
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db.models.query_utils import Q
-from django.http import Http404, HttpRequest
+from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, generics, filters, viewsets
+from rest_framework import status, generics, filters
 from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from modulector.models import (
-    MethylationUCSC_CPGIsland,
-    MethylationUCSCRefGene,
     MirnaXGene,
     Mirna,
     MirbaseIdMirna,
     MirnaDisease,
     MirnaDrug,
-    GeneAliases,
-    MethylationEPIC,
     MirTarBaseInteraction,
 )
-from modulector.pagination import StandardResultsSetPagination
+from modulector.export import StreamingExportMixin
+from modulector.pagination import StandardResultsSetPagination, KeysetPagination
 from modulector.serializers import (
     MirnaXGenSerializer,
     MirnaSerializer,
@@ -31,10 +31,15 @@ from modulector.serializers import (
     MirnaDrugsSerializer,
     get_mirna_from_accession,
     get_mirna_aliases,
-    get_accession_from_mirna,
     MirTarBaseInteractionSerializer,
+    aget_page_pubmeds,
 )
-from modulector.services import subscription_service
+from modulector.services import subscription_service, mirna_alias_service, methylation_service, \
+    mirna_finder_service, gene_alias_service, interactions_service
+from modulector.utils.async_views import AsyncAPIView
+from modulector.utils.streaming import aiter_buffer, iter_json_object_with_trailer, json_object_streaming_response, \
+    streaming_response
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 
 
@@ -46,31 +51,11 @@ DEFAULT_PAGE_SIZE: Final[int] = 50
 # Maximum page size for requests
 MAX_PAGE_SIZE: Final[int] = 3000
 
-# Number of processes to use in Pool
-PROCESS_POOL_WORKERS: Final[int] = settings.PROCESS_POOL_WORKERS
-
-
-def get_methylation_match_condition(input_name: str) -> Q:
-    """Generates the condition to match a Methylation site."""
-    return (
-        Q(ilmnid=input_name)
-        | Q(name=input_name)
-        | Q(methyl450_loci=input_name)
-        | Q(methyl27_loci=input_name)
-        | Q(epicv1_loci=input_name)
-    )
-
-
-def get_methylation_epic_sites_names(input_id: str) -> tuple[str, list[str]]:
-    """
-    Gets methylation sites from any type of Loci id.
-    :param input_id: String to query in the DB.
-    :return: list of Methylation sites.
-    """
-    condition = get_methylation_match_condition(input_id)
-    res = MethylationEPIC.objects.filter(condition).values_list("name", flat=True)
+# Number of elements in a bulk request from which the response is streamed
+STREAMING_THRESHOLD: Final[int] = 5000
 
-    return input_id, list(res)
+# Maximum number of cells of the score matrices
+SCORE_MATRIX_MAX_CELLS: Final[int] = settings.SCORE_MATRIX_MAX_CELLS
 
 
 def get_limit_parameter(value: str | None) -> int:
@@ -90,34 +75,33 @@ def get_limit_parameter(value: str | None) -> int:
         return DEFAULT_PAGE_SIZE
 
 
-class MirnaTargetInteractions(generics.ListAPIView):
-    """Returns a paginated response with all the interactions of a specific miRNA (mirna-interactions endpoint)"""
+class MirnaTargetInteractions(StreamingExportMixin, AsyncAPIView, generics.ListAPIView):
+    """
+    Returns a paginated response with all the interactions of a specific miRNA (mirna-interactions endpoint). It's
+    served in the event loop, so the PubMeds of the NCBI API are awaited without blocking a thread.
+    """
 
     serializer_class = MirnaXGenSerializer
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.OrderingFilter]
     ordering_fields = ["gene", "score"]
     ordering = ["id"]
-
-    @staticmethod
-    def __get_gene_aliases(gene: str) -> list[str]:
-        """Retrieves the aliases for a gene based on the gene provided"""
-        match_gene = GeneAliases.objects.filter(
-            Q(alias=gene) | Q(gene_symbol=gene)
-        ).first()
-        if match_gene is None:
-            return []
-
-        gene_symbol = match_gene.gene_symbol
-        aliases = list(
-            GeneAliases.objects.filter(gene_symbol=gene_symbol)
-            .values_list("alias", flat=True)
-            .distinct()
-        )
-        # Adds the gene_symbol and the parameter to not omit them in the future search
-        aliases.append(gene_symbol)
-        aliases.append(gene)
-        return list(dict.fromkeys(aliases))  # Remove duplicates while preserving order
+    export_fields = ("id", "mirna__mirna_code", "gene", "score", "mirna_source__name", "sources", "score_class")
+    export_columns = ("id", "mirna", "gene", "score", "source_name", "sources", "score_class")
+    export_filename = "mirna_target_interactions"
+
+    def format_export_row(self, row):
+        """Formats the score and sources as MirnaXGenSerializer does"""
+        interaction_id, mirna, gene, score, source_name, sources, score_class = row
+        return interaction_id, mirna, gene, str(score), source_name, sources.split("|") if sources else [], score_class
+
+    @property
+    def paginator(self):
+        """Uses keyset pagination (without COUNT and OFFSET) if the client requests it with 'pagination=cursor'."""
+        if not hasattr(self, "_paginator"):
+            use_cursor = self.request.GET.get("pagination") == "cursor"
+            self._paginator = KeysetPagination() if use_cursor else self.pagination_class()
+        return self._paginator
 
     def get_serializer_context(self):
         context = super(MirnaTargetInteractions, self).get_serializer_context()
@@ -168,6 +152,23 @@ class MirnaTargetInteractions(generics.ListAPIView):
                 description="If True, the endpoint also returns a list of links to Pubmed where the miRNAs are related to the genes (this may affect Modulector's response time)",
                 required=False,
             ),
+            OpenApiParameter(
+                name="pagination",
+                type=str,
+                enum=["cursor"],
+                description="If 'cursor', pages are traversed following the 'next' link (with a 'cursor' parameter) "
+                            "instead of using 'page'. The count is omitted (null) and every page takes the same time "
+                            "regardless of its position.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="export",
+                type=str,
+                enum=["ndjson", "csv"],
+                description="If present, all the results are streamed in that format (NDJSON or CSV) instead of "
+                            "returning a page.",
+                required=False,
+            ),
             # Exclude pagination and ordering parameters
             OpenApiParameter(name="ordering", exclude=True),
             OpenApiParameter(name="page", exclude=True),
@@ -203,11 +204,25 @@ class MirnaTargetInteractions(generics.ListAPIView):
             )
         ],
     )
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         """
         Receives a miRNA and/or a gene symbol and returns a paginated vector. Each vector entry represents a miRNA-Gene interaction. If no gene symbol is entered, all miRNA interactions are returned. If a miRNA is not entered, all gene interactions are returned. If both are entered, the interaction of mirna with the gene is returned.
         """
-        return super().get(request, *args, **kwargs)
+        export_format = self.get_export_format()
+        if export_format is not None:
+            return await sync_to_async(self.export)(export_format)
+
+        # The page is queried in a thread (DRF pagination is sync), the PubMeds are retrieved in the event loop
+        interactions = await sync_to_async(self.get_page)()
+        context = self.get_serializer_context()
+        if context["include_pubmeds"]:
+            context.update(await aget_page_pubmeds(interactions))
+        data = self.get_serializer(interactions, many=True, context=context).data
+        return self.get_paginated_response(data)
+
+    def get_page(self) -> List[MirnaXGene]:
+        """Gets the interactions of the requested page, already filtered and ordered."""
+        return self.paginate_queryset(self.filter_queryset(self.get_queryset()))
 
     def get_queryset(self):
         mirna = self.request.GET.get("mirna")
@@ -215,7 +230,7 @@ class MirnaTargetInteractions(generics.ListAPIView):
         score = self.request.GET.get("score")
 
         self._mirna_aliases = get_mirna_aliases(mirna) if mirna else []
-        self._gene_aliases = self.__get_gene_aliases(gene) if gene else []
+        self._gene_aliases = gene_alias_service.get_gene_aliases(gene) if gene else []
 
         if score:
             try:
@@ -227,21 +242,191 @@ class MirnaTargetInteractions(generics.ListAPIView):
                     detail="'score' must be a numerical value between 0 and 1"
                 )
 
+        # miRNA and source are used by the serializer, so they are retrieved in the same query
+        data = MirnaXGene.objects.select_related("mirna", "mirna_source")
         if not mirna and not gene:
             raise ParseError(detail="'mirna' or 'gene' are mandatory")
         elif mirna and not gene:  # only mirna
-            data = MirnaXGene.objects.filter(mirna__mirna_code__in=self._mirna_aliases)
+            data = data.filter(mirna__mirna_code__in=self._mirna_aliases)
         elif not mirna and gene:  # only gene
-            data = MirnaXGene.objects.filter(gene__in=self._gene_aliases)
+            data = data.filter(gene__in=self._gene_aliases)
         else:  # mirna and gene
-            data = MirnaXGene.objects.filter(
+            data = data.filter(
                 mirna__mirna_code__in=self._mirna_aliases, gene__in=self._gene_aliases
             )
 
         return data.filter(score__gte=score) if score else data
 
 
-class MirnaTargetValidation(generics.ListAPIView):
+class MirnaTargetInteractionsBatch(APIView):
+    """
+    Returns all the interactions between a list of miRNAs and a list of genes in a single request, grouped by input
+    miRNA (or by input gene if no miRNAs are provided). The response is always streamed.
+    """
+
+    serializer_class = None  # To prevent warnings from the drf-spectacular package
+
+    @staticmethod
+    @extend_schema(
+        tags=["miRNA"],
+        summary="Retrieve the interactions of several miRNAs and genes",
+        request={
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "mirnas": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "List of miRNAs (Accession IDs or names in mirBase).",
+                        },
+                        "genes": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "List of gene symbols or aliases.",
+                        },
+                        "score": {
+                            "type": "number",
+                            "description": "Only interactions with a score greater than or equal to this value are "
+                                           "returned.",
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum number of interactions (the ones with the highest scores) "
+                                           "returned for every miRNA (or gene if no miRNAs are sent).",
+                        },
+                    },
+                },
+                "example": {
+                    "mirnas": ["hsa-miR-891a-5p", "MIMAT0004979"],
+                    "genes": ["EGFR", "APPBP2"],
+                    "score": 0.05,
+                    "limit": 100,
+                },
+            }
+        },
+    )
+    def post(request):
+        data = request.data
+        mirnas = data.get("mirnas") or None
+        genes = data.get("genes") or None
+        score = data.get("score")
+        limit = data.get("limit")
+
+        if mirnas is None and genes is None:
+            return Response(
+                {"detail": "'mirnas' or 'genes' are mandatory"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        for field, value in (("mirnas", mirnas), ("genes", genes)):
+            if value is not None and (not isinstance(value, list) or not all(isinstance(v, str) for v in value)):
+                return Response(
+                    {"detail": f"'{field}' must be a list of strings"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        if score is not None and (
+            isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 1
+        ):
+            return Response(
+                {"detail": "'score' must be a numerical value between 0 and 1"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+            return Response(
+                {"detail": "'limit' must be a positive integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Removes duplicates keeping the request order
+        mirnas = list(dict.fromkeys(mirnas)) if mirnas else None
+        genes = list(dict.fromkeys(genes)) if genes else None
+        entries = interactions_service.get_interactions_by_input(mirnas, genes, score, limit)
+        return json_object_streaming_response(entries)
+
+
+class MirnaGeneScoreMatrix(APIView):
+    """
+    Returns the dense matrix of interaction scores between a list of miRNAs and a list of genes as a NumPy .npz file
+    with the arrays 'scores' (float32, NaN where there is no interaction), 'mirnas' (rows labels) and 'genes' (columns
+    labels).
+    """
+
+    serializer_class = None  # To prevent warnings from the drf-spectacular package
+
+    @staticmethod
+    @extend_schema(
+        tags=["miRNA"],
+        summary="Retrieve the miRNA x gene scores matrix",
+        request={
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "mirnas": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "List of miRNAs (Accession IDs or names in mirBase). Rows of the matrix.",
+                        },
+                        "genes": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "List of gene symbols or aliases. Columns of the matrix.",
+                        },
+                        "compressed": {
+                            "type": "boolean",
+                            "description": "If true, the .npz file is compressed. False by default.",
+                        },
+                    },
+                    "required": ["mirnas", "genes"],
+                },
+                "example": {
+                    "mirnas": ["hsa-miR-891a-5p", "MIMAT0004979"],
+                    "genes": ["EGFR", "APPBP2"],
+                },
+            }
+        },
+        responses={(200, "application/octet-stream"): OpenApiTypes.BINARY},
+    )
+    def post(request):
+        data = request.data
+        for field in ("mirnas", "genes"):
+            if field not in data:
+                return Response(
+                    {"detail": f"'{field}' is mandatory"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if not isinstance(data[field], list) or not all(isinstance(value, str) for value in data[field]):
+                return Response(
+                    {"detail": f"'{field}' must be a list of strings"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        # Removes duplicates keeping the request order
+        mirnas = list(dict.fromkeys(data["mirnas"]))
+        genes = list(dict.fromkeys(data["genes"]))
+        if len(mirnas) * len(genes) > SCORE_MATRIX_MAX_CELLS:
+            return Response(
+                {"detail": f"The matrix can't have more than {SCORE_MATRIX_MAX_CELLS} cells (miRNAs x genes)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        scores = interactions_service.get_score_matrix(mirnas, genes)
+        buffer = io.BytesIO()
+        save = np.savez_compressed if data.get("compressed") is True else np.savez
+        save(buffer, scores=scores, mirnas=np.array(mirnas, dtype=str), genes=np.array(genes, dtype=str))
+
+        # The matrix is freed before sending the file, which is streamed from the buffer instead of copying it
+        del scores
+        response = StreamingHttpResponse(aiter_buffer(buffer), content_type="application/octet-stream")
+        response["Content-Length"] = buffer.tell()
+        response["Content-Disposition"] = 'attachment; filename="score_matrix.npz"'
+        return response
+
+
+class MirnaTargetValidation(StreamingExportMixin, generics.ListAPIView):
     """Returns a paginated response with all the validations of a specific miRNA and target (mirna-target-validation endpoint)"""
 
     serializer_class = MirTarBaseInteractionSerializer
@@ -250,6 +435,10 @@ class MirnaTargetValidation(generics.ListAPIView):
     filterset_fields = ["mirna", "gene", "support_type"]
     ordering_fields = ["mirna", "gene"]
     ordering = ["id"]
+    export_fields = ("id", "mirtarbase_id", "mirna", "gene", "target_gene_entrez_id", "experiments", "support_type",
+                     "pmid")
+    export_columns = export_fields
+    export_filename = "mirna_target_validation"
 
     @extend_schema(
         tags=["miRNA"],
@@ -286,6 +475,14 @@ class MirnaTargetValidation(generics.ListAPIView):
                 description="Filter by experiment type.",
                 required=False,
             ),
+            OpenApiParameter(
+                name="export",
+                type=str,
+                enum=["ndjson", "csv"],
+                description="If present, all the results are streamed in that format (NDJSON or CSV) instead of "
+                            "returning a page.",
+                required=False,
+            ),
             # Exclude pagination and ordering parameters
             OpenApiParameter(name="ordering", exclude=True),
             OpenApiParameter(name="page", exclude=True),
@@ -443,15 +640,6 @@ class MirnaCodes(APIView):
 
     serializer_class = None  # To prevent warnings from the drf-spectacular package
 
-    @staticmethod
-    def __get_mirna_code(mirna_code: str) -> str | None:
-        """
-        Receives a miRNA Previous ID or Accession ID, and returns the associated Accession ID.
-        :param mirna_code: miRNA Previous ID or Accession ID.
-        :return: The associated Accession ID.
-        """
-        return get_accession_from_mirna(mirna_code)
-
     @extend_schema(
         tags=["miRNA"],
         summary="Retrieve miRNA codes",
@@ -496,14 +684,91 @@ class MirnaCodes(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        res = {}
-        for mirna_id in mirna_codes:
-            res[mirna_id] = self.__get_mirna_code(mirna_id)
+        # Removes duplicated codes keeping the request order. All of them are resolved in a single pass
+        mirna_codes = list(dict.fromkeys(mirna_codes))
+        entries = mirna_alias_service.get_accessions(mirna_codes)
 
-        return Response(res)
+        # Big requests are streamed to avoid building the entire response in memory
+        if len(mirna_codes) > STREAMING_THRESHOLD:
+            return json_object_streaming_response(entries)
 
+        return Response(dict(entries))
 
-class MirnaCodesFinder(APIView):
+
+class GeneSymbols(APIView):
+    """
+    Service that normalizes a list of gene symbols or aliases to their official gene symbols.
+    """
+
+    serializer_class = None  # To prevent warnings from the drf-spectacular package
+
+    @staticmethod
+    @extend_schema(
+        tags=["Genes"],
+        summary="Normalize gene symbols",
+        request={
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "genes": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "List of gene symbols or aliases to normalize.",
+                        },
+                        "include_aliases": {
+                            "type": "boolean",
+                            "description": "If true, all the aliases of every gene are also returned. "
+                                           "False by default.",
+                        },
+                    },
+                    "required": ["genes"],
+                },
+                "example": {"genes": ["EGFR", "ERBB1", "HER1", "name_01"]},
+            }
+        },
+    )
+    def post(request):
+        data = request.data
+        if "genes" not in data:
+            return Response(
+                {"detail": "'genes' is mandatory"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        genes = data["genes"]
+        if not isinstance(genes, list) or not all(isinstance(gene, str) for gene in genes):
+            return Response(
+                {"detail": "'genes' must be a list of strings"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        include_aliases = data.get("include_aliases", False)
+        if not isinstance(include_aliases, bool):
+            return Response(
+                {"detail": "'include_aliases' must be a boolean"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Removes duplicated genes keeping the request order. All of them are resolved in memory in a single pass
+        genes = list(dict.fromkeys(genes))
+        if include_aliases:
+            index = gene_alias_service.get_index()
+            entries = (
+                (gene, {"gene_symbol": index.get_gene_symbol(gene), "aliases": index.get_aliases(gene)})
+                for gene in genes
+            )
+        else:
+            entries = gene_alias_service.get_gene_symbols(genes)
+
+        # Big requests are streamed to avoid building the entire response in memory
+        if len(genes) > STREAMING_THRESHOLD:
+            return json_object_streaming_response(entries)
+
+        return Response(dict(entries))
+
+
+class MirnaCodesFinder(AsyncAPIView):
     """
     Service that takes a string of any length and returns a list of miRNA ids that contain that search criteria.
     """
@@ -532,48 +797,22 @@ class MirnaCodesFinder(APIView):
             ),
         ],
     )
-    def get(self, _request):
+    async def get(self, _request):
         query = self.request.GET.get("query")
         if query is None:
             return Response([])
 
-        res = []
         limit = self.request.GET.get("limit")
         limit = get_limit_parameter(limit)
 
-        res_mirna = Mirna.objects.filter(mirna_code__istartswith=query)[
-            :limit
-        ].values_list("mirna_code", flat=True)
-        res.extend(res_mirna)
-        res_mirna_count = len(res_mirna)
-        if res_mirna_count < limit:
-            num_of_reg = limit - res_mirna_count
-            res_mirbaseidmirna_id = MirbaseIdMirna.objects.filter(
-                mature_mirna__istartswith=query
-            )[:num_of_reg].values_list("mature_mirna", flat=True)
-            res.extend(res_mirbaseidmirna_id)
-            res = list(set(res))  # Removes duplicates
-            res_mirna_count = len(res_mirbaseidmirna_id)
-            if res_mirna_count < limit:
-                num_of_reg = limit - res_mirna_count
-                res_mirbaseidmirna_prev = MirbaseIdMirna.objects.filter(
-                    previous_mature_mirna__istartswith=query
-                )[:num_of_reg].values_list("previous_mature_mirna", flat=True)
-                res.extend(res_mirbaseidmirna_prev)
-                res = list(set(filter(None, res)))  # remove duplicates and empty values
-                res_mirna_count = len(res_mirbaseidmirna_prev)
-            if res_mirna_count < limit:
-                num_of_reg = limit - res_mirna_count
-                res_mirbaseidmirna_acc = MirbaseIdMirna.objects.filter(
-                    mirbase_accession_id__istartswith=query
-                )[:num_of_reg].values_list("mirbase_accession_id", flat=True)
-                res.extend(res_mirbaseidmirna_acc)
-                res = list(set(res))  # remove duplicates
-
-        return Response(list(res))
-
-
-class MirnaList(viewsets.ReadOnlyModelViewSet):
+        # The index is searched in the event loop. Only when it must be (re)built from the DB it's done in a thread
+        index = mirna_finder_service.get_current_index()
+        if index is None:
+            index = await sync_to_async(mirna_finder_service.get_index)()
+        return Response(index.search(query, limit))
+
+
+class MirnaList(AsyncAPIView):
     """This functionality allows obtaining different information about a miRNA, such as its sequence, its previous identifiers and databases where information about it can be found."""
 
     serializer_class = MirnaSerializer
@@ -596,23 +835,19 @@ class MirnaList(viewsets.ReadOnlyModelViewSet):
             )
         ],
     )
-    def list(self, request, *args, **kwargs):
+    async def get(self, request):
         mirna = self.request.GET.get("mirna")
         if not mirna:
             raise Http404
-        aliases = get_mirna_aliases(mirna)
-        instance = generics.get_object_or_404(Mirna, mirna_code__in=aliases)
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
-
-    def get_queryset(self):
-        mirna = self.request.GET.get("mirna")
-        if mirna:
-            aliases = get_mirna_aliases(mirna)
-            return generics.get_object_or_404(Mirna, mirna_code__in=aliases)
-        else:
+        aliases = await sync_to_async(get_mirna_aliases)(mirna)
+        instance = await Mirna.objects.filter(mirna_code__in=aliases).afirst()
+        if instance is None:
             raise Http404
 
+        # The links and the accession ID are retrieved by the serializer with sync code
+        data = await sync_to_async(lambda: self.serializer_class(instance).data)()
+        return Response(data)
+
 
 class MirnaDiseaseList(generics.ListAPIView):
     """This service provides information, with evidence supported by experiments, on the relationships between miRNAs and human diseases."""
@@ -780,7 +1015,10 @@ class UnsubscribeUserToPubmed(APIView):
 class MethylationSites(APIView):
     """
     Service that searches a list of methylation site identifiers from different Illumina array versions and
-    returns the identifiers for the most recent version of the array.
+    returns the identifiers for the most recent version of the array. The headers X-Matched-Sites, X-Unmatched-Sites
+    and X-Ambiguous-Sites contain the number of input sites that were found, not found, or found in more than one
+    site of the array. They are not sent for requests with more than 5000 sites, as those responses are streamed, so
+    the 'include_stats' parameter must be used to get them in the body.
     """
 
     serializer_class = None  # To prevent warnings from the drf-spectacular package
@@ -798,7 +1036,13 @@ class MethylationSites(APIView):
                             "type": "array",
                             "items": {"type": "string"},
                             "description": "List of Methylation names.",
-                        }
+                        },
+                        "include_stats": {
+                            "type": "boolean",
+                            "description": "If true, the response is an object with the translated sites in "
+                                           "'methylation_sites' and the matched, unmatched and ambiguous counters "
+                                           "in 'stats' (sent after all the sites). False by default.",
+                        },
                     },
                     "required": ["methylation_sites"],
                 },
@@ -823,16 +1067,33 @@ class MethylationSites(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Generates a dict with the methylation sites as keys and the result of the query as values.
-        res = {
-            methylation_name: get_methylation_epic_sites_names(methylation_name)[1]
-            for methylation_name in methylation_sites
-        }
+        include_stats = data.get("include_stats", False)
+        if not isinstance(include_stats, bool):
+            return Response(
+                {"detail": "'include_stats' must be a boolean"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        return Response(res)
+        # Translates all the sites in bulk. Every input site is a key in the response
+        methylation_sites = list(dict.fromkeys(methylation_sites))
+        translation = methylation_service.MethylationSitesTranslation(methylation_sites)
+
+        # Big requests are streamed to avoid building the entire response in memory. Headers are sent before the
+        # sites are translated, so the stats are only sent in the body after all the sites
+        if len(methylation_sites) > STREAMING_THRESHOLD:
+            if include_stats:
+                chunks = iter_json_object_with_trailer("methylation_sites", translation,
+                                                       lambda: {"stats": translation.get_stats()})
+                return streaming_response(chunks, content_type="application/json")
+            return json_object_streaming_response(translation)
+
+        res = dict(translation)
+        if include_stats:
+            res = {"methylation_sites": res, "stats": translation.get_stats()}
+        return Response(res, headers=translation.get_stats_headers())
 
 
-class MethylationSitesFinder(APIView):
+class MethylationSitesFinder(AsyncAPIView):
     """
     Service that takes a text string of any length and returns a list of methylation site names (loci) containing
     that search criteria within the Illumina 'Infinium MethylationEPIC' array.
@@ -862,7 +1123,7 @@ class MethylationSitesFinder(APIView):
             ),
         ],
     )
-    def get(self, _request):
+    async def get(self, _request):
         query = self.request.GET.get("query")
         if query is None:
             return Response([])
@@ -870,10 +1131,11 @@ class MethylationSitesFinder(APIView):
         limit = self.request.GET.get("limit")
         limit = get_limit_parameter(limit)
 
-        res = MethylationEPIC.objects.filter(name__istartswith=query)[
-            :limit
-        ].values_list("name", flat=True)
-        return Response(list(res))
+        # The index is searched in the event loop. Only when it must be (re)built from the DB it's done in a thread
+        index = methylation_service.get_current_finder_index()
+        if index is None:
+            index = await sync_to_async(methylation_service.get_finder_index)()
+        return Response(index.search(query, limit))
 
 
 class MethylationSitesToGenes(APIView):
@@ -882,29 +1144,6 @@ class MethylationSitesToGenes(APIView):
 
     serializer_class = None  # To prevent warnings from the drf-spectacular package
 
-    @staticmethod
-    def __get_methylation_epic_sites_ids(input_name: str) -> list[str]:
-        """
-        Gets methylation sites from any type of Loci id
-        :param input_name: String to query in the DB (site name)
-        :return: list of ID of Methylation sites from EPIC v2 database
-        """
-        condition = get_methylation_match_condition(input_name)
-        res = MethylationEPIC.objects.filter(condition).values_list("id", flat=True)
-        return list(res)
-
-    @staticmethod
-    def __get_genes_from_methylation_epic_site(input_id: str) -> list[str]:
-        """
-        Gets genes from a specific methylation CpG site
-        :param input_id: String to query in the DB (CpG ID)
-        :return: Gene for the given input
-        """
-        gene = MethylationUCSCRefGene.objects.filter(
-            Q(methylation_epic_v2_ilmnid=input_id)
-        ).values_list("ucsc_refgene_name", flat=True)
-        return list(gene)
-
     @extend_schema(
         tags=["Methylation"],
         summary="Retrieve genes from methylation sites",
@@ -946,29 +1185,18 @@ class MethylationSitesToGenes(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        res = {}
-        for methylation_name in methylation_sites:
-            res[methylation_name] = []
-            # For each CpG methylation site passed as a parameter... I look for its Identifier in the version of
-            # the EPIC v2 array:
-            epics_ids = self.__get_methylation_epic_sites_ids(methylation_name)
-            for site_id in epics_ids:
-                # For each identifier in the EPIC v2 array, I search for the genes involved:
-                genes_list = self.__get_genes_from_methylation_epic_site(site_id)
-
-                [
-                    res[methylation_name].append(gen)
-                    for gen in genes_list
-                    if gen not in res[methylation_name]
-                ]
-
-            if len(res[methylation_name]) == 0:
-                del res[methylation_name]
+        # All the sites are joined against the DB in bulk. Sites without genes are not included in the response
+        methylation_sites = list(dict.fromkeys(methylation_sites))
+        entries = methylation_service.get_genes_from_methylation_sites(methylation_sites)
 
-        return Response(res)
+        # Big requests are streamed to avoid building the entire response in memory
+        if len(methylation_sites) > STREAMING_THRESHOLD:
+            return json_object_streaming_response(entries)
 
+        return Response(dict(entries))
 
-class MethylationDetails(APIView):
+
+class MethylationDetails(AsyncAPIView):
     """
     Service that obtains information about a specific CpG methylation site from
     the 'Infinium MethylationEPIC V2.0' array.
@@ -993,70 +1221,68 @@ class MethylationDetails(APIView):
             )
         ],
     )
-    def get(self, _request):
+    async def get(self, _request):
         methylation_site = self.request.GET.get("methylation_site")
         if not methylation_site:
             return Response(status=400, data={"'methylation_site' is mandatory"})
 
-        res = {}
-        # search for id in array
-        epic_data = MethylationEPIC.objects.filter(Q(name=methylation_site)).first()
-
-        if epic_data:
-            # Loads name to response
-            res["name"] = epic_data.name
-
-            # Loads chromosome data
-            if epic_data.strand_fr == "F":
-                res["chromosome_position"] = (
-                    epic_data.chr + ":" + str(epic_data.mapinfo) + " [+]"
-                )
-            elif epic_data.strand_fr == "R":
-                res["chromosome_position"] = (
-                    epic_data.chr + ":" + str(epic_data.mapinfo) + " [-]"
-                )
-
-            # load aliases to response
-            res["aliases"] = []
-            if epic_data.methyl27_loci and epic_data.methyl27_loci != epic_data.name:
-                res["aliases"].append(epic_data.methyl27_loci)
-            if epic_data.methyl450_loci and epic_data.methyl450_loci != epic_data.name:
-                res["aliases"].append(epic_data.methyl450_loci)
-            if epic_data.epicv1_loci and epic_data.epicv1_loci != epic_data.name:
-                res["aliases"].append(epic_data.epicv1_loci)
-            if epic_data.ilmnid and epic_data.ilmnid != epic_data.name:
-                res["aliases"].append(epic_data.ilmnid)
-
-            # searches and loads for islands relations
-            islands_data = MethylationUCSC_CPGIsland.objects.filter(
-                Q(methylation_epic_v2_ilmnid=epic_data.id)
+        # The details are stored as a denormalized document, so a single PK lookup is needed
+        res = await methylation_service.aget_methylation_site_details(methylation_site)
+        if res is None:
+            return Response(
+                status=400, data={methylation_site + " is not a valid methylation site"}
             )
-            res["ucsc_cpg_islands"] = []
-            for island in islands_data:
-                res["ucsc_cpg_islands"].append(
-                    {
-                        "cpg_island": island.ucsc_cpg_island_name,
-                        "relation": island.relation_to_ucsc_cpg_island,
-                    }
-                )
+        return Response(res)
 
-            # searches and loads for genes relations
-            genes_data = MethylationUCSCRefGene.objects.filter(
-                Q(methylation_epic_v2_ilmnid=epic_data.id)
+    @staticmethod
+    @extend_schema(
+        tags=["Methylation"],
+        summary="Retrieve methylation details of a list of sites",
+        request={
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "methylation_sites": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "List of methylation site names from Illumina Infinium MethylationEPIC "
+                                           "2.0 array.",
+                        }
+                    },
+                    "required": ["methylation_sites"],
+                },
+                "example": {
+                    "methylation_sites": ["cg22461615", "cg00000029"]
+                },
+            }
+        },
+    )
+    async def post(request):
+        data = request.data
+        if "methylation_sites" not in data:
+            return Response(
+                {"detail": "'methylation_sites' is mandatory"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            res["genes"] = {}
-            for gene in genes_data:
-                if gene.ucsc_refgene_name not in res["genes"]:
-                    res["genes"][gene.ucsc_refgene_name] = []
-                if gene.ucsc_refgene_group not in res["genes"][gene.ucsc_refgene_name]:
-                    res["genes"][gene.ucsc_refgene_name].append(gene.ucsc_refgene_group)
-
-            return Response(res)
-        else:
+
+        methylation_sites = data["methylation_sites"]
+        if not isinstance(methylation_sites, list):
             return Response(
-                status=400, data={methylation_site + " is not a valid methylation site"}
+                {"detail": "'methylation_sites' must be of list type"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # Every input site is a key in the response. Invalid sites have null details
+        methylation_sites = list(dict.fromkeys(methylation_sites))
+        entries = methylation_service.get_methylation_sites_details(methylation_sites)
+
+        # Big requests are streamed to avoid building the entire response in memory
+        if len(methylation_sites) > STREAMING_THRESHOLD:
+            return json_object_streaming_response(entries)
+
+        return Response(await sync_to_async(dict)(entries))
+
 
 def index(request: HttpRequest):
     """Returns the index.html page."""
@@ -18,6 +18,7 @@ from .services import (
     find_mirna_codes,
     get_diseases,
     get_drugs,
+    get_gene_symbols,
     get_methylation_details,
     get_methylation_site_genes,
     get_methylation_sites,
@@ -25,6 +26,7 @@ from .services import (
     get_mirna_codes,
     get_mirna_details,
     get_mirna_target_interactions,
+    get_mirna_target_interactions_batch,
     get_mirna_target_validations,
     subscribe_pubmeds,
     unsubscribe_pubmeds,
@@ -58,6 +60,7 @@ __all__ = [
     "get_all_paginated_results",
     "get_diseases",
     "get_drugs",
+    "get_gene_symbols",
     "get_methylation_details",
     "get_methylation_site_genes",
     "get_methylation_sites",
@@ -65,6 +68,7 @@ __all__ = [
     "get_mirna_codes",
     "get_mirna_details",
     "get_mirna_target_interactions",
+    "get_mirna_target_interactions_batch",
     "get_mirna_target_validations",
     "get_paginated_response",
     "get_simple_response",
@@ -284,6 +284,31 @@ def get_mirna_codes(
     )
 
 
+@mcp.tool()
+def get_gene_symbols(
+    genes: list[str],
+    include_aliases: bool = False,
+    base_url: str | None = None,
+    timeout: float = 30.0,
+) -> dict[str, Any]:
+    """Normalize gene symbols or aliases to official gene symbols.
+
+    :param genes: Gene symbols or aliases to normalize.
+    :param include_aliases: Whether to also return all the aliases of every
+        gene.
+    :param base_url: Optional Modulector API deployment URL.
+    :param timeout: Request timeout in seconds.
+    :return: Mapping from requested genes to gene symbols or null.
+    """
+
+    return services.get_gene_symbols(
+        genes,
+        base_url=_base_url(base_url),
+        include_aliases=include_aliases,
+        timeout=timeout,
+    )
+
+
 @mcp.tool()
 def find_methylation_sites(
     query: str,
@@ -232,6 +232,7 @@ def get_mirna_target_interactions(
     search: str | None = None,
     page: int | None = None,
     page_size: int | None = None,
+    cursor: bool = False,
     headers: Headers = None,
     timeout: float = 30.0,
     session: requests.Session | None = None,
@@ -249,6 +250,9 @@ def get_mirna_target_interactions(
     :param search: Search term for supported server-side search fields.
     :param page: Page number to request.
     :param page_size: Number of records per page.
+    :param cursor: Whether to use cursor pagination. The count is omitted
+        and next pages must be requested following the `next` URL (e.g. with
+        `iter_paginated_results`). Cannot be used with `page`.
     :param headers: Optional HTTP headers.
     :param timeout: Request timeout in seconds.
     :param session: Optional `requests.Session` to use for the request.
@@ -275,6 +279,7 @@ def get_mirna_target_interactions(
         params=params,
         page=page,
         page_size=page_size,
+        cursor=cursor,
         headers=headers,
         timeout=timeout,
         session=session,
@@ -282,6 +287,63 @@ def get_mirna_target_interactions(
     return cast(PaginatedResponse[MirnaTargetInteraction], response)
 
 
+def get_mirna_target_interactions_batch(
+    *,
+    base_url: str = MODULECTOR_API_BASE_URL,
+    mirnas: Sequence[str] | None = None,
+    genes: Sequence[str] | None = None,
+    score: float | None = None,
+    limit: int | None = None,
+    headers: Headers = None,
+    timeout: float = 300.0,
+    session: requests.Session | None = None,
+) -> dict[str, list[MirnaTargetInteraction]]:
+    """Return the interactions between several miRNAs and genes in one request.
+
+    :param base_url: Base URL of the Modulector API.
+    :param mirnas: miRNA accession IDs or miRBase names.
+    :param genes: Gene symbols or aliases.
+    :param score: Minimum mirDIP interaction score. Valid values are between
+        `0` and `1`.
+    :param limit: Maximum number of interactions (the ones with the highest
+        scores) returned for every miRNA (or gene, if no miRNAs are provided).
+    :param headers: Optional HTTP headers.
+    :param timeout: Request timeout in seconds.
+    :param session: Optional `requests.Session` to use for the request.
+    :raises ValueError: If neither `mirnas` nor `genes` is provided, if
+        `score` is outside the accepted range or if `limit` is not positive.
+    :return: Mapping from each requested miRNA (or gene, if no miRNAs are
+        provided) to its interactions sorted by descending score. PubMeds and
+        aliases are not included.
+    """
+
+    if not mirnas and not genes:
+        raise ValueError("mirnas or genes is required")
+    if score is not None and not 0 <= score <= 1:
+        raise ValueError("score must be between 0 and 1")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be a positive integer")
+
+    body: dict[str, Any] = {}
+    if mirnas:
+        body["mirnas"] = list(mirnas)
+    if genes:
+        body["genes"] = list(genes)
+    if score is not None:
+        body["score"] = score
+    if limit is not None:
+        body["limit"] = limit
+    payload = get_simple_response(
+        _build_url(base_url, "mirna-target-interactions-batch"),
+        method="POST",
+        json=body,
+        headers=headers,
+        timeout=timeout,
+        session=session,
+    )
+    return cast(dict[str, list[MirnaTargetInteraction]], payload)
+
+
 def get_mirna_target_validations(
     base_url: str = MODULECTOR_API_BASE_URL,
     mirna: str | None = None,
@@ -478,6 +540,39 @@ def get_mirna_codes(
     return cast(dict[str, str | None], payload)
 
 
+def get_gene_symbols(
+    genes: Sequence[str],
+    *,
+    base_url: str = MODULECTOR_API_BASE_URL,
+    include_aliases: bool = False,
+    headers: Headers = None,
+    timeout: float = 30.0,
+    session: requests.Session | None = None,
+) -> dict[str, Any]:
+    """Return the official gene symbols of gene symbols or aliases.
+
+    :param genes: Gene symbols or aliases to normalize.
+    :param base_url: Base URL of the Modulector API.
+    :param include_aliases: If `True`, every value is a mapping with the
+        `gene_symbol` and all the `aliases` of the gene.
+    :param headers: Optional HTTP headers.
+    :param timeout: Request timeout in seconds.
+    :param session: Optional `requests.Session` to use for the request.
+    :return: Mapping from each requested gene to its gene symbol, or `None`
+        when it is not found.
+    """
+
+    payload = get_simple_response(
+        _build_url(base_url, "gene-symbols"),
+        method="POST",
+        json={"genes": list(genes), "include_aliases": include_aliases},
+        headers=headers,
+        timeout=timeout,
+        session=session,
+    )
+    return cast(dict[str, Any], payload)
+
+
 def find_methylation_sites(
     query: str,
     *,
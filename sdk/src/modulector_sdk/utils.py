@@ -1,7 +1,9 @@
 """Utilities for calling Modulector API endpoints.
 
 The public API returns either a plain JSON payload or a paginated payload with
-``count``, ``next``, ``previous``, and ``results`` fields.
+``count``, ``next``, ``previous``, and ``results`` fields. Endpoints that support
+cursor pagination (``pagination=cursor``) return a null ``count`` and are
+traversed only by following the ``next`` URL.
 """
 
 from collections.abc import Iterator, Mapping
@@ -20,7 +22,9 @@ T = TypeVar("T")
 class PaginatedResponse(Generic[T]):
     """Representation of a Modulector paginated response."""
 
-    count: int
+    count: int | None
+    """Total number of records. ``None`` for cursor paginated responses."""
+
     next: str | None
     previous: str | None
     results: list[T]
@@ -89,15 +93,22 @@ def get_paginated_response(
     params: Params = None,
     page: int | None = None,
     page_size: int | None = None,
+    cursor: bool = False,
     json: Any = None,
     data: Any = None,
     headers: Headers = None,
     timeout: float = 30.0,
     session: requests.Session | None = None,
 ) -> PaginatedResponse[Any]:
-    """Return one page from an endpoint using Modulector pagination."""
+    """Return one page from an endpoint using Modulector pagination.
+
+    With ``cursor=True`` the first page of a cursor paginated endpoint is
+    requested. Next pages must be requested with the returned ``next`` URL.
+    """
 
-    request_params = _with_pagination_params(params, page=page, page_size=page_size)
+    request_params = _with_pagination_params(
+        params, page=page, page_size=page_size, cursor=cursor
+    )
     payload = request_url(
         url,
         method=method,
@@ -118,19 +129,26 @@ def iter_paginated_results(
     params: Params = None,
     page_size: int | None = None,
     max_pages: int | None = None,
+    cursor: bool = False,
     json: Any = None,
     data: Any = None,
     headers: Headers = None,
     timeout: float = 30.0,
     session: requests.Session | None = None,
 ) -> Iterator[Any]:
-    """Yield every result by following each paginated response's ``next`` URL."""
+    """Yield every result by following each paginated response's ``next`` URL.
+
+    Use ``cursor=True`` on endpoints that support cursor pagination to avoid
+    the cost of counting the records and of deep pages.
+    """
 
     if max_pages is not None and max_pages < 1:
         raise ValueError("max_pages must be greater than 0")
 
     next_url: str | None = url
-    request_params = _with_pagination_params(params, page=None, page_size=page_size)
+    request_params = _with_pagination_params(
+        params, page=None, page_size=page_size, cursor=cursor
+    )
     pages_read = 0
 
     while next_url is not None:
@@ -161,6 +179,7 @@ def get_all_paginated_results(
     params: Params = None,
     page_size: int | None = None,
     max_pages: int | None = None,
+    cursor: bool = False,
     json: Any = None,
     data: Any = None,
     headers: Headers = None,
@@ -176,6 +195,7 @@ def get_all_paginated_results(
             params=params,
             page_size=page_size,
             max_pages=max_pages,
+            cursor=cursor,
             json=json,
             data=data,
             headers=headers,
@@ -190,22 +210,27 @@ def _with_pagination_params(
     *,
     page: int | None,
     page_size: int | None,
+    cursor: bool = False,
 ) -> dict[str, Any] | None:
     """
     Return a new params dict with pagination parameters added, or None if no params.
     :param params: Parameters to include in the request, or None for no parameters.
     :param page: Page number to include in the request, or None for no page parameter.
     :param page_size: Number of items per page to include in the request, or None for no page_size parameter.
+    :param cursor: Whether to request cursor pagination (``pagination=cursor``).
     :raises ValueError: If page is less than 1.
     :raises ValueError: If page_size is not between 1 and 1000.
+    :raises ValueError: If page is used with cursor pagination.
     :return: A new params dict with pagination parameters added, or None if no params.
     """
     if page is not None and page < 1:
         raise ValueError("page must be greater than 0")
     if page_size is not None and not 1 <= page_size <= 1000:
         raise ValueError("page_size must be between 1 and 1000")
+    if page is not None and cursor:
+        raise ValueError("page cannot be used with cursor pagination")
 
-    if params is None and page is None and page_size is None:
+    if params is None and page is None and page_size is None and not cursor:
         return None
 
     request_params = dict(params or {})
@@ -213,6 +238,8 @@ def _with_pagination_params(
         request_params["page"] = page
     if page_size is not None:
         request_params["page_size"] = page_size
+    if cursor:
+        request_params["pagination"] = "cursor"
     return request_params
 
 
@@ -236,8 +263,9 @@ def _parse_paginated_response(payload: JSON) -> PaginatedResponse[Any]:
     if previous_url is not None and not isinstance(previous_url, str):
         raise ValueError("paginated response field 'previous' must be a string or null")
 
+    count = payload["count"]
     return PaginatedResponse(
-        count=int(payload["count"]),
+        count=int(count) if count is not None else None,
         next=next_url,
         previous=previous_url,
         results=results,
@@ -10,5 +10,11 @@ done
 
 
 python3 manage.py generate_secret_key --settings='ModulectorBackend.settings' && \
-python3 manage.py collectstatic --no-input && \
-daphne -b 0.0.0.0 -p 8000 ModulectorBackend.asgi:application
+python3 manage.py collectstatic --no-input || exit 1
+
+# Multiple server processes are forked by Gunicorn after loading the app (see ModulectorBackend/gunicorn.conf.py)
+if [ "${SERVER_WORKERS:-1}" -gt 1 ]; then
+    exec gunicorn -c ModulectorBackend/gunicorn.conf.py ModulectorBackend.asgi:application
+else
+    exec daphne -b 0.0.0.0 -p 8000 ModulectorBackend.asgi:application
+fi